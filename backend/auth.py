@@ -1,17 +1,21 @@
-from core.config import settings
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Set
 
-from jose import JWTError, jwt
 import bcrypt
+from core.config import settings
+from core.metrics import registry
+from database import SessionLocal
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from database import get_session
-from models.user import User
+from jose import JWTError, jwt
 from models.schemas import TokenData
+from models.user import User
+from sqlalchemy import select
 
 # settings (cached singleton)
 SECRET_KEY = settings.JWT_SECRET_KEY
@@ -24,52 +28,222 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/lo
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     # bcrypt has a 72-byte input limit; truncate to first 72 characters
     if isinstance(hashed_password, str):
-        hashed_bytes = hashed_password.encode('utf-8')
+        hashed_bytes = hashed_password.encode("utf-8")
     else:
         hashed_bytes = hashed_password
     try:
-        return bcrypt.checkpw(plain_password[:72].encode('utf-8'), hashed_bytes)
+        return bcrypt.checkpw(plain_password[:72].encode("utf-8"), hashed_bytes)
     except Exception:
         return False
 
 
 def get_password_hash(password: str) -> str:
     # bcrypt has a 72-byte input limit; truncate to first 72 characters
-    hashed = bcrypt.hashpw(password[:72].encode('utf-8'), bcrypt.gensalt())
-    return hashed.decode('utf-8')
+    hashed = bcrypt.hashpw(password[:72].encode("utf-8"), bcrypt.gensalt())
+    return hashed.decode("utf-8")
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool instead of the event loop.
+
+    bcrypt releases the GIL while hashing, so the loop keeps serving other
+    requests. `workers` bounds the CPU spent on passwords; at most
+    `max_pending` calls may wait or run at once, beyond that `Overloaded` is
+    raised rather than letting a queue build up behind a login storm.
+    """
+
+    class Overloaded(Exception):
+        pass
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.pending = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a free worker (running ones excluded)."""
+        return max(0, self.pending - self.workers)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+        }
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasher.Overloaded()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="bcrypt"
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, fn, *args
+            )
+        finally:
+            self.pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING
+)
+registry.gauge(
+    "password_hash_queue_depth",
+    "bcrypt calls waiting for a free hasher thread.",
+    fn=lambda: password_hasher.queue_depth,
+)
+registry.gauge(
+    "password_hash_pending",
+    "bcrypt calls queued or running.",
+    fn=lambda: password_hasher.pending,
+)
+registry.counter(
+    "password_hash_rejected_total",
+    "bcrypt calls refused because the queue was full.",
+    fn=lambda: password_hasher.rejected,
+)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({'exp': expire})
+    expire = datetime.utcnow() + (
+        expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)) -> User:
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller, as seen by route dependencies."""
+
+    id: Optional[int]
+    username: str
+    role: Optional[str]
+
+
+class PrincipalCache:
+    """Principals by bearer token, each kept for `ttl` seconds (capped at token expiry).
+
+    Entries are also indexed by username so a role change can drop every token
+    of that user at once. Per process: another worker sees the change when its
+    own entry expires.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10_000) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, Principal]]" = OrderedDict()
+        self._by_user: Dict[str, Set[str]] = {}
+
+    def get(self, token: str) -> Optional[Principal]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._drop(token)
+            return None
+        return entry[1]
+
+    def put(
+        self, token: str, principal: Principal, token_exp: Optional[float] = None
+    ) -> None:
+        expires = time.monotonic() + self.ttl
+        if token_exp is not None:
+            expires = min(expires, time.monotonic() + (token_exp - time.time()))
+        self._drop(token)
+        self._entries[token] = (expires, principal)
+        self._by_user.setdefault(principal.username, set()).add(token)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, username: str) -> None:
+        for token in list(self._by_user.get(username, ())):
+            self._drop(token)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+
+    def _drop(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._by_user.get(entry[1].username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[entry[1].username]
+
+
+principal_cache = PrincipalCache(settings.AUTH_PRINCIPAL_CACHE_SECONDS)
+
+
+async def _load_principal(username: str) -> Optional[Principal]:
+    # own session, only on a cache miss; cache hits never touch the pool
+    async with SessionLocal() as session:
+        res = await session.execute(
+            select(User.id, User.username, User.role).where(User.username == username)
+        )
+        row = res.first()
+    return Principal(id=row.id, username=row.username, role=row.role) if row else None
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
-        detail='Could not validate credentials',
-        headers={'WWW-Authenticate': 'Bearer'},
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get('sub')
+        username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    q = select(User).where(User.username == token_data.username)
-    res = await session.execute(q)
-    user = res.scalars().first()
-    if not user:
-        raise credentials_exception
-    return user
+    if settings.AUTH_CLAIMS_ONLY and "role" in payload:
+        # trust the role signed into the token; changes apply when it is reissued
+        principal = Principal(
+            id=payload.get("uid"), username=token_data.username, role=payload["role"]
+        )
+    else:
+        principal = await _load_principal(token_data.username)
+        if not principal:
+            raise credentials_exception
+    if principal_cache.ttl > 0:
+        principal_cache.put(token, principal, payload.get("exp"))
+    return principal
 
 
-async def require_admin(user: User = Depends(get_current_user)) -> User:
-    if (not getattr(user, 'role', None)) or user.role.lower() != 'admin':
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='admin privileges required')
+async def require_admin(user: Principal = Depends(get_current_user)) -> Principal:
+    if (not getattr(user, "role", None)) or user.role.lower() != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="admin privileges required"
+        )
     return user
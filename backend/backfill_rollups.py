@@ -0,0 +1,23 @@
+import asyncio
+import sys
+from datetime import datetime
+
+import models  # noqa: F401  (register ORM mappers)
+from database import SessionLocal, init_db
+from services.rollups import backfill
+
+
+async def main(since=None):
+    await init_db()
+    async with SessionLocal() as session:
+        days = await backfill(session, since)
+    print(
+        f"Rollup backfill complete ({days} closed days; "
+        "today is kept up to date by new orders)"
+    )
+
+
+if __name__ == "__main__":
+    # usage: python backfill_rollups.py [YYYY-MM-DD]
+    since = datetime.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    asyncio.run(main(since))
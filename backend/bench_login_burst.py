@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from auth import PasswordHasher, get_password_hash, verify_password
+from main import app
+
+
+def _pct(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+
+async def _probe(client, stop, samples, interval=0.01):
+    # an unrelated, cheap endpoint on a fixed schedule; latency counts from the
+    # scheduled send time, so time spent stuck behind a blocked loop is included
+    loop = asyncio.get_running_loop()
+    next_at = loop.time()
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, next_at - loop.time()))
+        await client.get("/health")
+        samples.append(loop.time() - next_at)
+        next_at += interval
+        # skip slots already in the past, but keep measuring from the first missed one
+        while next_at + interval < loop.time():
+            samples.append(loop.time() - next_at)
+            next_at += interval
+
+
+async def _burst(mode, logins, hashed, hasher):
+    async def inline():
+        # what login did before: bcrypt directly in the handler
+        return verify_password("hunter2", hashed)
+
+    async def offloaded():
+        try:
+            return await hasher.verify("hunter2", hashed)
+        except PasswordHasher.Overloaded:
+            return None
+
+    one = inline if mode == "inline" else offloaded
+    await asyncio.gather(*(one() for _ in range(logins)))
+
+
+async def run(mode, logins, workers, max_pending):
+    hashed = get_password_hash("hunter2")
+    hasher = PasswordHasher(workers, max_pending)
+    samples = []
+    stop = asyncio.Event()
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        probe = asyncio.create_task(_probe(client, stop, samples))
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await _burst(mode, logins, hashed, hasher)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+    hasher.shutdown()
+    print(
+        f"{mode:9s} logins={logins} burst={elapsed:6.2f}s  /health n={len(samples):4d} "
+        f"p50={statistics.median(samples) * 1000:7.1f}ms "
+        f"p99={_pct(samples, 0.99):7.1f}ms "
+        f"max={max(samples) * 1000:7.1f}ms "
+        f"rejected={hasher.rejected}"
+    )
+
+
+if __name__ == "__main__":
+    # usage: python bench_login_burst.py --logins 50 --workers 2
+    p = argparse.ArgumentParser(
+        description="Latency of /health during a burst of bcrypt password checks"
+    )
+    p.add_argument("--logins", type=int, default=40)
+    p.add_argument("--workers", type=int, default=2)
+    p.add_argument("--max-pending", type=int, default=1000)
+    a = p.parse_args()
+    for mode in ("inline", "executor"):
+        asyncio.run(run(mode, a.logins, a.workers, a.max_pending))
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import time
+
+import models  # noqa: F401  (register ORM mappers)
+from core.config import settings
+from database import SessionLocal, init_db
+from models.brand import Brand
+from models.menu_item import MenuItem
+from models.schemas import OrderCreate
+from services import order_ingest as ingest
+from services import order_service
+from services.brand_registry import brand_registry
+from sqlalchemy import select
+
+
+async def _sample_order() -> OrderCreate:
+    async with SessionLocal() as session:
+        row = (
+            await session.execute(
+                select(Brand.slug, MenuItem.id)
+                .join(MenuItem, MenuItem.brand_id == Brand.id)
+                .limit(1)
+            )
+        ).first()
+    if row is None:
+        raise RuntimeError("no menu items; run seed_raw.py first")
+    slug, item_id = row
+    return OrderCreate(
+        brand_slug=slug,
+        customer_name="bench",
+        items=[{"menu_item_id": item_id, "quantity": 2}],
+    )
+
+
+async def _run(order: OrderCreate, total: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            async with SessionLocal() as session:
+                await order_service.create_order(session, order)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - started)
+
+
+async def main(
+    total: int, concurrency: int, max_batch: int, max_wait_ms: int, workers: int
+):
+    await init_db()
+    await brand_registry.reload()
+    order = await _sample_order()
+
+    settings.ORDER_INGEST_MODE = "direct"
+    direct = await _run(order, total, concurrency)
+    print(f"direct:  {direct:8.1f} orders/sec")
+
+    queue = ingest.OrderIngestQueue(
+        max_batch=max_batch, max_wait=max_wait_ms / 1000, workers=workers
+    )
+    ingest.order_ingest = queue
+    settings.ORDER_INGEST_MODE = "batched"
+    queue.start()
+    try:
+        batched = await _run(order, total, concurrency)
+    finally:
+        await queue.stop()
+    print(
+        f"batched: {batched:8.1f} orders/sec  "
+        f"(max_batch={max_batch}, max_wait={max_wait_ms}ms, workers={workers})"
+    )
+    print(f"speedup: {batched / direct:.2f}x")
+
+
+if __name__ == "__main__":
+    # usage: python bench_order_ingest.py --orders 2000 --concurrency 100
+    # writes real orders to DATABASE_URL; point it at a scratch database
+    p = argparse.ArgumentParser(
+        description="Compare direct vs group-commit order ingestion throughput"
+    )
+    p.add_argument("--orders", type=int, default=1000)
+    p.add_argument("--concurrency", type=int, default=100)
+    p.add_argument("--max-batch", type=int, default=settings.ORDER_INGEST_MAX_BATCH)
+    p.add_argument("--max-wait-ms", type=int, default=settings.ORDER_INGEST_MAX_WAIT_MS)
+    p.add_argument("--workers", type=int, default=settings.ORDER_INGEST_WORKERS)
+    a = p.parse_args()
+    asyncio.run(main(a.orders, a.concurrency, a.max_batch, a.max_wait_ms, a.workers))
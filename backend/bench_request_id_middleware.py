@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import time
+import uuid
+
+from core.middleware.request_id import RequestIDMiddleware
+from core.request_id import request_id_var
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+
+class LegacyRequestIDMiddleware(BaseHTTPMiddleware):
+    """The previous BaseHTTPMiddleware implementation, kept for comparison."""
+
+    async def dispatch(self, request, call_next):
+        rid = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+        request.state.request_id = rid
+        token = request_id_var.set(rid)
+        try:
+            response = await call_next(request)
+            response.headers["X-Request-ID"] = rid
+            return response
+        finally:
+            request_id_var.reset(token)
+
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+
+def _scope():
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "raw_path": b"/",
+        "query_string": b"",
+        "headers": [],
+        "scheme": "http",
+        "server": ("bench", 80),
+        "client": ("c", 1),
+        "root_path": "",
+        "http_version": "1.1",
+        "asgi": {"version": "3.0"},
+    }
+
+
+async def _call(app):
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # the client stays connected until the response is done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        pass
+
+    await app(_scope(), receive, send)
+
+
+async def _measure(app, n):
+    for _ in range(200):  # warm up
+        await _call(app)
+    started = time.perf_counter()
+    for _ in range(n):
+        await _call(app)
+    return (time.perf_counter() - started) / n * 1e6
+
+
+async def main(n):
+    bare = Starlette(routes=[Route("/", ok)])
+    variants = {
+        "none": bare,
+        "legacy (BaseHTTPMiddleware)": Starlette(routes=[Route("/", ok)]),
+        "pure ASGI": RequestIDMiddleware(Starlette(routes=[Route("/", ok)])),
+    }
+    variants["legacy (BaseHTTPMiddleware)"].add_middleware(LegacyRequestIDMiddleware)
+    baseline = None
+    for name, app in variants.items():
+        per_req = await _measure(app, n)
+        baseline = per_req if baseline is None else baseline
+        extra = per_req - baseline
+        print(f"{name:28s} {per_req:7.1f} us/request  (+{extra:6.1f} us over none)")
+
+
+if __name__ == "__main__":
+    # usage: python bench_request_id_middleware.py --requests 20000
+    p = argparse.ArgumentParser(
+        description="Per-request overhead of the request-id middleware"
+    )
+    p.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(p.parse_args().requests))
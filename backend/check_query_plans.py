@@ -0,0 +1,172 @@
+"""EXPLAIN the hot read queries and fail if any of them scans a large table.
+
+Point DATABASE_URL at a scratch database. With --populate it is filled with
+synthetic data first (brands x items menus, orders with line items, rollups)
+and ANALYZEd, so the planner sees realistic row counts:
+
+    python check_query_plans.py --populate --orders 200000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+from database import SessionLocal, init_db
+from sqlalchemy import text
+
+# every query must reach these tables through an index
+LARGE_TABLES = {
+    "orders",
+    "order_items",
+    "menu_items",
+    "revenue_rollups",
+    "item_sales_rollups",
+}
+
+# the SQL each route sends (menu: routes/menu._load_menu; order detail:
+# routes/orders._load_order and its selectinload; admin list: first and next
+# page, per brand and per status; stats: the analytics rollup reads)
+QUERIES: Dict[str, str] = {
+    "menu": """
+        SELECT * FROM menu_items WHERE brand_id = :brand_id AND available IS true
+    """,
+    "order_detail": "SELECT * FROM orders WHERE id = :order_id",
+    "order_detail_items": """
+        SELECT * FROM order_items WHERE order_id IN (:order_id)
+    """,
+    "admin_list": """
+        SELECT * FROM orders ORDER BY created_at DESC, id DESC LIMIT 51
+    """,
+    "admin_list_next_page": """
+        SELECT * FROM orders
+        WHERE (created_at, id) < (now() - interval '30 days', 0)
+        ORDER BY created_at DESC, id DESC LIMIT 51
+    """,
+    "admin_list_brand": """
+        SELECT * FROM orders WHERE brand_id = :brand_id
+        ORDER BY created_at DESC, id DESC LIMIT 51
+    """,
+    "admin_list_status": """
+        SELECT * FROM orders WHERE status = 'pending'
+        ORDER BY created_at DESC, id DESC LIMIT 51
+    """,
+    "admin_list_items": """
+        SELECT * FROM order_items
+        WHERE order_id IN (SELECT id FROM orders ORDER BY created_at DESC LIMIT 51)
+    """,
+    "stats_revenue": """
+        SELECT bucket_start, brand_id, order_count, revenue, cancelled_count
+        FROM revenue_rollups
+        WHERE granularity = 'hour'
+          AND bucket_start >= now() - interval '7 days' AND bucket_start < now()
+        ORDER BY bucket_start, brand_id
+    """,
+    "stats_top_items": """
+        SELECT r.menu_item_id, SUM(r.quantity) AS quantity
+        FROM item_sales_rollups r
+        WHERE r.granularity = 'day' AND r.brand_id = :brand_id
+          AND r.bucket_start >= now() - interval '7 days' AND r.bucket_start < now()
+        GROUP BY r.menu_item_id
+    """,
+}
+
+_POPULATE_SQL = [
+    """
+    INSERT INTO brands (name, slug)
+    SELECT 'Plan Brand ' || b, 'plan-brand-' || b FROM generate_series(1, :brands) b
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO menu_items (brand_id, name, price, category, available)
+    SELECT br.id, 'Item ' || i, 50 + (i % 20) * 10, 'Category ' || (i % 8), i % 10 <> 0
+    FROM brands br CROSS JOIN generate_series(1, :items) i
+    ON CONFLICT (brand_id, name) DO NOTHING
+    """,
+    """
+    INSERT INTO orders (brand_id, total, status, created_at)
+    SELECT (SELECT min(id) FROM brands) + (o % :brands),
+           100 + (o % 50) * 10,
+           (ARRAY['pending','confirmed','preparing','ready','delivered','delivered',
+                  'delivered','delivered','cancelled'])[1 + o % 9],
+           now() - (o || ' seconds')::interval * (90 * 86400.0 / :orders)
+    FROM generate_series(1, :orders) o
+    """,
+    """
+    INSERT INTO order_items (order_id, menu_item_id, quantity, price)
+    SELECT o.id, m.id, 1 + o.id % 3, m.price
+    FROM orders o
+    CROSS JOIN LATERAL (
+        SELECT id, price FROM menu_items
+        WHERE brand_id = o.brand_id ORDER BY id OFFSET o.id % :items LIMIT 1
+    ) m
+    WHERE NOT EXISTS (SELECT 1 FROM order_items oi WHERE oi.order_id = o.id)
+    """,
+]
+
+# ids to plug into the queries above
+_SAMPLE_PARAMS_SQL = text(
+    "SELECT (SELECT max(brand_id) FROM menu_items) AS brand_id,"
+    " (SELECT max(id) FROM orders) AS order_id"
+)
+
+
+def scans(plan: dict) -> Iterator[Tuple[str, str]]:
+    """(node type, table) for every scan in an EXPLAIN (FORMAT JSON) plan."""
+    if "Relation Name" in plan:
+        yield plan["Node Type"], plan["Relation Name"]
+    for child in plan.get("Plans", ()):
+        yield from scans(child)
+
+
+def full_scans(plan: dict) -> List[str]:
+    return sorted(
+        {rel for node, rel in scans(plan) if node == "Seq Scan" and rel in LARGE_TABLES}
+    )
+
+
+async def _populate(session, brands: int, items: int, orders: int) -> None:
+    params = {"brands": brands, "items": items, "orders": orders}
+    for statement in _POPULATE_SQL:
+        await session.execute(text(statement), params)
+    await session.commit()
+    # rollups from the synthetic orders, as the backfill would build them
+    from services.rollups import backfill
+
+    await backfill(session)
+
+
+async def main(args) -> int:
+    await init_db()
+    async with SessionLocal() as session:
+        if args.populate:
+            await _populate(session, args.brands, args.items, args.orders)
+        await session.execute(text("ANALYZE"))
+        result = await session.execute(_SAMPLE_PARAMS_SQL)
+        params = result.one()._asdict()
+        failed = 0
+        for name, sql in QUERIES.items():
+            used = {k: v for k, v in params.items() if f":{k}" in sql}
+            plan = (
+                await session.execute(text("EXPLAIN (FORMAT JSON) " + sql), used)
+            ).scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            root = plan[0]["Plan"]
+            bad = full_scans(root)
+            failed += bool(bad)
+            print(
+                f"{'FAIL' if bad else 'ok':<4} {name:<22} "
+                + ", ".join(f"{node} on {rel}" for node, rel in scans(root))
+            )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--populate", action="store_true")
+    parser.add_argument("--brands", type=int, default=50)
+    parser.add_argument("--items", type=int, default=80)
+    parser.add_argument("--orders", type=int, default=200_000)
+    sys.exit(asyncio.run(main(parser.parse_args())))
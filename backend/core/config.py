@@ -2,13 +2,12 @@ from __future__ import annotations
 
 import os
 from functools import lru_cache
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 from dotenv import load_dotenv
 from pydantic import AnyUrl, Field, PostgresDsn, validator
 from pydantic_settings import BaseSettings
 
-
 # ---------------------------------------------------
 # LOAD ENV FILES
 # ---------------------------------------------------
@@ -31,13 +30,61 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: PostgresDsn = Field(..., env="DATABASE_URL")
+    # Session-level connection for LISTEN and startup DDL, which don't work
+    # through a transaction-mode pooler; defaults to DATABASE_URL
+    DATABASE_DIRECT_URL: Optional[PostgresDsn] = Field(None, env="DATABASE_DIRECT_URL")
+
+    # Optional streaming replica for read-only GET handlers. Reads fall back to
+    # the primary when the replica is down, more than MAX_LAG seconds behind,
+    # or hasn't replayed a write the client has seen (X-Read-After)
+    DATABASE_REPLICA_URL: Optional[PostgresDsn] = Field(
+        None, env="DATABASE_REPLICA_URL"
+    )
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = Field(
+        5.0, env="DATABASE_REPLICA_MAX_LAG_SECONDS"
+    )
+    DATABASE_REPLICA_CHECK_SECONDS: float = Field(
+        1.0, env="DATABASE_REPLICA_CHECK_SECONDS"
+    )
+
+    # Apply pending migrations (migrations/) when the API starts; turn off to
+    # run `python migrate.py` as a separate deploy step instead
+    DB_MIGRATE_ON_STARTUP: bool = Field(True, env="DB_MIGRATE_ON_STARTUP")
+
+    # Connection pool (per worker process)
+    DB_POOL_SIZE: int = Field(5, env="DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: int = Field(10, env="DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT: float = Field(30.0, env="DB_POOL_TIMEOUT")
+    # seconds before a pooled connection is replaced (-1: never); set it below
+    # the server's or proxy's idle timeout
+    DB_POOL_RECYCLE: int = Field(-1, env="DB_POOL_RECYCLE")
+    DB_POOL_PRE_PING: bool = Field(True, env="DB_POOL_PRE_PING")
+    # server-side limit per statement in milliseconds (0: no limit)
+    DB_STATEMENT_TIMEOUT_MS: int = Field(0, env="DB_STATEMENT_TIMEOUT_MS")
+    # DATABASE_URL goes through PgBouncer in transaction mode (e.g. Neon's
+    # "-pooler" endpoint): prepared-statement caching is turned off and
+    # statement names are made unique. Unset: detected from a "-pooler" host.
+    DB_PGBOUNCER: Optional[bool] = Field(None, env="DB_PGBOUNCER")
 
     # JWT
     JWT_SECRET_KEY: str = Field(..., env="JWT_SECRET_KEY")
     JWT_ALGORITHM: str = Field("HS256", env="JWT_ALGORITHM")
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(
-        60, env="ACCESS_TOKEN_EXPIRE_MINUTES"
-    )
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(60, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+
+    # Authenticated principals are cached per token for this long (0 disables).
+    # With AUTH_CLAIMS_ONLY the role is read from the token and the users
+    # table is not consulted at all.
+    AUTH_PRINCIPAL_CACHE_SECONDS: int = Field(60, env="AUTH_PRINCIPAL_CACHE_SECONDS")
+    AUTH_CLAIMS_ONLY: bool = Field(False, env="AUTH_CLAIMS_ONLY")
+
+    # bcrypt runs on its own thread pool; calls beyond MAX_PENDING get a 503
+    PASSWORD_HASH_WORKERS: int = Field(2, env="PASSWORD_HASH_WORKERS")
+    PASSWORD_HASH_MAX_PENDING: int = Field(32, env="PASSWORD_HASH_MAX_PENDING")
+
+    # Login attempts allowed per window, per username and per client IP
+    LOGIN_ATTEMPTS_PER_USERNAME: int = Field(10, env="LOGIN_ATTEMPTS_PER_USERNAME")
+    LOGIN_ATTEMPTS_PER_IP: int = Field(50, env="LOGIN_ATTEMPTS_PER_IP")
+    LOGIN_THROTTLE_WINDOW_SECONDS: int = Field(60, env="LOGIN_THROTTLE_WINDOW_SECONDS")
 
     # OpenAI / AI
     OPENAI_API_KEY: Optional[str] = Field(None, env="OPENAI_API_KEY")
@@ -48,11 +95,17 @@ class Settings(BaseSettings):
 
     # Logging
     LOG_LEVEL: str = Field("INFO", env="LOG_LEVEL")
+    # records are formatted and written by a background thread; when this many
+    # are waiting, new ones are dropped (and counted) instead of blocking
+    LOG_QUEUE_SIZE: int = Field(10000, env="LOG_QUEUE_SIZE")
+    # fraction of records kept per event name, e.g. '{"ai_http_response": 0.1}';
+    # warnings and errors are always kept
+    LOG_SAMPLE_RATES: Dict[str, float] = Field(
+        default_factory=dict, env="LOG_SAMPLE_RATES"
+    )
 
     # CORS
-    ALLOWED_ORIGINS: List[str] = Field(
-        default_factory=list, env="ALLOWED_ORIGINS"
-    )
+    ALLOWED_ORIGINS: List[str] = Field(default_factory=list, env="ALLOWED_ORIGINS")
 
     # Admin defaults
     ADMIN_USERNAME: str = Field("admin", env="ADMIN_USERNAME")
@@ -60,6 +113,58 @@ class Settings(BaseSettings):
 
     CLEAR_MENU: bool = Field(False, env="CLEAR_MENU")
 
+    # Brand registry refresh (brands are written by seed_raw, outside the API)
+    BRAND_REGISTRY_REFRESH_SECONDS: int = Field(
+        300, env="BRAND_REGISTRY_REFRESH_SECONDS"
+    )
+
+    # Prometheus-format metrics for this worker on GET /metrics
+    METRICS_ENABLED: bool = Field(True, env="METRICS_ENABLED")
+
+    # SQL statements and DB time per request (logged, and with HEADERS on sent
+    # as X-DB-Queries / X-DB-Time-Ms -- for dev and tests, not for clients in
+    # production). A route running more statements than its budget logs a
+    # warning; budgets are keyed by method and route template, e.g.
+    # '{"POST /orders/": 4}', and the default applies to the rest (0: none)
+    QUERY_STATS_ENABLED: bool = Field(True, env="QUERY_STATS_ENABLED")
+    QUERY_STATS_HEADERS: bool = Field(False, env="QUERY_STATS_HEADERS")
+    QUERY_BUDGET_DEFAULT: int = Field(10, env="QUERY_BUDGET_DEFAULT")
+    QUERY_BUDGETS: Dict[str, int] = Field(default_factory=dict, env="QUERY_BUDGETS")
+    # the same SQL this many times in one request is reported as a likely N+1
+    QUERY_REPEAT_WARN: int = Field(5, env="QUERY_REPEAT_WARN")
+
+    # Order stats reconcile (repairs drift in the in-process summary; 0 disables)
+    ORDER_STATS_RECONCILE_SECONDS: int = Field(300, env="ORDER_STATS_RECONCILE_SECONDS")
+
+    # Analytics rollups (hour/day buckets are cut in this timezone)
+    ANALYTICS_ROLLUPS_ENABLED: bool = Field(True, env="ANALYTICS_ROLLUPS_ENABLED")
+    ANALYTICS_TIMEZONE: str = Field("UTC", env="ANALYTICS_TIMEZONE")
+
+    # Idempotency-Key support on POST /orders: "memory" (per process) or
+    # "postgres" (shared by all workers; keyed orders then always commit in
+    # their own request, bypassing ORDER_INGEST_MODE=batched)
+    IDEMPOTENCY_STORE: str = Field("memory", env="IDEMPOTENCY_STORE")
+    IDEMPOTENCY_TTL_SECONDS: int = Field(86400, env="IDEMPOTENCY_TTL_SECONDS")
+
+    # Order ingestion: "direct" commits each order in its request; "batched"
+    # queues validated orders and group-commits them from background workers
+    # (any other value fails at startup)
+    ORDER_INGEST_MODE: Literal["direct", "batched"] = Field(
+        "direct", env="ORDER_INGEST_MODE"
+    )
+    ORDER_INGEST_MAX_BATCH: int = Field(50, env="ORDER_INGEST_MAX_BATCH")
+    ORDER_INGEST_MAX_WAIT_MS: int = Field(10, env="ORDER_INGEST_MAX_WAIT_MS")
+    ORDER_INGEST_WORKERS: int = Field(2, env="ORDER_INGEST_WORKERS")
+
+    # Live admin order feed (one LISTEN connection per worker)
+    ORDER_EVENTS_ENABLED: bool = Field(True, env="ORDER_EVENTS_ENABLED")
+
+    # HTTP caching (Cache-Control on public GETs)
+    HTTP_CACHE_MAX_AGE: int = Field(30, env="HTTP_CACHE_MAX_AGE")
+    HTTP_CACHE_STALE_WHILE_REVALIDATE: int = Field(
+        300, env="HTTP_CACHE_STALE_WHILE_REVALIDATE"
+    )
+
     # ---------------------------------------------------
     # ✅ PYDANTIC V2 CONFIG (ONLY THIS — NO class Config)
     # ---------------------------------------------------
@@ -86,6 +191,7 @@ class Settings(BaseSettings):
         if s.startswith("[") and s.endswith("]"):
             try:
                 import json
+
                 parsed = json.loads(s)
                 if isinstance(parsed, list):
                     return parsed
@@ -101,7 +207,8 @@ class Settings(BaseSettings):
 
         if env in ("production", "staging") and provider == "openai" and not v:
             raise ValueError(
-                "OPENAI_API_KEY is required for openai provider in non-development environments"
+                "OPENAI_API_KEY is required for openai provider "
+                "in non-development environments"
             )
         return v
 
@@ -114,4 +221,4 @@ def get_settings() -> Settings:
     return Settings()
 
 
-settings = get_settings()
\ No newline at end of file
+settings = get_settings()
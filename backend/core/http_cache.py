@@ -0,0 +1,73 @@
+import hashlib
+import uuid
+from typing import Optional
+
+from core.config import settings
+from starlette.requests import Request
+from starlette.responses import Response
+
+# distinguishes ETags minted from per-process counters, so two workers whose
+# counters happen to line up never validate each other's responses
+PROCESS_EPOCH = uuid.uuid4().hex
+
+
+def public_cache_control() -> str:
+    """Cache-Control for anonymous storefront reads a CDN may share."""
+    return (
+        f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, "
+        f"stale-while-revalidate={settings.HTTP_CACHE_STALE_WHILE_REVALIDATE}"
+    )
+
+
+# must revalidate every time, but a matching ETag makes that a cheap 304
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Build a strong ETag from version components (counters, filters, epoch)."""
+    raw = "|".join(str(p) for p in parts).encode("utf-8")
+    return '"' + hashlib.blake2b(raw, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # weak comparison per RFC 9110 13.1.2: W/"x" matches "x"
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": cache_control}
+    )
+
+
+def conditional_json(
+    request: Request, body: bytes, etag: str, cache_control: str, status_code: int = 200
+) -> Response:
+    """Return 304 when the client already holds `etag`, else the pre-rendered body."""
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
+
+
+def set_validators(
+    response: Response, etag: str, cache_control: Optional[str] = None
+) -> None:
+    response.headers["ETag"] = etag
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
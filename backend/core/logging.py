@@ -1,9 +1,82 @@
-import logging
+import atexit
 import json
+import logging
+import queue
+import random
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
 from core.config import settings
+from core.metrics import registry
 from core.request_id import get_request_id
 
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is slower
+    orjson = None
+
+log_records_dropped = registry.counter(
+    "log_records_dropped_total", "Log records dropped because the queue was full."
+)
+log_records_sampled_out = registry.counter(
+    "log_records_sampled_out_total",
+    "Log records skipped by LOG_SAMPLE_RATES.",
+    ("event",),
+)
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = frozenset(
+    {
+        "name",
+        "msg",
+        "args",
+        "levelname",
+        "levelno",
+        "pathname",
+        "filename",
+        "module",
+        "exc_info",
+        "exc_text",
+        "stack_info",
+        "lineno",
+        "funcName",
+        "created",
+        "msecs",
+        "relativeCreated",
+        "thread",
+        "threadName",
+        "processName",
+        "process",
+        "message",
+        "taskName",
+    }
+)
+
+
+def _fallback(value):
+    # values the encoder doesn't know are logged as their str()
+    return str(value)
+
+
+# orjson would write datetimes and dataclasses itself (RFC 3339, objects); pass
+# them to _fallback so lines look the same whichever encoder is installed. Still
+# encoder-specific: enums without a str/int mixin (value vs str()), and dict keys
+# other than str/int/float/bool/None (orjson writes them, json raises TypeError)
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None
+    else 0
+)
+
+
+def _dumps(payload: dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_fallback, option=_ORJSON_OPTIONS).decode()
+    return json.dumps(payload, default=_fallback)
+
 
 # -----------------------------
 # JSON LOG FORMATTER
@@ -21,25 +94,16 @@ class JSONFormatter(logging.Formatter):
             "message": record.getMessage(),
         }
 
-        # safely include extra fields
-        reserved = {
-            "name", "msg", "args", "levelname", "levelno",
-            "pathname", "filename", "module", "exc_info",
-            "exc_text", "stack_info", "lineno", "funcName",
-            "created", "msecs", "relativeCreated", "thread",
-            "threadName", "processName", "process"
-        }
-
+        # include extra fields; anything not JSON-native is stringified in the
+        # same encoding pass
         for key, value in record.__dict__.items():
-            if key in reserved or key in payload:
+            if key in _RESERVED or key in payload:
                 continue
-            try:
-                json.dumps(value)
-                payload[key] = value
-            except Exception:
-                pass
+            payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
 
-        return json.dumps(payload)
+        return _dumps(payload)
 
 
 # -----------------------------
@@ -54,16 +118,83 @@ class RequestIDFilter(logging.Filter):
         return True
 
 
+# -----------------------------
+# PER-EVENT SAMPLING
+# -----------------------------
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records for high-volume events.
+
+    Records are keyed by their message, which in this codebase is the event
+    name (`logger.info("ai_http_response", extra=...)`). Warnings and errors
+    are never sampled out.
+    """
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        self.rates = dict(rates)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not isinstance(record.msg, str):
+            return True
+        rate = self.rates.get(record.msg)
+        if rate is None or random.random() < rate:
+            return True
+        log_records_sampled_out.inc(record.msg)
+        return False
+
+
+# -----------------------------
+# QUEUED OUTPUT
+# -----------------------------
+class DroppingQueueHandler(QueueHandler):
+    """Hand records to the writer thread without ever blocking the caller.
+
+    Only context-bound state is captured here (the message and request id);
+    JSON encoding and the write happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # wait for room rather than failing when the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[_Listener] = None
+
+
+def _output_handler() -> logging.Handler:
+    handler = logging.StreamHandler()
+    handler.setFormatter(JSONFormatter())
+    return handler
+
+
 # -----------------------------
 # PRODUCTION JSON LOGGING
 # -----------------------------
 def configure_logging() -> None:
+    global _listener
     level = (settings.LOG_LEVEL or "INFO").upper()
     numeric_level = getattr(logging, level, logging.INFO)
 
-    handler = logging.StreamHandler()
-    handler.setFormatter(JSONFormatter())
+    stop_logging()
+    records: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = DroppingQueueHandler(records)
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
     handler.addFilter(RequestIDFilter())
+    _listener = _Listener(records, _output_handler())
+    _listener.start()
 
     root = logging.getLogger()
 
@@ -73,6 +204,24 @@ def configure_logging() -> None:
     root.setLevel(numeric_level)
 
 
+def stop_logging() -> None:
+    """Flush queued records and switch to direct (synchronous) output."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    root = logging.getLogger()
+    if any(isinstance(h, DroppingQueueHandler) for h in root.handlers):
+        root.handlers.clear()
+        handler = _output_handler()
+        handler.addFilter(RequestIDFilter())
+        root.addHandler(handler)
+
+
+atexit.register(stop_logging)
+
+
 # -----------------------------
 # EARLY STARTUP LOGGING
 # -----------------------------
@@ -82,4 +231,4 @@ def setup_logging(level: str = "INFO") -> None:
     logging.basicConfig(
         level=numeric_level,
         format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-    )
\ No newline at end of file
+    )
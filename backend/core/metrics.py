@@ -0,0 +1,322 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Each worker process keeps its own registry and serves it on `/metrics`; the
+scraper aggregates across workers (scrape each one, or sum by instance).
+Metrics are updated from the event loop only, so recording is a dict lookup
+and an integer add with no locks. Values that already live elsewhere (pool
+state, queue depths) are read at scrape time through collector callbacks.
+"""
+
+import math
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# seconds; tuned for API calls (sub-millisecond cache hits up to slow AI calls)
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+
+    def _key(self, labels: Sequence[str]) -> LabelValues:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}")
+        return tuple(str(v) for v in labels)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """A running total, or one read from `fn` at scrape time."""
+
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        fn: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(name, doc, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._fn = fn
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self._fn is not None:
+            yield "", "", self._fn()
+            return
+        if not self.label_names and not self._values:
+            yield "", "", 0
+        for key, value in sorted(self._values.items()):
+            yield "", _format_labels(self.label_names, key), value
+
+
+class Gauge(_Metric):
+    """A settable value, or one read from `fn` at scrape time."""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        fn: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(name, doc, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._fn = fn
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        if self._fn is not None:
+            return self._fn()
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self._fn is not None:
+            yield "", "", self._fn()
+            return
+        if not self.label_names and not self._values:
+            yield "", "", 0
+        for key, value in sorted(self._values.items()):
+            yield "", _format_labels(self.label_names, key), value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last)], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        # counts are stored per bucket and made cumulative when rendered
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._values.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def summary(self, *labels: str) -> Dict[str, Optional[float]]:
+        """Count, sum, mean and bucket-resolution p50/p95/p99 for one label set.
+
+        A quantile is reported as the upper bound of the bucket it falls in
+        (None when that is the +Inf bucket).
+        """
+        series = self._values.get(self._key(labels))
+        counts, total = series if series else ([0] * (len(self.buckets) + 1), [0.0])
+        n = sum(counts)
+        out: Dict[str, Optional[float]] = {
+            "count": n,
+            "sum": total[0],
+            "mean": total[0] / n if n else None,
+        }
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            out[name] = None
+            if not n:
+                continue
+            rank = q * n
+            running = 0
+            for bound, c in zip(self.buckets, counts):
+                running += c
+                if running >= rank:
+                    out[name] = bound
+                    break
+        return out
+
+    def samples(self):
+        for key, (counts, total) in sorted(self._values.items()):
+            running = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                running += n
+                labels = _format_labels(
+                    self.label_names + ("le",), key + (_format_value(bound),)
+                )
+                yield "_bucket", labels, running
+            labels = _format_labels(self.label_names, key)
+            yield "_sum", labels, total[0]
+            yield "_count", labels, running
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        fn: Optional[Callable[[], float]] = None,
+    ) -> Counter:
+        return self.register(Counter(name, doc, labels, fn))
+
+    def gauge(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        fn: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        return self.register(Gauge(name, doc, labels, fn))
+
+    def histogram(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, doc, labels, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# HTTP (recorded by core.middleware.metrics)
+http_requests = registry.counter(
+    "http_requests_total",
+    "Requests by route template and status.",
+    ("method", "route", "status"),
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time to the end of the response body, by route template.",
+    ("method", "route"),
+)
+http_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests currently being handled."
+)
+
+# database pool (recorded by database.py)
+db_pool_checkouts = registry.counter(
+    "db_pool_checkouts_total", "Connections handed out by the pool."
+)
+db_pool_wait = registry.histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+# statements per request (recorded by core.middleware.query_stats)
+db_queries = registry.histogram(
+    "db_queries_per_request",
+    "SQL statements run by requests that used the database, by route template.",
+    ("method", "route"),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+query_budget_exceeded = registry.counter(
+    "db_query_budget_exceeded_total",
+    "Requests that ran more statements than their route's budget.",
+    ("method", "route"),
+)
+
+# AI provider (recorded by services.ai.service)
+ai_request_duration = registry.histogram(
+    "ai_request_duration_seconds",
+    "AI provider call latency per attempt, by outcome.",
+    ("provider", "outcome"),
+)
+ai_request_errors = registry.counter(
+    "ai_request_errors_total", "Failed AI provider attempts.", ("provider", "kind")
+)
+ai_time_to_first_token = registry.histogram(
+    "ai_time_to_first_token_seconds",
+    "Time from sending a streamed AI request to its first text delta.",
+    ("provider",),
+)
+
+# orders (recorded by services.order_service)
+orders_created = registry.counter(
+    "orders_created_total", "Orders committed by this worker.", ("mode",)
+)
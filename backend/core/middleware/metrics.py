@@ -0,0 +1,47 @@
+import time
+
+from core.metrics import http_in_flight, http_request_duration, http_requests
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# label for requests no route matched (404s, probes), so paths can't blow up
+# the label set
+_UNMATCHED = "unmatched"
+
+
+class MetricsMiddleware:
+    """Record count, latency and in-flight requests per route template.
+
+    The label is the matched route's path template (`/orders/{order_id}`), read
+    from the scope after routing, never the raw URL. Latency runs until the
+    last body chunk is sent, so streaming responses are measured in full.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or _UNMATCHED
+            method = scope["method"]
+            http_requests.inc(method, template, str(status))
+            http_request_duration.observe(
+                time.perf_counter() - started, method, template
+            )
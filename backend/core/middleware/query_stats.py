@@ -0,0 +1,76 @@
+import logging
+
+from core.config import settings
+from core.metrics import db_queries, query_budget_exceeded
+from core.query_stats import QueryStats, track
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_UNMATCHED = "unmatched"
+
+
+class QueryStatsMiddleware:
+    """Count SQL statements and DB time per request (see core.query_stats).
+
+    - adds `X-DB-Queries` and `X-DB-Time-Ms` headers (counted up to the moment
+      the response starts; a streaming body may run more)
+    - logs `request_queries` with the final totals per route template
+    - warns `query_budget_exceeded` when a route runs more statements than its
+      budget, and `query_repeated` when one statement runs over and over
+
+    Install inside RequestIDMiddleware so the stats carry the request id.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track() as stats:
+
+            async def send_with_stats(message: Message) -> None:
+                if message["type"] == "http.response.start" and (
+                    settings.QUERY_STATS_HEADERS
+                ):
+                    message["headers"] = list(message.get("headers", ())) + [
+                        (b"x-db-queries", str(stats.count).encode()),
+                        (b"x-db-time-ms", f"{stats.seconds * 1000:.1f}".encode()),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                route = scope.get("route")
+                _report(
+                    scope["method"], getattr(route, "path", None) or _UNMATCHED, stats
+                )
+
+
+def _report(method: str, template: str, stats: QueryStats) -> None:
+    if not stats.count:
+        return
+    db_queries.observe(stats.count, method, template)
+    extra = {
+        "method": method,
+        "route": template,
+        "queries": stats.count,
+        "db_ms": round(stats.seconds * 1000, 1),
+    }
+    budget = settings.QUERY_BUDGETS.get(
+        f"{method} {template}", settings.QUERY_BUDGET_DEFAULT
+    )
+    if budget and stats.count > budget:
+        query_budget_exceeded.inc(method, template)
+        logger.warning("query_budget_exceeded", extra={**extra, "budget": budget})
+    else:
+        logger.info("request_queries", extra=extra)
+    for statement, times in stats.repeated(settings.QUERY_REPEAT_WARN):
+        logger.warning(
+            "query_repeated",
+            extra={**extra, "statement": statement[:500], "times": times},
+        )
@@ -1,33 +1,57 @@
 import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-from typing import Callable
 
 from core.request_id import request_id_var
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+_HEADER = b"x-request-id"
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
+
+class RequestIDMiddleware:
     """Attach a UUID4 request id to each request and expose it via contextvar.
 
     - preserves incoming `X-Request-ID` header when present
     - sets `request.state.request_id`
     - adds `X-Request-ID` header to responses
     - ensures contextvar is reset after request
+
+    Plain ASGI: the app runs in the caller's task and body messages are passed
+    through untouched, so streaming responses are not buffered or re-chunked.
     """
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        incoming = request.headers.get("X-Request-ID")
-        rid = incoming if incoming else str(uuid.uuid4())
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = None
+        for name, value in scope["headers"]:
+            if name == _HEADER:
+                rid = value.decode("latin-1")
+                break
+        if not rid:
+            rid = str(uuid.uuid4())
+        raw_rid = rid.encode("latin-1")
         # set on request.state for application code
-        request.state.request_id = rid
+        scope.setdefault("state", {})["request_id"] = rid
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [
+                    (k, v)
+                    for k, v in message.get("headers", ())
+                    if k.lower() != _HEADER
+                ]
+                headers.append((_HEADER, raw_rid))
+                message["headers"] = headers
+            await send(message)
+
         # set context var for logging filter
         token = request_id_var.set(rid)
         try:
-            response = await call_next(request)
-            # ensure header is present in response
-            response.headers["X-Request-ID"] = rid
-            return response
+            await self.app(scope, receive, send_with_request_id)
         finally:
             # restore prior context
             request_id_var.reset(token)
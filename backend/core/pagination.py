@@ -0,0 +1,23 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque keyset cursor for `(created_at, id)` ordering."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of `encode_cursor`; raises ValueError on anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = (
+            base64.urlsafe_b64decode(padded.encode("ascii"))
+            .decode("utf-8")
+            .split("|", 1)
+        )
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
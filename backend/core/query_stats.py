@@ -0,0 +1,93 @@
+"""Count SQL statements and time spent in the database per request.
+
+`instrument(engine)` hooks the engine's cursor events; statements are counted
+into the `QueryStats` of the current context, which `track()` opens (the
+QueryStatsMiddleware opens one per request, tagged with its request id).
+Statements run outside any tracked context are not counted.
+
+The stats object is shared, not copied, by tasks and threads started from the
+request, so work the handler hands off is counted too.
+"""
+
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from core.request_id import get_request_id
+from sqlalchemy import event
+
+
+@dataclass
+class QueryStats:
+    request_id: Optional[str] = None
+    count: int = 0
+    seconds: float = 0.0
+    # executions per SQL text; the same text many times over is an N+1 loop
+    statements: Counter = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements executed at least `threshold` times, most frequent first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track() -> Iterator[QueryStats]:
+    """Count the statements run in this context (and tasks it starts)."""
+    stats = QueryStats(request_id=get_request_id())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        # one start time per execution context: a statement that raises never
+        # reaches after_cursor_execute, so nothing may be left on the connection
+        context._query_started = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = getattr(context, "_query_started", None)
+    if started is not None:
+        stats.seconds += time.perf_counter() - started
+    stats.count += 1
+    stats.statements[statement] += 1
+
+
+def instrument(engine) -> None:
+    """Count statements run on `engine` (sync or async) into the current stats."""
+    target = getattr(engine, "sync_engine", engine)
+    event.listen(target, "before_cursor_execute", _before_execute)
+    event.listen(target, "after_cursor_execute", _after_execute)
+
+
+@contextmanager
+def assert_num_queries(expected: int) -> Iterator[QueryStats]:
+    """Test helper: fail unless exactly `expected` statements run in the block.
+
+        with assert_num_queries(2):
+            await create_order(session, order_in)
+
+    Requests made through a test client are tracked by the middleware in the
+    client's own thread; pin those with the X-DB-Queries response header.
+    """
+    with track() as stats:
+        yield stats
+    if stats.count != expected:
+        ran = "\n".join(f"  {n}x {sql}" for sql, n in stats.statements.items())
+        raise AssertionError(f"expected {expected} queries, ran {stats.count}:\n{ran}")
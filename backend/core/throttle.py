@@ -0,0 +1,48 @@
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class RateLimiter:
+    """Fixed-window attempt counter per key, kept in process memory.
+
+    `hit` records an attempt and returns None if it is allowed, or the number
+    of seconds until the key's window resets if the key is over `limit`.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int = 100_000) -> None:
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._windows: Dict[Hashable, Tuple[float, int]] = {}
+
+    def hit(self, key: Hashable) -> Optional[float]:
+        now = time.monotonic()
+        started, count = self._windows.get(key, (now, 0))
+        if now - started >= self.window:
+            started, count = now, 0
+        count += 1
+        self._windows[key] = (started, count)
+        if len(self._windows) > self.max_keys:
+            self._prune(now)
+        if count > self.limit:
+            return max(0.0, started + self.window - now)
+        return None
+
+    def reset(self, key: Hashable) -> None:
+        self._windows.pop(key, None)
+
+    def _prune(self, now: float) -> None:
+        expired = [
+            k
+            for k, (started, _) in self._windows.items()
+            if now - started >= self.window
+        ]
+        for k in expired:
+            del self._windows[k]
+        # still too many live keys (e.g. a spray from many addresses): drop the oldest
+        overflow = len(self._windows) - self.max_keys
+        if overflow > 0:
+            for k in sorted(self._windows, key=lambda k: self._windows[k][0])[
+                :overflow
+            ]:
+                del self._windows[k]
@@ -1,48 +1,267 @@
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import migrations
 from core.config import settings
-from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
+from core.metrics import db_pool_checkouts, db_pool_wait, registry
+from core.query_stats import instrument
+from fastapi import Request
+from services.cache import menu_cache, order_cache
+from services.replica import read_after, replica_monitor
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 DATABASE_URL = str(settings.DATABASE_URL)
 
 if not DATABASE_URL:
-    raise RuntimeError('DATABASE_URL must be set in .env or environment')
-
-# Handle `sslmode` query param (common with managed Postgres providers like Neon).
-# asyncpg does not accept `sslmode` keyword; translate it into connect_args ssl.
-from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
-
-parts = urlsplit(DATABASE_URL)
-qs = dict(parse_qsl(parts.query))
-connect_args = {}
-# Remove known asyncpg-incompatible params and enable ssl via connect_args
-removed = False
-for k in ('sslmode', 'channel_binding'):
-    if k in qs:
-        qs.pop(k, None)
-        removed = True
-if removed:
+    raise RuntimeError("DATABASE_URL must be set in .env or environment")
+
+
+def _split_url(url: str) -> Tuple[str, Dict[str, Any]]:
+    """Return the URL without params asyncpg rejects, and the asyncpg connect args.
+
+    `sslmode` (common with managed Postgres providers like Neon) is not an
+    asyncpg keyword; it is translated into connect_args ssl.
+    """
+    parts = urlsplit(url)
+    qs = dict(parse_qsl(parts.query))
+    removed = False
+    for k in ("sslmode", "channel_binding"):
+        if k in qs:
+            qs.pop(k, None)
+            removed = True
+    if not removed:
+        return url, {}
     new_query = urlencode(qs, doseq=True)
-    DATABASE_URL = urlunsplit((parts.scheme, parts.netloc, parts.path, new_query, parts.fragment))
-    connect_args = {"ssl": True}
-
-engine: AsyncEngine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    future=True,
-    connect_args=connect_args,
-    pool_pre_ping=True,
+    url = urlunsplit(
+        (parts.scheme, parts.netloc, parts.path, new_query, parts.fragment)
+    )
+    return url, {"ssl": True}
+
+
+def _uses_pgbouncer(url: str) -> bool:
+    if settings.DB_PGBOUNCER is not None:
+        return settings.DB_PGBOUNCER
+    # Neon's pooled endpoints are "<endpoint>-pooler.<region>..."
+    return "-pooler." in (urlsplit(url).hostname or "")
+
+
+def _statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+DATABASE_URL, connect_args = _split_url(DATABASE_URL)
+PGBOUNCER = _uses_pgbouncer(DATABASE_URL)
+
+
+def _direct_url(url: str) -> str:
+    # Neon serves the same database without the pooler on the host minus "-pooler"
+    parts = urlsplit(url)
+    if "-pooler." not in (parts.hostname or ""):
+        return url
+    netloc = parts.netloc.replace("-pooler.", ".", 1)
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, parts.fragment))
+
+
+# LISTEN and migrations need one server connection for their whole session
+DIRECT_URL, direct_connect_args = (
+    _split_url(str(settings.DATABASE_DIRECT_URL))
+    if settings.DATABASE_DIRECT_URL
+    else (_direct_url(DATABASE_URL), connect_args)
 )
+
+
+def engine_connect_args(base: Dict[str, Any], pgbouncer: bool) -> Dict[str, Any]:
+    args = dict(base)
+    if pgbouncer:
+        # transaction pooling runs each transaction on whichever server connection
+        # is free, so a statement prepared on one may be missing (or its name
+        # taken) on the next: cache nothing, and never reuse a name
+        args["prepared_statement_cache_size"] = 0
+        args["statement_cache_size"] = 0
+        args["prepared_statement_name_func"] = _statement_name
+    elif settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        # startup parameter, so it costs nothing per query (PgBouncer rejects it;
+        # see _set_statement_timeout)
+        args["server_settings"] = {
+            "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)
+        }
+    return args
+
+
+def _set_statement_timeout(conn):
+    # session settings don't survive transaction pooling; one SET LOCAL per
+    # transaction is the price of a timeout there
+    conn.exec_driver_sql(
+        f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}"
+    )
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """The default async pool, recording how long each checkout waited."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait.observe(time.perf_counter() - started)
+
+
+def _create_engine(url: str, base_args: Dict[str, Any], **kw) -> AsyncEngine:
+    pgbouncer = _uses_pgbouncer(url)
+    created = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        connect_args=engine_connect_args(base_args, pgbouncer),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        **kw,
+    )
+    if pgbouncer and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        event.listen(created.sync_engine, "begin", _set_statement_timeout)
+    if settings.QUERY_STATS_ENABLED:
+        instrument(created)
+    return created
+
+
+engine: AsyncEngine = _create_engine(
+    DATABASE_URL, connect_args, poolclass=TimedQueuePool
+)
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _count_checkout(dbapi_conn, conn_record, conn_proxy):
+    db_pool_checkouts.inc()
+
+
+registry.gauge("db_pool_size", "Configured pool size.", fn=lambda: engine.pool.size())
+registry.gauge(
+    "db_pool_checked_out",
+    "Connections in use.",
+    fn=lambda: engine.pool.checkedout(),
+)
+registry.gauge(
+    "db_pool_overflow",
+    "Connections open beyond the pool size (negative: unused capacity).",
+    fn=lambda: engine.pool.overflow(),
+)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Live usage of this worker's pool and how long checkouts have waited."""
+    pool = engine.pool
+    return {
+        "pgbouncer": PGBOUNCER,
+        "replica": (
+            None
+            if replica_engine is None
+            else {
+                "healthy": replica_monitor.healthy,
+                "lag_seconds": replica_monitor.lag,
+                "checked_out": replica_engine.pool.checkedout(),
+            }
+        ),
+        "size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "checkouts": db_pool_checkouts.value(),
+        "wait_seconds": db_pool_wait.summary(),
+    }
+
+
 SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
+# read-only handlers may use this when it has caught up (see services.replica)
+replica_engine: Optional[AsyncEngine] = None
+ReplicaSessionLocal: Optional[async_sessionmaker] = None
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = _create_engine(*_split_url(str(settings.DATABASE_REPLICA_URL)))
+    ReplicaSessionLocal = async_sessionmaker(
+        bind=replica_engine, expire_on_commit=False
+    )
+    menu_cache.track_changes = order_cache.track_changes = True
+
+    @event.listens_for(replica_engine.sync_engine, "handle_error")
+    def _replica_error(ctx):
+        # stop routing reads there until the next successful probe
+        if ctx.is_disconnect or ctx.connection is None:
+            replica_monitor.mark_down()
+
 
 async def get_session() -> AsyncSession:
     async with SessionLocal() as session:
         yield session
 
 
+@asynccontextmanager
+async def read_session(after: float = 0.0) -> AsyncIterator[AsyncSession]:
+    """A session for reads that must include writes committed before `after`.
+
+    Bound to the replica when one is configured and has caught up, otherwise
+    to the primary. Never write through it.
+    """
+    if ReplicaSessionLocal is not None and replica_monitor.usable(after):
+        factory = ReplicaSessionLocal
+    else:
+        factory = SessionLocal
+    async with factory() as session:
+        yield session
+
+
+async def get_read_session(request: Request) -> AsyncSession:
+    """`get_session` for read-only GET handlers; honours the client's X-Read-After."""
+    async with read_session(read_after(request)) as session:
+        yield session
+
+
+def is_replica(session: AsyncSession) -> bool:
+    return replica_engine is not None and session.bind is replica_engine
+
+
 async def init_db():
-    # create tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Bring the schema up to date by applying pending migrations (see migrations/)."""
+    if PGBOUNCER and DIRECT_URL == DATABASE_URL:
+        # the migration lock is session-level; a transaction-mode pooler would
+        # strand it on some server connection
+        raise RuntimeError(
+            "DATABASE_DIRECT_URL is required to migrate through a transaction-mode "
+            "pooler (or set DB_MIGRATE_ON_STARTUP=false and run migrate.py)"
+        )
+    ddl_engine = engine
+    if PGBOUNCER:
+        ddl_engine = create_async_engine(
+            DIRECT_URL, connect_args=direct_connect_args, poolclass=NullPool
+        )
+    try:
+        async with ddl_engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            applied = await conn.run_sync(migrations.upgrade)
+        for migration in applied:
+            logger.info(
+                "migration_applied",
+                extra={"version": migration.version, "migration": migration.name},
+            )
+    finally:
+        if ddl_engine is not engine:
+            await ddl_engine.dispose()
@@ -0,0 +1,518 @@
+"""Drive the real app in-process with a mixed workload; report latency per route.
+
+Requests go through main.app (all middleware, real handlers) over an ASGI
+transport against DATABASE_URL, so point it at a local Postgres with menus
+loaded (seed_raw.py). Orders placed here are real rows: use a scratch
+database. The AI provider is replaced by a mock transport whose replies take
+--ai-latency-ms, so no API key is needed and nothing is billed.
+
+Each virtual user loops over scenarios picked by weight (--mix) until
+--duration seconds pass; the first --warmup seconds are not recorded.
+
+    python loadgen.py --users 50 --duration 60 --out runs/$(date +%F).json
+
+The JSON report has throughput, errors and p50/p95/p99 per route, plus the
+settings that shape the numbers, so runs can be compared over time.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+from core.config import settings
+
+# scenario weights
+DEFAULT_MIX = {"browse": 60, "order": 15, "admin": 15, "ai": 10}
+
+_AI_REPLY = (
+    "Our paneer butter masala is mildly spiced and pairs well with garlic naan. "
+    "For something lighter, try the dal tadka with jeera rice."
+)
+
+
+_USAGE = {"prompt_tokens": 40, "completion_tokens": 30, "total_tokens": 70}
+
+
+class _PacedStream(httpx.AsyncByteStream):
+    """Server-sent chunks released like a model generating them."""
+
+    def __init__(self, chunks: List[bytes], first: float, gap: float) -> None:
+        self.chunks = chunks
+        self.first = first
+        self.gap = gap
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.first)
+        for chunk in self.chunks:
+            yield chunk
+            await asyncio.sleep(self.gap)
+
+
+class MockAITransport(httpx.AsyncBaseTransport):
+    """OpenAI-compatible chat completions that finish after `latency`.
+
+    With `"stream": true` the first token comes after a quarter of it and the
+    rest are spread over the remainder, as server-sent events.
+    """
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(await request.aread() or b"{}")
+        if not body.get("stream"):
+            await asyncio.sleep(self.latency)
+            return httpx.Response(
+                200,
+                json={
+                    "choices": [{"message": {"content": _AI_REPLY}}],
+                    "usage": _USAGE,
+                },
+            )
+        words = [w + " " for w in _AI_REPLY.split(" ")]
+        events = [{"choices": [{"delta": {"content": w}}]} for w in words]
+        events.append({"choices": [], "usage": _USAGE})
+        chunks = [f"data: {json.dumps(e)}\n\n".encode() for e in events]
+        chunks.append(b"data: [DONE]\n\n")
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "text/event-stream"},
+            stream=_PacedStream(
+                chunks, self.latency / 4, self.latency * 3 / 4 / len(chunks)
+            ),
+        )
+
+
+class _BodyStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: "asyncio.Queue", app_task, disconnected) -> None:
+        self.chunks = chunks
+        self.app_task = app_task
+        self.disconnected = disconnected
+
+    async def __aiter__(self):
+        while True:
+            chunk = await self.chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    async def aclose(self) -> None:
+        # a client that stops reading has disconnected, as far as the app knows
+        self.disconnected.set()
+        await asyncio.gather(self.app_task, return_exceptions=True)
+
+
+class StreamingASGITransport(httpx.AsyncBaseTransport):
+    """Like httpx.ASGITransport, but the body is handed over as the app sends it.
+
+    httpx's own transport (as of 0.24) collects the whole response first, which
+    would hide the time to first byte of streamed responses.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request.method,
+            "scheme": request.url.scheme,
+            "path": request.url.path,
+            "raw_path": request.url.raw_path.split(b"?")[0],
+            "query_string": request.url.query,
+            "root_path": "",
+            "headers": [(k.lower(), v) for k, v in request.headers.raw],
+            "server": (request.url.host, request.url.port or 80),
+            "client": ("127.0.0.1", 0),
+        }
+        received = False
+        disconnected = asyncio.Event()
+        chunks: asyncio.Queue = asyncio.Queue()
+        started = asyncio.get_running_loop().create_future()
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                started.set_result(message)
+            elif message["type"] == "http.response.body" and message.get("body"):
+                chunks.put_nowait(message["body"])
+
+        async def run():
+            try:
+                await self.app(scope, receive, send)
+            except BaseException as e:
+                if not started.done():
+                    started.set_exception(e)
+                raise
+            finally:
+                chunks.put_nowait(None)
+
+        app_task = asyncio.create_task(run())
+        start = await started
+        return httpx.Response(
+            start["status"],
+            headers=start.get("headers", []),
+            stream=_BodyStream(chunks, app_task, disconnected),
+        )
+
+
+def _install_mock_ai(latency: float) -> None:
+    from services.ai import service as ai_service
+    from services.ai.adapter import AIAdapter
+
+    settings.AI_PROVIDER = "openai"
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "sk-load-test"
+    adapter = AIAdapter()
+    adapter.client = httpx.AsyncClient(
+        base_url=adapter.base_url,
+        transport=MockAITransport(latency),
+        event_hooks={
+            "request": [adapter._on_request],
+            "response": [adapter._on_response],
+        },
+    )
+    ai_service._adapter = adapter
+
+
+def percentile(ordered: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list (None when empty)."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(len(ordered) * p + 0.5) - 1))]
+
+
+class Recorder:
+    """Latency samples and errors per route label."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, label: str, seconds: float, status: Optional[int]) -> None:
+        if not self.enabled:
+            return
+        self.samples[label].append(seconds)
+        self.statuses[label][str(status) if status else "exception"] += 1
+        if status is None or status >= 500:
+            self.errors[label] += 1
+
+    async def request(
+        self, client: httpx.AsyncClient, label: str, method: str, url: str, **kw
+    ) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kw)
+        except Exception:
+            self.record(label, time.perf_counter() - started, None)
+            return None
+        self.record(label, time.perf_counter() - started, resp.status_code)
+        return resp
+
+    async def stream(
+        self, client: httpx.AsyncClient, label: str, method: str, url: str, **kw
+    ) -> None:
+        """Read a streamed body, recording time to first chunk and to the end."""
+        started = time.perf_counter()
+        status = None
+        try:
+            async with client.stream(method, url, **kw) as resp:
+                status = resp.status_code
+                first = None
+                async for _ in resp.aiter_bytes():
+                    if first is None:
+                        first = time.perf_counter() - started
+                        self.record(f"{label} (first byte)", first, status)
+        except Exception:
+            status = None
+        self.record(label, time.perf_counter() - started, status)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        routes = {}
+        for label in sorted(self.samples):
+            ordered = sorted(self.samples[label])
+            routes[label] = _stats(ordered, self.errors[label], elapsed)
+            routes[label]["statuses"] = dict(self.statuses[label])
+        everything = sorted(s for samples in self.samples.values() for s in samples)
+        return {
+            "routes": routes,
+            "total": _stats(everything, sum(self.errors.values()), elapsed),
+        }
+
+
+def _stats(ordered: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 2) if elapsed else None,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else None,
+        "p50_ms": ms(percentile(ordered, 0.50)),
+        "p95_ms": ms(percentile(ordered, 0.95)),
+        "p99_ms": ms(percentile(ordered, 0.99)),
+        "max_ms": ms(ordered[-1]) if ordered else None,
+    }
+
+
+class Catalog:
+    """Brands and available item ids, read through the API once at start."""
+
+    def __init__(self, menus: Dict[str, List[dict]]) -> None:
+        self.menus = {slug: items for slug, items in menus.items() if items}
+        if not self.menus:
+            raise RuntimeError("no brands with available items; run seed_raw.py")
+        self.slugs = list(self.menus)
+        self.words = sorted(
+            {
+                w.lower()
+                for items in self.menus.values()
+                for i in items
+                for w in i["name"].split()
+                if len(w) > 3
+            }
+        ) or ["masala"]
+
+    @classmethod
+    async def load(cls, client: httpx.AsyncClient) -> "Catalog":
+        brands = (await client.get("/brands/")).json()
+        menus = {}
+        for brand in brands:
+            resp = await client.get(f"/menu/{brand['slug']}")
+            menus[brand["slug"]] = resp.json()["menu"] if resp.is_success else []
+        return cls(menus)
+
+
+class User:
+    """One virtual user: picks scenarios by weight and keeps per-user state."""
+
+    def __init__(self, client, rec: Recorder, catalog: Catalog, rng: random.Random):
+        self.client = client
+        self.rec = rec
+        self.catalog = catalog
+        self.rng = rng
+        # the admin page's last ETag, sent back like a polling dashboard would
+        self.admin_etag: Optional[str] = None
+
+    async def browse(self) -> None:
+        slug = self.rng.choice(self.catalog.slugs)
+        await self.rec.request(self.client, "GET /brands/", "GET", "/brands/")
+        await self.rec.request(
+            self.client, "GET /menu/{brand_key}", "GET", f"/menu/{slug}"
+        )
+        if self.rng.random() < 0.3:
+            await self.rec.request(
+                self.client,
+                "GET /menu/search",
+                "GET",
+                "/menu/search",
+                params={"q": self.rng.choice(self.catalog.words)[:4]},
+            )
+
+    async def order(self) -> None:
+        slug = self.rng.choice(self.catalog.slugs)
+        await self.rec.request(
+            self.client, "GET /menu/{brand_key}", "GET", f"/menu/{slug}"
+        )
+        items = self.rng.sample(
+            self.catalog.menus[slug], k=min(len(self.catalog.menus[slug]), 4)
+        )
+        cart = [
+            {"menu_item_id": i["id"], "quantity": self.rng.randint(1, 3)}
+            for i in items[: self.rng.randint(1, len(items))]
+        ]
+        resp = await self.rec.request(
+            self.client,
+            "POST /orders/",
+            "POST",
+            "/orders/",
+            json={"brand_slug": slug, "items": cart},
+            headers={"Idempotency-Key": str(uuid.uuid4())},
+        )
+        if resp is None or resp.status_code != 201:
+            return
+        # the confirmation page reads the order back, as the frontend does
+        headers = {}
+        if "X-Read-After" in resp.headers:
+            headers["X-Read-After"] = resp.headers["X-Read-After"]
+        await self.rec.request(
+            self.client,
+            "GET /orders/{order_id}",
+            "GET",
+            f"/orders/{resp.json()['id']}",
+            headers=headers,
+        )
+
+    async def admin(self) -> None:
+        headers = {"If-None-Match": self.admin_etag} if self.admin_etag else {}
+        resp = await self.rec.request(
+            self.client,
+            "GET /admin/orders/",
+            "GET",
+            "/admin/orders/",
+            params={"limit": 50},
+            headers=headers,
+        )
+        if resp is not None and "ETag" in resp.headers:
+            self.admin_etag = resp.headers["ETag"]
+        await self.rec.request(
+            self.client, "GET /admin/orders/stats", "GET", "/admin/orders/stats"
+        )
+
+    async def ai(self) -> None:
+        await self.rec.stream(
+            self.client,
+            "POST /ai/test",
+            "POST",
+            "/ai/test",
+            json={"message": "What would you recommend for a mild dinner?"},
+        )
+
+    async def run(self, mix: Dict[str, int], deadline: float, think: float) -> None:
+        names, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+            if think > 0:
+                await asyncio.sleep(self.rng.expovariate(1 / think))
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def main(args) -> Dict[str, Any]:
+    from auth import create_access_token
+    from main import app
+
+    settings.LOG_LEVEL = args.log_level
+    mix = json.loads(args.mix) if args.mix else DEFAULT_MIX
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise SystemExit(f"unknown scenarios in --mix: {', '.join(sorted(unknown))}")
+    rec = Recorder()
+    await app.router.startup()
+    # after startup, so the adapter it validated is replaced
+    _install_mock_ai(args.ai_latency_ms / 1000)
+    try:
+        token = create_access_token({"sub": settings.ADMIN_USERNAME})
+        async with httpx.AsyncClient(
+            transport=StreamingASGITransport(app),
+            base_url="http://load-test",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=60,
+        ) as client:
+            catalog = await Catalog.load(client)
+            rng = random.Random(args.seed)
+            users = [
+                User(client, rec, catalog, random.Random(rng.random()))
+                for _ in range(args.users)
+            ]
+            started = time.perf_counter()
+            deadline = started + args.warmup + args.duration
+
+            async def start_recording():
+                await asyncio.sleep(args.warmup)
+                rec.enabled = True
+                return time.perf_counter()
+
+            recording = asyncio.create_task(start_recording())
+            await asyncio.gather(*(u.run(mix, deadline, args.think) for u in users))
+            elapsed = time.perf_counter() - await recording
+    finally:
+        await app.router.shutdown()
+
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": _git_revision(),
+        "config": {
+            "users": args.users,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "think_s": args.think,
+            "mix": mix,
+            "ai_latency_ms": args.ai_latency_ms,
+            "seed": args.seed,
+            "order_ingest_mode": settings.ORDER_INGEST_MODE,
+            "db_pool_size": settings.DB_POOL_SIZE,
+            "db_max_overflow": settings.DB_MAX_OVERFLOW,
+        },
+        "elapsed_s": round(elapsed, 3),
+        **rec.summary(elapsed),
+    }
+
+
+def print_table(report: Dict[str, Any], out=sys.stdout) -> None:
+    print(
+        f"{'route':<34} {'count':>7} {'err':>5} {'rps':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}",
+        file=out,
+    )
+    rows = list(report["routes"].items()) + [("total", report["total"])]
+    for label, s in rows:
+        print(
+            f"{label:<34} {s['count']:>7} {s['errors']:>5} {s['rps'] or 0:>8.1f} "
+            + " ".join(
+                f"{s[k]:>8.1f}" if s[k] is not None else f"{'-':>8}"
+                for k in ("p50_ms", "p95_ms", "p99_ms")
+            ),
+            file=out,
+        )
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(
+        description="Mixed-workload load test of the API, in-process"
+    )
+    p.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    p.add_argument("--duration", type=float, default=30, help="recorded seconds")
+    p.add_argument("--warmup", type=float, default=5, help="unrecorded seconds")
+    p.add_argument(
+        "--think", type=float, default=0.0, help="mean pause between scenarios"
+    )
+    p.add_argument(
+        "--mix", help=f"scenario weights as JSON (default {json.dumps(DEFAULT_MIX)})"
+    )
+    p.add_argument("--ai-latency-ms", type=float, default=800)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--log-level", default="WARNING")
+    p.add_argument("--out", help="write the JSON report here ('-': stdout)")
+    a = p.parse_args()
+    result = asyncio.run(main(a))
+    if a.out == "-":
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(result)
+        if a.out:
+            with open(a.out, "w") as f:
+                json.dump(result, f, indent=2)
@@ -1,28 +1,50 @@
+import asyncio
+import logging
+
+from auth import password_hasher
+from core.config import settings
+from core.logging import configure_logging, setup_logging, stop_logging
+from core.metrics import registry as metrics_registry
+from core.middleware.metrics import MetricsMiddleware
+from core.middleware.query_stats import QueryStatsMiddleware
+from core.middleware.request_id import RequestIDMiddleware
+from database import SessionLocal, init_db
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from core.config import settings
-from core.logging import setup_logging, configure_logging
-from routes import brands, menu, orders, admin_menu, auth as auth_routes, admin_orders, ai as ai_routes
-from database import init_db, SessionLocal
-from sqlalchemy import select
+from fastapi.responses import PlainTextResponse
 from models.user import User
-from auth import get_password_hash
-from core.logging import configure_logging
-import logging
+from routes import admin_menu, admin_orders
+from routes import ai as ai_routes
+from routes import analytics
+from routes import auth as auth_routes
+from routes import brands, diagnostics, menu, orders
 from services.ai import shutdown_service
-from core.middleware.request_id import RequestIDMiddleware
+from services.brand_registry import brand_registry
+from services.brand_registry import refresh_periodically as refresh_brands
+from services.idempotency import PostgresIdempotencyStore, idempotency_store
+from services.idempotency import purge_periodically as purge_idempotency_keys
+from services.order_events import order_events
+from services.order_ingest import order_ingest
+from services.order_stats import order_stats
+from services.order_stats import reconcile_periodically as reconcile_order_stats
+from services.replica import monitor_periodically as monitor_replica
+from services.replica import replica_monitor
+from services.search_index import menu_index
+from sqlalchemy import select
 
 # initialize basic logging for production readiness before app creation
 setup_logging()
 
 app = FastAPI(title=settings.APP_NAME)
+# long-running tasks started on startup and cancelled on shutdown
+_background_tasks: list[asyncio.Task] = []
+
+
 # Health check endpoint (Render + monitoring)
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "ok",
-        "service": "sandhya-kitchen-agent"
-    }
+    return {"status": "ok", "service": "sandhya-kitchen-agent"}
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,10 +52,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "ETag",
+        "X-Next-Cursor",
+        "X-Request-ID",
+        "Idempotent-Replayed",
+        "X-Read-After",
+        "X-DB-Queries",
+        "X-DB-Time-Ms",
+    ],
 )
 
+if settings.QUERY_STATS_ENABLED:
+    # inside RequestIDMiddleware, so the stats are tagged with the request id
+    app.add_middleware(QueryStatsMiddleware)
 # attach request id middleware to populate request_id contextvar and response header
 app.add_middleware(RequestIDMiddleware)
+if settings.METRICS_ENABLED:
+    # outermost, so latency includes the other middleware
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(
+            metrics_registry.render(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
 
 
 @app.on_event("startup")
@@ -43,11 +87,42 @@ async def startup_event():
     logger = logging.getLogger(__name__)
     logger.info("application_starting")
 
-    await init_db()
+    if settings.DB_MIGRATE_ON_STARTUP:
+        await init_db()
+    await brand_registry.reload()
+    await menu_index.rebuild()
+    await order_stats.reconcile()
+    if settings.BRAND_REGISTRY_REFRESH_SECONDS > 0:
+        _background_tasks.append(
+            asyncio.create_task(refresh_brands(settings.BRAND_REGISTRY_REFRESH_SECONDS))
+        )
+    if settings.ORDER_STATS_RECONCILE_SECONDS > 0:
+        _background_tasks.append(
+            asyncio.create_task(
+                reconcile_order_stats(settings.ORDER_STATS_RECONCILE_SECONDS)
+            )
+        )
+    if settings.DATABASE_REPLICA_URL:
+        _background_tasks.append(
+            asyncio.create_task(
+                monitor_replica(
+                    replica_monitor, settings.DATABASE_REPLICA_CHECK_SECONDS
+                )
+            )
+        )
+    if settings.ORDER_EVENTS_ENABLED:
+        order_events.start()
+    if settings.ORDER_INGEST_MODE == "batched":
+        order_ingest.start()
+    if isinstance(idempotency_store, PostgresIdempotencyStore):
+        _background_tasks.append(asyncio.create_task(purge_idempotency_keys(3600)))
     # Validate AI provider config early so startup fails fast if secrets are missing
     if settings.AI_PROVIDER and settings.AI_PROVIDER.lower() == "openai":
         if not settings.OPENAI_API_KEY:
-            raise RuntimeError("OPENAI_API_KEY environment variable is required when AI_PROVIDER=openai")
+            raise RuntimeError(
+                "OPENAI_API_KEY environment variable is required "
+                "when AI_PROVIDER=openai"
+            )
     # ensure a default admin user exists (username/password from env or 'admin'/'admin')
     admin_user = settings.ADMIN_USERNAME
     admin_pass = settings.ADMIN_PASSWORD
@@ -56,8 +131,8 @@ async def startup_event():
         res = await session.execute(q)
         existing = res.scalars().first()
         if not existing:
-            hashed = get_password_hash(admin_pass)
-            user = User(username=admin_user, hashed_password=hashed, role='admin')
+            hashed = await password_hasher.hash(admin_pass)
+            user = User(username=admin_user, hashed_password=hashed, role="admin")
             session.add(user)
             await session.commit()
             await session.refresh(user)
@@ -68,11 +143,21 @@ async def startup_event():
 async def shutdown_event():
     logger = logging.getLogger(__name__)
     logger.info("application_shutting_down")
+    # commit queued orders before the process goes away
+    await order_ingest.stop()
+    await order_events.stop()
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+    password_hasher.shutdown()
     try:
         await shutdown_service()
     except Exception:
         logger.exception("error during ai service shutdown")
     logger.info("application_shutdown_complete")
+    # flush queued log records before the process exits
+    stop_logging()
 
 
 app.include_router(brands.router, prefix="/brands", tags=["brands"])
@@ -82,13 +167,17 @@ app.include_router(admin_menu.router, prefix="/admin/menu", tags=["admin_menu"])
 app.include_router(auth_routes.router, prefix="/auth", tags=["auth"])
 app.include_router(admin_orders.router, prefix="/admin/orders", tags=["admin_orders"])
 app.include_router(ai_routes.router, prefix="/ai", tags=["ai"])
+app.include_router(analytics.router, prefix="/admin/analytics", tags=["analytics"])
+app.include_router(
+    diagnostics.router, prefix="/admin/diagnostics", tags=["diagnostics"]
+)
 
 
 @app.get("/", tags=["health"])
-def health_check():
+def root():
     return {"status": "Sandhya Kitchen API running"}
 
 
 @app.get("/health")
 def readiness():
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
@@ -0,0 +1,30 @@
+import asyncio
+import sys
+
+import migrations
+from database import DIRECT_URL, direct_connect_args, init_db
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+
+async def status():
+    engine = create_async_engine(
+        DIRECT_URL, connect_args=direct_connect_args, poolclass=NullPool
+    )
+    try:
+        async with engine.begin() as conn:
+            applied = set(await conn.run_sync(migrations.applied_versions))
+    finally:
+        await engine.dispose()
+    for m in migrations.discover():
+        mark = "applied" if m.version in applied else "pending"
+        print(f"{m.version:04d} {m.name:<32} {mark}")
+
+
+if __name__ == "__main__":
+    # usage: python migrate.py [status]
+    if sys.argv[1:] == ["status"]:
+        asyncio.run(status())
+    else:
+        asyncio.run(init_db())
+        print("Schema is up to date")
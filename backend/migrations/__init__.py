@@ -0,0 +1,120 @@
+"""Versioned schema migrations; the single definition of the database schema.
+
+Each module in `migrations/versions` defines one `migration`. They are applied
+in version order and recorded in `schema_migrations`, so every database (the
+API's, a scratch one for benchmarks, one built by seed_raw) reaches the same
+schema the same way. The SQLAlchemy models mirror the result; they never
+create tables themselves.
+
+Adding a migration: copy the newest module, bump `version`, and never edit a
+migration once it has been deployed.
+"""
+
+import importlib
+import logging
+import pkgutil
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# serializes migrations when several workers boot at once
+_LOCK_ID = 0x5A4D_1DE8
+
+_CREATE_TABLE_SQL = text("""
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+)
+""")
+_APPLIED_SQL = text("SELECT version FROM schema_migrations")
+_RECORD_SQL = text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)")
+_INDEX_VALID_SQL = text("""
+SELECT i.indisvalid
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = current_schema() AND c.relname = :name
+""")
+_CONCURRENT_INDEX = re.compile(
+    r"^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    statements: Tuple[str, ...]
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction. Such migrations
+    # run one autocommitted statement at a time, so every statement must be
+    # safe to re-run after a failure part-way through.
+    transactional: bool = True
+
+
+def discover() -> List[Migration]:
+    from migrations import versions
+
+    found = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        module = importlib.import_module(f"{versions.__name__}.{info.name}")
+        found.append(module.migration)
+    found.sort(key=lambda m: m.version)
+    numbers = [m.version for m in found]
+    if len(set(numbers)) != len(numbers):
+        raise RuntimeError(f"duplicate migration versions: {numbers}")
+    return found
+
+
+def applied_versions(conn: Connection) -> List[int]:
+    conn.execute(_CREATE_TABLE_SQL)
+    return sorted(conn.execute(_APPLIED_SQL).scalars())
+
+
+def _run_concurrently(conn: Connection, statement: str) -> None:
+    match = _CONCURRENT_INDEX.match(statement)
+    if match:
+        name = match.group(1)
+        if conn.execute(_INDEX_VALID_SQL, {"name": name}).scalar() is False:
+            # left behind by an interrupted build; it is maintained on every
+            # write but never used, and IF NOT EXISTS would keep it, so rebuild
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        logger.info("index_build_started", extra={"index": name})
+    conn.execute(text(statement))
+
+
+def upgrade(conn: Connection) -> List[Migration]:
+    """Apply pending migrations and return them.
+
+    `conn` must be in AUTOCOMMIT mode and hold a real server session (not a
+    transaction-mode pooler): it keeps the advisory lock for the whole run.
+    Transactional migrations run on a second connection from the same engine.
+    """
+    conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": _LOCK_ID})
+    try:
+        done = set(applied_versions(conn))
+        pending = [m for m in discover() if m.version not in done]
+        for migration in pending:
+            logger.info(
+                "migration_started",
+                extra={"version": migration.version, "migration": migration.name},
+            )
+            record = {"v": migration.version, "n": migration.name}
+            if migration.transactional:
+                with conn.engine.begin() as tx:
+                    for statement in migration.statements:
+                        tx.execute(text(statement))
+                    tx.execute(_RECORD_SQL, record)
+            else:
+                for statement in migration.statements:
+                    _run_concurrently(conn, statement)
+                conn.execute(_RECORD_SQL, record)
+        return pending
+    finally:
+        conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _LOCK_ID})
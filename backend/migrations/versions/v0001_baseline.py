@@ -0,0 +1,122 @@
+"""Baseline: the schema `create_all` built before migrations existed.
+
+Every statement is IF NOT EXISTS, so databases created by `create_all` or by
+the old seed_raw DDL are adopted as they are.
+"""
+
+from migrations import Migration
+
+migration = Migration(
+    version=1,
+    name="baseline",
+    statements=(
+        "CREATE SEQUENCE IF NOT EXISTS order_events_seq",
+        """
+        CREATE TABLE IF NOT EXISTS brands (
+            id SERIAL NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            slug VARCHAR(255) NOT NULL,
+            description TEXT,
+            PRIMARY KEY (id),
+            UNIQUE (name),
+            UNIQUE (slug)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_brands_id ON brands (id)",
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL NOT NULL,
+            username VARCHAR(150) NOT NULL,
+            hashed_password VARCHAR(255) NOT NULL,
+            role VARCHAR(50),
+            PRIMARY KEY (id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_users_id ON users (id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username ON users (username)",
+        """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key VARCHAR(255) NOT NULL,
+            fingerprint VARCHAR(64) NOT NULL,
+            status_code INTEGER,
+            response_body BYTEA,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            PRIMARY KEY (key)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_idempotency_keys_expires_at"
+        " ON idempotency_keys (expires_at)",
+        """
+        CREATE TABLE IF NOT EXISTS menu_items (
+            id SERIAL NOT NULL,
+            brand_id INTEGER NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            price FLOAT NOT NULL,
+            category VARCHAR(100),
+            available BOOLEAN NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(brand_id) REFERENCES brands (id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_menu_items_id ON menu_items (id)",
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+            id SERIAL NOT NULL,
+            brand_id INTEGER NOT NULL,
+            total FLOAT NOT NULL,
+            status VARCHAR(50),
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            PRIMARY KEY (id),
+            FOREIGN KEY(brand_id) REFERENCES brands (id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_orders_id ON orders (id)",
+        """
+        CREATE TABLE IF NOT EXISTS order_items (
+            id SERIAL NOT NULL,
+            order_id INTEGER NOT NULL,
+            menu_item_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            price FLOAT NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(order_id) REFERENCES orders (id),
+            FOREIGN KEY(menu_item_id) REFERENCES menu_items (id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_order_items_id ON order_items (id)",
+        """
+        CREATE TABLE IF NOT EXISTS revenue_rollups (
+            id SERIAL NOT NULL,
+            granularity VARCHAR(8) NOT NULL,
+            bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+            brand_id INTEGER NOT NULL,
+            order_count INTEGER NOT NULL,
+            revenue FLOAT NOT NULL,
+            cancelled_count INTEGER NOT NULL,
+            PRIMARY KEY (id),
+            CONSTRAINT ux_revenue_rollups_bucket
+                UNIQUE (granularity, brand_id, bucket_start),
+            FOREIGN KEY(brand_id) REFERENCES brands (id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_revenue_rollups_granularity_bucket"
+        " ON revenue_rollups (granularity, bucket_start)",
+        """
+        CREATE TABLE IF NOT EXISTS item_sales_rollups (
+            id SERIAL NOT NULL,
+            granularity VARCHAR(8) NOT NULL,
+            bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+            brand_id INTEGER NOT NULL,
+            menu_item_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            revenue FLOAT NOT NULL,
+            PRIMARY KEY (id),
+            CONSTRAINT ux_item_sales_rollups_bucket
+                UNIQUE (granularity, bucket_start, brand_id, menu_item_id),
+            FOREIGN KEY(brand_id) REFERENCES brands (id),
+            FOREIGN KEY(menu_item_id) REFERENCES menu_items (id)
+        )
+        """,
+    ),
+)
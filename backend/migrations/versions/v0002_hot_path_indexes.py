@@ -0,0 +1,32 @@
+"""Indexes for the queries every request path filters on.
+
+Built concurrently so a live database keeps taking writes while they build.
+Single-column indexes on orders(created_at), orders(status), orders(brand_id)
+would be redundant: each is the leading column of a keyset index below.
+"""
+
+from migrations import Migration
+
+migration = Migration(
+    version=2,
+    name="hot_path_indexes",
+    transactional=False,
+    statements=(
+        # admin order list, newest first; per brand; per status
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_created_at_id"
+        " ON orders (created_at, id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_brand_created_at_id"
+        " ON orders (brand_id, created_at, id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_status_created_at_id"
+        " ON orders (status, created_at, id)",
+        # order detail and the admin list load items by order
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_order_items_order_id"
+        " ON order_items (order_id)",
+        # public menu
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_menu_items_brand_id_available"
+        " ON menu_items (brand_id, available)",
+        # seed_raw upserts menu items on (brand_id, name)
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_menu_items_brand_name"
+        " ON menu_items (brand_id, name)",
+    ),
+)
@@ -1,5 +1,15 @@
 from .brand import Brand
+from .idempotency import IdempotencyKey
 from .menu_item import MenuItem
 from .order import Order, OrderItem
+from .rollup import ItemSalesRollup, RevenueRollup
 
-__all__ = ["Brand", "MenuItem", "Order", "OrderItem"]
+__all__ = [
+    "Brand",
+    "MenuItem",
+    "Order",
+    "OrderItem",
+    "IdempotencyKey",
+    "ItemSalesRollup",
+    "RevenueRollup",
+]
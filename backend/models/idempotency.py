@@ -0,0 +1,16 @@
+from database import Base
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+from sqlalchemy.sql import func
+
+
+class IdempotencyKey(Base):
+    """Response saved for an `Idempotency-Key`, committed with the order it created."""
+
+    __tablename__ = "idempotency_keys"
+    key = Column(String(255), primary_key=True)
+    # sha256 of the request body; a key reused with another body is rejected
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
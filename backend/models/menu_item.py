@@ -1,15 +1,23 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
 from database import Base
+from sqlalchemy import Boolean, Column, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
 
 
 class MenuItem(Base):
-    __tablename__ = 'menu_items'
+    __tablename__ = "menu_items"
     id = Column(Integer, primary_key=True, index=True)
-    brand_id = Column(Integer, ForeignKey('brands.id'), nullable=False)
+    brand_id = Column(Integer, ForeignKey("brands.id"), nullable=False)
     name = Column(String(255), nullable=False)
     price = Column(Float, nullable=False)
     category = Column(String(100))
     available = Column(Boolean, nullable=False, default=True)
 
     brand = relationship("Brand", back_populates="menu_items")
+
+    # the schema itself is defined by migrations/; these mirror it
+    __table_args__ = (
+        # public menu: available items of one brand
+        Index("ix_menu_items_brand_id_available", "brand_id", "available"),
+        # seed_raw upserts on (brand_id, name)
+        Index("ux_menu_items_brand_name", "brand_id", "name", unique=True),
+    )
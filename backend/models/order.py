@@ -1,25 +1,56 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, func
-from sqlalchemy.orm import relationship
 from database import Base
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    Sequence,
+    String,
+    func,
+)
+from sqlalchemy.orm import relationship
+
+VALID_STATUSES = {
+    "pending",
+    "confirmed",
+    "preparing",
+    "ready",
+    "delivered",
+    "cancelled",
+}
+
+# ids for the live order feed (services/order_events); shared by every worker
+ORDER_EVENTS_SEQ = Sequence("order_events_seq", metadata=Base.metadata)
 
 
 class Order(Base):
-    __tablename__ = 'orders'
+    __tablename__ = "orders"
     id = Column(Integer, primary_key=True, index=True)
-    brand_id = Column(Integer, ForeignKey('brands.id'), nullable=False)
+    brand_id = Column(Integer, ForeignKey("brands.id"), nullable=False)
     total = Column(Float, nullable=False)
-    status = Column(String(50), default='pending')
+    status = Column(String(50), default="pending")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    items = relationship(
+        "OrderItem", back_populates="order", cascade="all, delete-orphan"
+    )
     brand = relationship("Brand", back_populates="orders")
 
+    # keyset pagination walks (created_at, id) newest-first, optionally per brand/status
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_brand_created_at_id", "brand_id", "created_at", "id"),
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+    )
+
 
 class OrderItem(Base):
-    __tablename__ = 'order_items'
+    __tablename__ = "order_items"
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey('orders.id'), nullable=False)
-    menu_item_id = Column(Integer, ForeignKey('menu_items.id'), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
 
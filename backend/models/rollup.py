@@ -0,0 +1,58 @@
+from database import Base
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+
+# bucket sizes maintained for every rollup table
+GRANULARITIES = ("hour", "day")
+
+
+class RevenueRollup(Base):
+    """Per brand, per hour/day: orders placed, net revenue and cancellations."""
+
+    __tablename__ = "revenue_rollups"
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String(8), nullable=False)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    brand_id = Column(Integer, ForeignKey("brands.id"), nullable=False)
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    cancelled_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # upsert target; also serves per-brand range scans
+        UniqueConstraint(
+            "granularity", "brand_id", "bucket_start", name="ux_revenue_rollups_bucket"
+        ),
+        Index("ix_revenue_rollups_granularity_bucket", "granularity", "bucket_start"),
+    )
+
+
+class ItemSalesRollup(Base):
+    """Per brand and menu item, per hour/day: units and revenue (net of cancels)."""
+
+    __tablename__ = "item_sales_rollups"
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String(8), nullable=False)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    brand_id = Column(Integer, ForeignKey("brands.id"), nullable=False)
+    menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "granularity",
+            "bucket_start",
+            "brand_id",
+            "menu_item_id",
+            name="ux_item_sales_rollups_bucket",
+        ),
+    )
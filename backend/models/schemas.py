@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
 from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
 from pydantic import BaseModel as PydBase
+from pydantic import Field
 
 
 class MenuItemOut(BaseModel):
@@ -13,6 +15,16 @@ class MenuItemOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class MenuSearchHit(BaseModel):
+    id: int
+    brand_id: int
+    name: str
+    price: float
+    category: Optional[str]
+    available: bool
+    score: float
+
+
 class BrandOut(BaseModel):
     id: int
     name: str
@@ -78,6 +90,22 @@ class AdminOrderOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class RevenueBucketOut(BaseModel):
+    bucket_start: datetime
+    brand_id: int
+    order_count: int
+    revenue: float
+    cancelled_count: int
+
+
+class TopItemOut(BaseModel):
+    menu_item_id: int
+    brand_id: int
+    name: Optional[str] = None
+    quantity: int
+    revenue: float
+
+
 class OrderStatusUpdate(PydBase):
     status: str
 
@@ -1,25 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List, Optional
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+
+from auth import require_admin
 from database import get_session
+from fastapi import APIRouter, Depends, HTTPException
 from models.menu_item import MenuItem
 from models.order import OrderItem
-from models.brand import Brand
-from models.schemas import MenuItemOut, MenuItemCreate, MenuItemUpdate
-from auth import require_admin
+from models.schemas import MenuItemCreate, MenuItemOut, MenuItemUpdate
+from services.brand_registry import brand_registry
+from services.cache import menu_cache, orders_version
+from services.order_events import notify_menu_changed
+from services.search_index import menu_index
+from sqlalchemy import func, not_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
 # admin auth is handled by `auth.require_admin` dependency (JWT)
 
 
+async def _update_item(session: AsyncSession, item_id: int, **values) -> MenuItem:
+    # UPDATE ... RETURNING: one round trip instead of a SELECT, an UPDATE and a
+    # refresh
+    q = (
+        update(MenuItem)
+        .where(MenuItem.id == item_id)
+        .values(**values)
+        .returning(MenuItem)
+    )
+    item = (await session.execute(q)).scalars().first()
+    if not item:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    return item
+
+
 @router.post("/", response_model=MenuItemOut)
-async def create_menu_item(payload: MenuItemCreate, _=Depends(require_admin), session: AsyncSession = Depends(get_session)):
+async def create_menu_item(
+    payload: MenuItemCreate,
+    _=Depends(require_admin),
+    session: AsyncSession = Depends(get_session),
+):
     # ensure brand exists
-    q = select(Brand).where(Brand.id == payload.brand_id)
-    res = await session.execute(q)
-    brand = res.scalars().first()
+    brand = await brand_registry.resolve(payload.brand_id)
     if not brand:
         raise HTTPException(status_code=404, detail="Brand not found")
 
@@ -31,14 +52,22 @@ async def create_menu_item(payload: MenuItemCreate, _=Depends(require_admin), se
         available=payload.available if payload.available is not None else True,
     )
     session.add(item)
+    await notify_menu_changed(session, item.brand_id)
+    # sessions keep attributes after commit and the INSERT returned the id, so
+    # no refresh is needed
     await session.commit()
-    await session.refresh(item)
+    menu_cache.invalidate_tag(item.brand_id)
+    orders_version.bump()
+    menu_index.upsert(item)
     return MenuItemOut.from_orm(item)
 
 
-
 @router.get("/", response_model=List[MenuItemOut])
-async def list_all_items(brand_id: Optional[int] = None, _=Depends(require_admin), session: AsyncSession = Depends(get_session)):
+async def list_all_items(
+    brand_id: Optional[int] = None,
+    _=Depends(require_admin),
+    session: AsyncSession = Depends(get_session),
+):
     """Admin-only: list all menu items. If `brand_id` is provided, filter by brand."""
     q = select(MenuItem)
     if brand_id is not None:
@@ -49,60 +78,59 @@ async def list_all_items(brand_id: Optional[int] = None, _=Depends(require_admin
 
 
 @router.put("/{item_id}", response_model=MenuItemOut)
-async def update_menu_item(item_id: int, payload: MenuItemUpdate, _=Depends(require_admin), session: AsyncSession = Depends(get_session)):
-    q = select(MenuItem).where(MenuItem.id == item_id)
-    res = await session.execute(q)
-    item = res.scalars().first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Menu item not found")
-
-    if payload.name is not None:
-        item.name = payload.name
-    if payload.price is not None:
-        item.price = payload.price
-    if payload.category is not None:
-        item.category = payload.category
-    if payload.available is not None:
-        item.available = payload.available
-
-    session.add(item)
+async def update_menu_item(
+    item_id: int,
+    payload: MenuItemUpdate,
+    _=Depends(require_admin),
+    session: AsyncSession = Depends(get_session),
+):
+    values = payload.model_dump(exclude_none=True)
+    if values:
+        item = await _update_item(session, item_id, **values)
+    else:
+        item = await session.get(MenuItem, item_id)
+        if not item:
+            raise HTTPException(status_code=404, detail="Menu item not found")
+
+    await notify_menu_changed(session, item.brand_id)
     await session.commit()
-    await session.refresh(item)
+    menu_cache.invalidate_tag(item.brand_id)
+    orders_version.bump()
+    menu_index.upsert(item)
     return MenuItemOut.from_orm(item)
 
 
 @router.patch("/{item_id}/toggle", response_model=MenuItemOut)
-async def toggle_menu_item(item_id: int, _=Depends(require_admin), session: AsyncSession = Depends(get_session)):
-    q = select(MenuItem).where(MenuItem.id == item_id)
-    res = await session.execute(q)
-    item = res.scalars().first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Menu item not found")
-
-    item.available = False if item.available else True
-    session.add(item)
+async def toggle_menu_item(
+    item_id: int, _=Depends(require_admin), session: AsyncSession = Depends(get_session)
+):
+    item = await _update_item(session, item_id, available=not_(MenuItem.available))
+    await notify_menu_changed(session, item.brand_id)
     await session.commit()
-    await session.refresh(item)
+    menu_cache.invalidate_tag(item.brand_id)
+    orders_version.bump()
+    menu_index.upsert(item)
     return MenuItemOut.from_orm(item)
 
 
 @router.delete("/{item_id}")
-async def delete_menu_item(item_id: int, _=Depends(require_admin), session: AsyncSession = Depends(get_session)):
+async def delete_menu_item(
+    item_id: int, _=Depends(require_admin), session: AsyncSession = Depends(get_session)
+):
     # do not allow deletion if referenced in order_items
     q_ref = select(func.count(OrderItem.id)).where(OrderItem.menu_item_id == item_id)
     res_ref = await session.execute(q_ref)
     cnt = res_ref.scalar_one()
     if cnt and cnt > 0:
-        raise HTTPException(status_code=400, detail="Cannot delete menu item referenced by orders")
-
-    q = select(MenuItem).where(MenuItem.id == item_id)
-    res = await session.execute(q)
-    item = res.scalars().first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Menu item not found")
+        raise HTTPException(
+            status_code=400, detail="Cannot delete menu item referenced by orders"
+        )
 
     # soft delete by marking unavailable
-    item.available = False
-    session.add(item)
+    item = await _update_item(session, item_id, available=False)
+    await notify_menu_changed(session, item.brand_id)
     await session.commit()
+    menu_cache.invalidate_tag(item.brand_id)
+    orders_version.bump()
+    menu_index.upsert(item)
     return {"detail": "deleted (soft)"}
@@ -1,81 +1,291 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Literal, Optional
+
+from auth import require_admin
+from core.http_cache import (
+    PRIVATE_REVALIDATE,
+    PROCESS_EPOCH,
+    conditional_json,
+    etag_matches,
+    make_etag,
+    not_modified,
+    set_validators,
+)
+from core.pagination import decode_cursor, encode_cursor
+from database import get_read_session, get_session, is_replica
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from models.order import VALID_STATUSES, Order, OrderItem
+from models.schemas import AdminOrderOut, OrderItemOut, OrderStatusUpdate
+from services import rollups
+from services.brand_registry import brand_registry
+from services.cache import order_cache, orders_version, render_json
+from services.order_events import RESET, notify_status_changed, order_events
+from services.order_export import iter_orders_csv, iter_orders_ndjson
+from services.order_stats import order_stats
+from services.order_waiters import order_waiters
+from services.replica import READ_AFTER_HEADER, replica_monitor, write_marker
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
-from database import get_session
-from models.order import Order, OrderItem
-from models.brand import Brand
-from models.schemas import AdminOrderOut, OrderItemOut, OrderStatusUpdate
-from auth import require_admin
 
 router = APIRouter()
 
-VALID_STATUSES = {"pending", "confirmed", "preparing", "ready", "delivered", "cancelled"}
-
 
 @router.get("/", response_model=list[AdminOrderOut])
-async def list_orders(_=Depends(require_admin), session: AsyncSession = Depends(get_session)):
-    q = select(Order).options(selectinload(Order.items).selectinload(OrderItem.menu_item)).order_by(Order.created_at.desc())
+async def list_orders(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(
+        None, description="value of X-Next-Cursor from the previous page"
+    ),
+    brand: Optional[str] = Query(None, description="brand id or slug"),
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    _=Depends(require_admin),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Newest-first page of orders using keyset pagination on (created_at, id).
+
+    The next page's cursor is returned in the `X-Next-Cursor` header (absent on
+    the last page), so the body stays a plain list.
+    """
+    # the version only covers other workers' writes while the order feed is up;
+    # otherwise validate against the page contents (query runs, transfer doesn't)
+    etag = None
+    if order_events.connected:
+        etag = make_etag(
+            "admin-orders", PROCESS_EPOCH, orders_version.value, request.url.query
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag, PRIVATE_REVALIDATE)
+        if is_replica(session) and not replica_monitor.usable(
+            orders_version.changed_at
+        ):
+            # the replica may not have the write behind this version yet, so
+            # it can't label the page; validate against the contents instead
+            etag = None
+
+    q = select(Order).options(
+        selectinload(Order.items).selectinload(OrderItem.menu_item)
+    )
+    if cursor:
+        try:
+            after_ts, after_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid cursor")
+        q = q.where(tuple_(Order.created_at, Order.id) < tuple_(after_ts, after_id))
+    if brand:
+        info = await brand_registry.resolve(brand)
+        if not info:
+            raise HTTPException(status_code=404, detail="Brand not found")
+        q = q.where(Order.brand_id == info.id)
+    if status:
+        if status not in VALID_STATUSES:
+            raise HTTPException(status_code=400, detail="invalid status")
+        q = q.where(Order.status == status)
+    if created_from:
+        q = q.where(Order.created_at >= created_from)
+    if created_to:
+        q = q.where(Order.created_at < created_to)
+    # fetch one extra row to learn whether another page exists
+    q = q.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1)
     res = await session.execute(q)
     orders = res.scalars().all()
+    page = orders[:limit]
 
     out = []
-    for o in orders:
+    for o in page:
         items = []
         for it in o.items:
             name = None
-            if getattr(it, 'menu_item', None):
-                name = getattr(it.menu_item, 'name', None)
-            items.append(OrderItemOut(id=it.id, menu_item_id=it.menu_item_id, quantity=it.quantity, price=float(it.price), name=name))
-        out.append(AdminOrderOut(id=o.id, brand_id=o.brand_id, total=float(o.total), status=o.status, created_at=o.created_at, items=items))
+            if getattr(it, "menu_item", None):
+                name = getattr(it.menu_item, "name", None)
+            items.append(
+                OrderItemOut(
+                    id=it.id,
+                    menu_item_id=it.menu_item_id,
+                    quantity=it.quantity,
+                    price=float(it.price),
+                    name=name,
+                )
+            )
+        out.append(
+            AdminOrderOut(
+                id=o.id,
+                brand_id=o.brand_id,
+                total=float(o.total),
+                status=o.status,
+                created_at=o.created_at,
+                items=items,
+            )
+        )
+    if len(orders) > limit:
+        last = page[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+    if etag is None:
+        body = render_json(jsonable_encoder(out))
+        etag = make_etag(
+            "admin-orders-body", hashlib.blake2b(body, digest_size=16).hexdigest()
+        )
+        resp = conditional_json(request, body, etag, PRIVATE_REVALIDATE)
+        if "X-Next-Cursor" in response.headers:
+            resp.headers["X-Next-Cursor"] = response.headers["X-Next-Cursor"]
+        return resp
+    set_validators(response, etag, PRIVATE_REVALIDATE)
     return out
 
 
+@router.get("/export")
+async def export_orders(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    brand: Optional[str] = Query(None, description="brand id or slug"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    _=Depends(require_admin),
+):
+    """Stream every matching order with its line items, oldest first."""
+    brand_id = None
+    if brand:
+        info = await brand_registry.resolve(brand)
+        if not info:
+            raise HTTPException(status_code=404, detail="Brand not found")
+        brand_id = info.id
+    if format == "csv":
+        body, media_type = (
+            iter_orders_csv(brand_id, created_from, created_to),
+            "text/csv",
+        )
+    else:
+        body, media_type = (
+            iter_orders_ndjson(brand_id, created_from, created_to),
+            "application/x-ndjson",
+        )
+    filename = f"orders-{datetime.utcnow():%Y%m%dT%H%M%SZ}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# comment line sent on idle streams so proxies don't time the connection out
+SSE_HEARTBEAT_SECONDS = 15
+
+
+@router.get("/events")
+async def order_event_stream(
+    brand: Optional[str] = Query(
+        None, description="comma-separated brand ids or slugs; default all"
+    ),
+    last_event_id: Optional[int] = Query(
+        None, description="resume after this event id"
+    ),
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+    _=Depends(require_admin),
+):
+    """Server-sent events for new orders and status changes.
+
+    Event types are `order_created`, `order_status_changed` and `reset`; on
+    `reset` the client should re-fetch `/admin/orders/` and `/stats`, since
+    events may have been missed. Reconnect with `Last-Event-ID` to resume.
+
+    While this worker isn't listening (ORDER_EVENTS_ENABLED is off, or the
+    LISTEN connection is down) the answer is 503 and open streams are ended,
+    so clients poll instead of waiting on a silent stream.
+    """
+    if not order_events.connected:
+        raise HTTPException(
+            status_code=503,
+            detail="order feed unavailable",
+            headers={"Retry-After": "5"},
+        )
+    brand_ids = None
+    if brand:
+        brand_ids = set()
+        for key in brand.split(","):
+            info = await brand_registry.resolve(key.strip())
+            if not info:
+                raise HTTPException(
+                    status_code=404, detail=f"Brand not found: {key.strip()}"
+                )
+            brand_ids.add(info.id)
+    resume = last_event_id if last_event_id is not None else last_event_id_header
+    sub = order_events.subscribe(brand_ids, resume)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                head = f"id: {event.id}\n" if event.id is not None else ""
+                yield f"{head}event: {event.type}\ndata: {event.data}\n\n"
+                if event is RESET and not sub.active:
+                    # dropped for falling behind; the client reconnects
+                    return
+        finally:
+            sub.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.patch("/{order_id}/status")
-async def update_status(order_id: int, payload: OrderStatusUpdate, _=Depends(require_admin), session: AsyncSession = Depends(get_session)):
+async def update_status(
+    order_id: int,
+    payload: OrderStatusUpdate,
+    response: Response,
+    _=Depends(require_admin),
+    session: AsyncSession = Depends(get_session),
+):
     new_status = payload.status
     if new_status not in VALID_STATUSES:
         raise HTTPException(status_code=400, detail="invalid status")
-    q = select(Order).where(Order.id == order_id).options(selectinload(Order.items))
+    # lock the row so concurrent changes to one order apply one after another and
+    # each sees the status the previous one left (rollups and stats apply deltas)
+    q = select(Order).where(Order.id == order_id).with_for_update()
     res = await session.execute(q)
     order = res.scalars().first()
     if not order:
         raise HTTPException(status_code=404, detail="order not found")
+    old_status = order.status
+    if old_status == new_status:
+        await session.rollback()
+        return {"detail": "status updated", "status": old_status}
     order.status = new_status
     session.add(order)
+    await rollups.record_status_change(session, order.id, old_status, new_status)
+    xid = await notify_status_changed(
+        session, order.id, order.brand_id, old_status, new_status
+    )
     await session.commit()
-    await session.refresh(order)
-    return {"detail": "status updated", "status": order.status}
+    order_stats.record_status_change(order.brand_id, old_status, new_status, xid)
+    order_cache.invalidate(order_id)
+    order_waiters.notify(order_id)
+    orders_version.bump()
+    response.headers[READ_AFTER_HEADER] = write_marker()
+    return {"detail": "status updated", "status": new_status}
 
 
 @router.get("/stats")
-async def orders_stats(_=Depends(require_admin), session: AsyncSession = Depends(get_session)):
-    # total_orders, total_revenue, pending_count, preparing_count, delivered_count
-    q_total = select(func.count(Order.id))
-    q_revenue = select(func.coalesce(func.sum(Order.total), 0))
-    r_total = await session.execute(q_total)
-    total_orders = r_total.scalar_one()
-    r_rev = await session.execute(q_revenue)
-    total_revenue = float(r_rev.scalar_one() or 0)
-
-    def status_count(status_name):
-        q = select(func.count(Order.id)).where(Order.status == status_name)
-        r = session.execute(q)
-        return r
-
-    # run counts
-    pending_q = await session.execute(select(func.count(Order.id)).where(Order.status == 'pending'))
-    preparing_q = await session.execute(select(func.count(Order.id)).where(Order.status == 'preparing'))
-    delivered_q = await session.execute(select(func.count(Order.id)).where(Order.status == 'delivered'))
-
-    pending_count = pending_q.scalar_one()
-    preparing_count = preparing_q.scalar_one()
-    delivered_count = delivered_q.scalar_one()
-
-    return {
-        "total_orders": int(total_orders),
-        "total_revenue": total_revenue,
-        "pending_count": int(pending_count),
-        "preparing_count": int(preparing_count),
-        "delivered_count": int(delivered_count),
-    }
+async def orders_stats(_=Depends(require_admin)):
+    """Totals, revenue and counts for every status, overall and per brand.
+
+    Served from the in-process `order_stats` summary, so the cost does not grow
+    with the number of orders.
+    """
+    if not order_stats.loaded:
+        await order_stats.reconcile()
+    return order_stats.snapshot()
@@ -1,31 +1,34 @@
+import json
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
-import asyncio
-
-from services.ai import generate_response, AIRequest, health_check
+from services.ai import AIRequest, health_check, stream_response
 
 router = APIRouter()
 
 
+def _sse(data: str, event: Optional[str] = None) -> str:
+    # a line break ends an SSE field, so each line of the payload gets its own
+    # data: field (clients join them back with newlines)
+    lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return (f"event: {event}\n" if event else "") + lines + "\n"
+
+
 async def stream_ai_response(message: str):
-    """Async generator that yields SSE-formatted chunks from the AI reply.
+    """Async generator that yields the AI reply as Server-Sent Events (SSE).
 
-    It calls the existing `generate_response` function to obtain the full reply
-    and then yields it in smaller chunks as Server-Sent Events (SSE).
+    Text is relayed as the provider generates it, one `data:` event per delta,
+    followed by an `event: usage` with the token counts and `data: [DONE]`.
+    If the client disconnects, the generator is closed and the upstream
+    request with it.
     """
     try:
-        # reuse existing service logic to produce the response
-        resp = await generate_response(AIRequest(message=message))
-        text = resp.reply or ''
-
-        # chunk size in characters
-        chunk_size = 60
-        for i in range(0, len(text), chunk_size):
-            chunk = text[i : i + chunk_size]
-            # SSE format: data: <payload>\n\n
-            yield f"data: {chunk}\n\n"
-            # small delay to simulate streaming tokens
-            await asyncio.sleep(0.05)
+        async for event in stream_response(AIRequest(message=message)):
+            if "delta" in event:
+                yield _sse(event["delta"])
+            elif "usage" in event:
+                yield _sse(json.dumps(event["usage"]), event="usage")
 
         # indicate stream end (optional in SSE clients)
         yield "data: [DONE]\n\n"
@@ -38,7 +41,13 @@ async def stream_ai_response(message: str):
 async def ai_test(request: AIRequest):
     try:
         generator = stream_ai_response(request.message)
-        return StreamingResponse(generator, media_type="text/event-stream")
+        return StreamingResponse(
+            generator,
+            media_type="text/event-stream",
+            # deltas must reach the client as they arrive, not when a proxy
+            # buffer fills
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
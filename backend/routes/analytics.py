@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
+
+from auth import require_admin
+from database import get_session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from models.schemas import RevenueBucketOut, TopItemOut
+from services import rollups
+from services.brand_registry import brand_registry
+from sqlalchemy.ext.asyncio import AsyncSession
+
+router = APIRouter()
+
+Granularity = Literal["hour", "day"]
+
+
+async def _brand_id(brand: Optional[str]) -> Optional[int]:
+    if not brand:
+        return None
+    info = await brand_registry.resolve(brand)
+    if not info:
+        raise HTTPException(status_code=404, detail="Brand not found")
+    return info.id
+
+
+def _utc_range(start: datetime, end: datetime):
+    # naive bounds are taken as UTC rather than the server's local time
+    start, end = (
+        d if d.tzinfo else d.replace(tzinfo=timezone.utc) for d in (start, end)
+    )
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    return start, end
+
+
+@router.get("/revenue", response_model=List[RevenueBucketOut])
+async def revenue(
+    start: datetime,
+    end: datetime,
+    granularity: Granularity = "day",
+    brand: Optional[str] = Query(None, description="brand id or slug"),
+    _=Depends(require_admin),
+    session: AsyncSession = Depends(get_session),
+):
+    """Orders, net revenue and cancellations per brand per bucket in [start, end)."""
+    start, end = _utc_range(start, end)
+    return await rollups.revenue_series(
+        session, granularity, start, end, await _brand_id(brand)
+    )
+
+
+@router.get("/top-items", response_model=List[TopItemOut])
+async def top_items(
+    start: datetime,
+    end: datetime,
+    granularity: Granularity = "day",
+    brand: Optional[str] = Query(None, description="brand id or slug"),
+    limit: int = Query(10, ge=1, le=100),
+    _=Depends(require_admin),
+    session: AsyncSession = Depends(get_session),
+):
+    """Best-selling items by units in [start, end); day buckets suit long ranges."""
+    start, end = _utc_range(start, end)
+    return await rollups.top_items(
+        session, granularity, start, end, await _brand_id(brand), limit
+    )
+
+
+@router.post("/backfill", status_code=202)
+async def backfill(since: Optional[datetime] = None, _=Depends(require_admin)):
+    """Start rebuilding rollups for closed days from `since` (default: all history).
+
+    Runs in the background, one day per transaction; the current day is kept
+    up to date by the incremental updates.
+    """
+    if not rollups.start_backfill(since):
+        raise HTTPException(status_code=409, detail="a backfill is already running")
+    return {"detail": "rollup backfill started", "since": since}
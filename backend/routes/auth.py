@@ -1,32 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from datetime import timedelta
 
-from models.user import User
-from models.schemas import Token, LoginRequest, UserOut
+from auth import PasswordHasher, create_access_token, password_hasher, principal_cache
+from core.config import settings
+from core.throttle import RateLimiter
 from database import get_session
-from auth import verify_password, create_access_token, get_password_hash
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from models.schemas import LoginRequest, Token, UserOut
+from models.user import User
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
+# checked before any bcrypt work so a burst of attempts can't tie up the hasher
+_username_attempts = RateLimiter(
+    settings.LOGIN_ATTEMPTS_PER_USERNAME, settings.LOGIN_THROTTLE_WINDOW_SECONDS
+)
+_ip_attempts = RateLimiter(
+    settings.LOGIN_ATTEMPTS_PER_IP, settings.LOGIN_THROTTLE_WINDOW_SECONDS
+)
+
+
+def _throttle(request: Request, username: str) -> None:
+    ip = request.client.host if request.client else "unknown"
+    retry_after = _ip_attempts.hit(ip) or _username_attempts.hit(username.lower())
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
+
+async def _run_hasher(call):
+    try:
+        return await call
+    except PasswordHasher.Overloaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
 
-@router.post('/login', response_model=Token)
-async def login(form: LoginRequest, session: AsyncSession = Depends(get_session)):
+@router.post("/login", response_model=Token)
+async def login(
+    form: LoginRequest, request: Request, session: AsyncSession = Depends(get_session)
+):
+    _throttle(request, form.username)
     q = select(User).where(User.username == form.username)
     res = await session.execute(q)
     user = res.scalars().first()
     if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid credentials')
-    if not verify_password(form.password, user.hashed_password):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid credentials')
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
+        )
+    claims = {"sub": user.username, "uid": user.id, "role": user.role}
+    hashed_password = user.hashed_password
+    # hand the pool connection back before the (slow) bcrypt check
+    await session.rollback()
+    if not await _run_hasher(password_hasher.verify(form.password, hashed_password)):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
+        )
+    _username_attempts.reset(form.username.lower())
     access_token_expires = timedelta(minutes=60)
-    access_token = create_access_token(data={'sub': user.username}, expires_delta=access_token_expires)
-    return {'access_token': access_token, 'token_type': 'bearer'}
+    access_token = create_access_token(data=claims, expires_delta=access_token_expires)
+    return {"access_token": access_token, "token_type": "bearer"}
 
 
 # Utility to create an admin user via API if desired (not exposed by default)
-@router.post('/create-admin', response_model=UserOut)
+@router.post("/create-admin", response_model=UserOut)
 async def create_admin(user_in: UserOut, session: AsyncSession = Depends(get_session)):
     # upsert admin user
     q = select(User).where(User.username == user_in.username)
@@ -36,8 +80,10 @@ async def create_admin(user_in: UserOut, session: AsyncSession = Depends(get_ses
         existing.role = user_in.role
         await session.commit()
         await session.refresh(existing)
+        # cached principals still carry the old role
+        principal_cache.invalidate_user(existing.username)
         return existing
-    hashed = get_password_hash('admin')
+    hashed = await _run_hasher(password_hasher.hash("admin"))
     new = User(username=user_in.username, hashed_password=hashed, role=user_in.role)
     session.add(new)
     await session.commit()
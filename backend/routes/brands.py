@@ -1,17 +1,16 @@
-from fastapi import APIRouter, Depends
 from typing import List
-from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_session
-from models.brand import Brand
+
+from core.http_cache import conditional_json, public_cache_control
+from fastapi import APIRouter, Request
 from models.schemas import BrandOut
-from sqlalchemy import select
+from services.brand_registry import brand_registry
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[BrandOut])
-async def list_brands(session: AsyncSession = Depends(get_session)):
-    q = select(Brand)
-    res = await session.execute(q)
-    brands = res.scalars().all()
-    return brands
+async def list_brands(request: Request):
+    if not brand_registry.loaded:
+        await brand_registry.reload()
+    snap = brand_registry.snapshot
+    return conditional_json(request, snap.body, snap.etag, public_cache_control())
@@ -0,0 +1,11 @@
+from auth import password_hasher, require_admin
+from database import pool_stats
+from fastapi import APIRouter, Depends
+
+router = APIRouter()
+
+
+@router.get("/")
+async def diagnostics(_=Depends(require_admin)):
+    """Point-in-time counters for this worker process (each worker reports its own)."""
+    return {"password_hasher": password_hasher.stats(), "db_pool": pool_stats()}
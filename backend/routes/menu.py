@@ -1,28 +1,68 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_session
-from models.brand import Brand
+from typing import List, Optional
+
+from core.http_cache import conditional_json, public_cache_control
+from database import read_session
+from fastapi import APIRouter, HTTPException, Query, Request
 from models.menu_item import MenuItem
-from models.schemas import MenuItemOut
+from models.schemas import MenuItemOut, MenuSearchHit
+from services.brand_registry import BrandInfo, brand_registry
+from services.cache import Snapshot, menu_cache, render_json
+from services.replica import read_after
+from services.search_index import menu_index
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
 
-@router.get("/{brand_id}")
-async def get_menu(brand_id: int, session: AsyncSession = Depends(get_session)):
-    q = select(Brand).where(Brand.id == brand_id)
-    res = await session.execute(q)
-    brand = res.scalars().first()
-    if not brand:
-        # try by slug
-        q2 = select(Brand).where(Brand.slug == str(brand_id))
-        r2 = await session.execute(q2)
-        brand = r2.scalars().first()
+async def _load_menu(session: AsyncSession, brand: BrandInfo, version: int):
+    qmi = select(MenuItem).where(
+        MenuItem.brand_id == brand.id, MenuItem.available.is_(True)
+    )
+    rmi = await session.execute(qmi)
+    items = rmi.scalars().all()
+    payload = {
+        "brand": brand.name,
+        "slug": brand.slug,
+        "menu": [MenuItemOut.from_orm(i).model_dump() for i in items],
+    }
+    return Snapshot(version=version, body=render_json(payload), tag=brand.id)
+
+
+@router.get("/search", response_model=List[MenuSearchHit])
+async def search_menu(
+    q: str = Query(..., min_length=1, max_length=100),
+    brand: Optional[str] = Query(
+        None, description="brand id or slug; omit to search all brands"
+    ),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Fuzzy, prefix-aware search over available item names and categories."""
+    brand_id = None
+    if brand:
+        info = await brand_registry.resolve(brand)
+        if not info:
+            raise HTTPException(status_code=404, detail="Brand not found")
+        brand_id = info.id
+    if not menu_index.fresh:
+        await menu_index.refresh()
+    hits = menu_index.search(q, brand_id=brand_id, limit=limit)
+    return [MenuSearchHit(score=score, **doc.as_dict()) for score, doc in hits]
+
+
+@router.get("/{brand_key}")
+async def get_menu(brand_key: str, request: Request):
+    """Menu for a brand addressed by numeric id or slug."""
+    brand = await brand_registry.resolve(brand_key)
     if not brand:
         raise HTTPException(status_code=404, detail="Brand not found")
+    after = read_after(request)
 
-    qmi = select(MenuItem).where(MenuItem.brand_id == brand.id, MenuItem.available == True)
-    rmi = await session.execute(qmi)
-    items = rmi.scalars().all()
-    return {"brand": brand.name, "slug": brand.slug, "menu": [MenuItemOut.from_orm(i) for i in items]}
+    # cache hits never open a session; a load may use the replica once it has
+    # the change that invalidated the previous snapshot
+    async def load(version: int):
+        async with read_session(max(after, menu_cache.changed_at(brand.id))) as db:
+            return await _load_menu(db, brand, version)
+
+    snap = await menu_cache.get_or_load(brand.id, load)
+    return conditional_json(request, snap.body, snap.etag, public_cache_control())
@@ -1,32 +1,149 @@
-from fastapi import APIRouter, HTTPException, Depends
-from models.schemas import OrderCreate, OrderOut
+from typing import Optional
+
+from core.http_cache import PRIVATE_REVALIDATE, conditional_json, etag_matches
+from database import get_session, read_session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from models.order import Order as OrderModel
+from models.order import OrderItem
+from models.schemas import OrderCreate
+from services.cache import Snapshot, order_cache, render_json
+from services.idempotency import IdempotencyConflict, fingerprint, idempotency_store
 from services.order_service import create_order
-from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_session
+from services.order_waiters import TooManyWaiters, order_waiters
+from services.replica import READ_AFTER_HEADER, read_after, write_marker
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from models.order import Order as OrderModel, OrderItem
 
 router = APIRouter()
 
 
 @router.post("/", status_code=201)
-async def post_order(payload: OrderCreate, session: AsyncSession = Depends(get_session)):
+async def post_order(
+    payload: OrderCreate,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", max_length=255
+    ),
+):
+    # responses carry X-Read-After, so the client's next reads include this order
+    # even when they would otherwise be served by a lagging replica
+    if not idempotency_key:
+        try:
+            res = await create_order(session, payload)
+            response.headers[READ_AFTER_HEADER] = write_marker()
+            return res
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+    # retries with the same key get the first response back; only successes are
+    # stored, so a request that failed validation can be fixed and retried
+    fp = fingerprint(payload.model_dump_json().encode())
     try:
-        res = await create_order(session, payload)
-        return res
+        async with idempotency_store.guard(session, idempotency_key, fp) as guard:
+            if guard.replay is not None:
+                return Response(
+                    guard.replay.body,
+                    status_code=guard.replay.status_code,
+                    media_type="application/json",
+                    headers={
+                        "Idempotent-Replayed": "true",
+                        READ_AFTER_HEADER: write_marker(),
+                    },
+                )
+            if idempotency_store.transactional:
+                res = await create_order(
+                    session,
+                    payload,
+                    before_commit=lambda db, res: guard.save(db, 201, res),
+                )
+            else:
+                res = await create_order(session, payload)
+                await guard.save(session, 201, res)
+            response.headers[READ_AFTER_HEADER] = write_marker()
+            return res
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@router.get("/{order_id}")
-async def get_order(order_id: int, session: AsyncSession = Depends(get_session)):
+async def _load_order(session: AsyncSession, order_id: int, version: int):
     # eagerly load related order items to avoid lazy-load IO in async context
-    q = select(OrderModel).options(selectinload(OrderModel.items).selectinload(OrderItem.menu_item)).where(OrderModel.id == order_id)
+    q = (
+        select(OrderModel)
+        .options(selectinload(OrderModel.items).selectinload(OrderItem.menu_item))
+        .where(OrderModel.id == order_id)
+    )
     r = await session.execute(q)
     order = r.scalars().first()
     if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+        return None
     # build response
-    items = [ {"menu_item_id": it.menu_item_id, "quantity": it.quantity, "price": it.price} for it in order.items ]
-    return {"id": order.id, "brand_id": order.brand_id, "total": order.total, "status": order.status, "created_at": order.created_at.isoformat(), "items": items}
+    items = [
+        {"menu_item_id": it.menu_item_id, "quantity": it.quantity, "price": it.price}
+        for it in order.items
+    ]
+    payload = {
+        "id": order.id,
+        "brand_id": order.brand_id,
+        "total": order.total,
+        "status": order.status,
+        "created_at": order.created_at.isoformat(),
+        "items": items,
+    }
+    return Snapshot(version=version, body=render_json(payload), tag=order.id)
+
+
+@router.get("/{order_id}")
+async def get_order(order_id: int, request: Request):
+    snap = await _cached_order(order_id, read_after(request))
+    if snap is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return conditional_json(request, snap.body, snap.etag, PRIVATE_REVALIDATE)
+
+
+async def _cached_order(order_id: int, after: float = 0.0):
+    # short-lived session: a waiting request must not hold a pool connection.
+    # A load may use the replica once it has the change that invalidated the
+    # previous snapshot (and the client's own writes).
+    async def load(version: int):
+        fresh_after = max(after, order_cache.changed_at(order_id))
+        async with read_session(fresh_after) as session:
+            return await _load_order(session, order_id, version)
+
+    return await order_cache.get_or_load(order_id, load)
+
+
+@router.get("/{order_id}/wait")
+async def wait_for_order(
+    order_id: int, request: Request, timeout: float = Query(25, ge=1, le=60)
+):
+    """Long-poll for a change to an order.
+
+    Send the ETag from `GET /orders/{id}` as `If-None-Match`. If the order has
+    already changed it is returned at once; otherwise the request is parked
+    until `update_status` touches the order or `timeout` seconds pass, in which
+    case the answer is 304 and the client simply asks again.
+    """
+    try:
+        waiter = order_waiters.register(order_id)
+    except TooManyWaiters:
+        raise HTTPException(
+            status_code=503,
+            detail="too many waiting requests",
+            headers={"Retry-After": "5"},
+        )
+    try:
+        after = read_after(request)
+        snap = await _cached_order(order_id, after)
+        if snap is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if etag_matches(request, snap.etag) and await order_waiters.wait(
+            order_id, waiter, timeout
+        ):
+            snap = await _cached_order(order_id, after) or snap
+    finally:
+        order_waiters.discard(order_id, waiter)
+    return conditional_json(request, snap.body, snap.etag, PRIVATE_REVALIDATE)
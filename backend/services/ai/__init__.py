@@ -1,4 +1,13 @@
-from .service import generate_response, shutdown as shutdown_service, health_check
 from .schemas import AIRequest, AIResponse
+from .service import generate_response, health_check
+from .service import shutdown as shutdown_service
+from .service import stream_response
 
-__all__ = ["generate_response", "shutdown_service", "health_check", "AIRequest", "AIResponse"]
+__all__ = [
+    "generate_response",
+    "stream_response",
+    "shutdown_service",
+    "health_check",
+    "AIRequest",
+    "AIResponse",
+]
@@ -1,9 +1,11 @@
-from core.config import settings
+import json
 import logging
-from typing import Dict, Any, Optional
-import httpx
 import time
-from urllib.parse import urljoin, urlparse
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+from core.config import settings
 from core.request_context import get_request_id
 
 logger = logging.getLogger(__name__)
@@ -21,9 +23,7 @@ class AIAdapter:
             self._init_gemini()
 
         else:
-            raise NotImplementedError(
-                f"AI provider '{self.provider}' not supported"
-            )
+            raise NotImplementedError(f"AI provider '{self.provider}' not supported")
 
     # ---------------------------------------------------
     # OPENAI INIT
@@ -74,6 +74,26 @@ class AIAdapter:
 
         raise NotImplementedError()
 
+    # ---------------------------------------------------
+    # STREAM PROMPT
+    # ---------------------------------------------------
+    def stream_prompt(
+        self, prompt: str, timeout: Optional[float] = 15.0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async iterator of {"delta": text} as the provider produces it, then
+        one {"usage": {...}} with token counts (None where the provider sent none).
+
+        Closing the iterator early (e.g. the client went away) closes the
+        upstream request, so the provider stops generating.
+        """
+        if self.provider == "openai":
+            return self._openai_stream(prompt, timeout)
+
+        if self.provider == "gemini":
+            return self._gemini_stream(prompt, timeout)
+
+        raise NotImplementedError()
+
     # ---------------------------------------------------
     # OPENAI REQUEST
     # ---------------------------------------------------
@@ -110,6 +130,54 @@ class AIAdapter:
 
         return {"reply": text, "tokens_used": None}
 
+    async def _openai_stream(self, prompt, timeout):
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.2,
+            "stream": True,
+            # one last chunk carries the token counts
+            "stream_options": {"include_usage": True},
+        }
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        usage = None
+
+        # leaving this block (normally or not) closes the connection
+        async with self.client.stream(
+            "POST",
+            "/v1/chat/completions",
+            json=payload,
+            headers=headers,
+            timeout=timeout,
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                # server-sent events: "data: <json>" lines, then "data: [DONE]"
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                for choice in chunk.get("choices") or ():
+                    text = (choice.get("delta") or {}).get("content")
+                    if text:
+                        yield {"delta": text}
+                if chunk.get("usage"):
+                    usage = chunk["usage"]
+
+        usage = usage or {}
+        yield {
+            "usage": _usage(
+                usage.get("prompt_tokens"),
+                usage.get("completion_tokens"),
+                usage.get("total_tokens"),
+            )
+        }
+
     # ---------------------------------------------------
     # GEMINI REQUEST
     # ---------------------------------------------------
@@ -123,6 +191,25 @@ class AIAdapter:
 
         return {"reply": response.text, "tokens_used": None}
 
+    async def _gemini_stream(self, prompt, timeout):
+        response = await self.gemini.generate_content_async(
+            prompt, stream=True, request_options={"timeout": timeout}
+        )
+        meta = None
+        async for chunk in response:
+            text = _gemini_text(chunk)
+            if text:
+                yield {"delta": text}
+            meta = getattr(chunk, "usage_metadata", None) or meta
+
+        yield {
+            "usage": _usage(
+                getattr(meta, "prompt_token_count", None),
+                getattr(meta, "candidates_token_count", None),
+                getattr(meta, "total_token_count", None),
+            )
+        }
+
     # ---------------------------------------------------
     async def close(self):
         if hasattr(self, "client"):
@@ -148,9 +235,30 @@ class AIAdapter:
         )
 
 
+def _usage(prompt_tokens, completion_tokens, total_tokens) -> Dict[str, Any]:
+    if total_tokens is None and None not in (prompt_tokens, completion_tokens):
+        total_tokens = prompt_tokens + completion_tokens
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": total_tokens,
+    }
+
+
+def _gemini_text(chunk) -> str:
+    # chunk.text raises ValueError when a chunk has no text parts (the final
+    # usage-only chunk, a safety-blocked candidate), so read the parts directly
+    candidates = getattr(chunk, "candidates", None) or []
+    if not candidates:
+        return ""
+    content = getattr(candidates[0], "content", None)
+    parts = getattr(content, "parts", None) or []
+    return "".join(getattr(part, "text", "") or "" for part in parts)
+
+
 def _safe_url(full_url: str) -> str:
     try:
         p = urlparse(full_url)
         return f"{p.scheme}://{p.netloc}{p.path}"
     except Exception:
-        return full_url
\ No newline at end of file
+        return full_url
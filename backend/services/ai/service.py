@@ -1,10 +1,14 @@
 import asyncio
 import logging
-from typing import Optional
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from core.metrics import ai_request_duration, ai_request_errors, ai_time_to_first_token
 
 from .adapter import AIAdapter
-from .schemas import AIRequest, AIResponse
 from .prompts import build_prompt
+from .schemas import AIRequest, AIResponse
 
 logger = logging.getLogger(__name__)
 
@@ -30,31 +34,161 @@ async def generate_response(request: AIRequest) -> AIResponse:
     max_retries = 2
     base_backoff = 0.5
 
-    logger.info("ai_request_start", extra={"app_module": __name__, "provider": adapter.provider, "model": adapter.model})
+    logger.info(
+        "ai_request_start",
+        extra={
+            "app_module": __name__,
+            "provider": adapter.provider,
+            "model": adapter.model,
+        },
+    )
 
     for attempt in range(0, max_retries + 1):
+        started = time.perf_counter()
         try:
             # adapter has its own timeout, but we wrap with asyncio.wait_for for safety
-            raw = await asyncio.wait_for(adapter.send_prompt(prompt, timeout=10.0), timeout=12.0)
+            try:
+                raw = await asyncio.wait_for(
+                    adapter.send_prompt(prompt, timeout=10.0), timeout=12.0
+                )
+            except asyncio.TimeoutError:
+                _record_attempt(adapter.provider, started, "timeout")
+                raise
+            except Exception:
+                _record_attempt(adapter.provider, started, "error")
+                raise
+            _record_attempt(adapter.provider, started, "ok")
             reply = raw.get("reply", "")
             tokens = raw.get("tokens_used")
-            logger.info("ai_response_success", extra={"provider": adapter.provider, "model": adapter.model, "tokens_used": tokens})
+            logger.info(
+                "ai_response_success",
+                extra={
+                    "provider": adapter.provider,
+                    "model": adapter.model,
+                    "tokens_used": tokens,
+                },
+            )
             return AIResponse(reply=reply, tokens_used=tokens)
 
         except asyncio.TimeoutError:
-            logger.warning("ai_request_timeout", extra={"attempt": attempt, "provider": adapter.provider})
+            logger.warning(
+                "ai_request_timeout",
+                extra={"attempt": attempt, "provider": adapter.provider},
+            )
             if attempt == max_retries:
-                logger.error("ai_request_failed_timeout", extra={"attempt": attempt, "provider": adapter.provider})
+                logger.error(
+                    "ai_request_failed_timeout",
+                    extra={"attempt": attempt, "provider": adapter.provider},
+                )
                 raise
-            await asyncio.sleep(base_backoff * (2 ** attempt))
+            await asyncio.sleep(base_backoff * (2**attempt))
 
         except Exception as e:
             # Log and retry for transient errors
-            logger.warning("ai_provider_error_retry", extra={"attempt": attempt, "error": str(e)})
+            logger.warning(
+                "ai_provider_error_retry", extra={"attempt": attempt, "error": str(e)}
+            )
             if attempt == max_retries:
-                logger.error("ai_provider_failure", extra={"attempt": attempt, "error": str(e)})
+                logger.error(
+                    "ai_provider_failure", extra={"attempt": attempt, "error": str(e)}
+                )
+                raise
+            await asyncio.sleep(base_backoff * (2**attempt))
+
+
+async def stream_response(request: AIRequest) -> AsyncIterator[Dict[str, Any]]:
+    """Relay the provider's reply as it is generated.
+
+    Yields {"delta": text} events, then one {"usage": {...}} with token counts.
+    Failures before the first delta are retried like `generate_response`; after
+    it they are raised, since the caller already has part of the reply. Closing
+    the iterator early (client disconnect) cancels the upstream request.
+    """
+    prompt = build_prompt(request.message, request.context)
+    adapter = _get_adapter()
+
+    max_retries = 2
+    base_backoff = 0.5
+
+    logger.info(
+        "ai_stream_start",
+        extra={"provider": adapter.provider, "model": adapter.model},
+    )
+
+    for attempt in range(0, max_retries + 1):
+        started = time.perf_counter()
+        first_delta_at = None
+        usage = None
+        outcome = "error"
+        stream = adapter.stream_prompt(prompt, timeout=10.0)
+        try:
+            async for event in stream:
+                if "usage" in event:
+                    usage = event["usage"]
+                elif first_delta_at is None:
+                    first_delta_at = time.perf_counter()
+                    ai_time_to_first_token.observe(
+                        first_delta_at - started, adapter.provider
+                    )
+                yield event
+            outcome = "ok"
+        except (asyncio.CancelledError, GeneratorExit):
+            # the client went away; closing `stream` below stops the provider
+            outcome = "cancelled"
+            logger.info(
+                "ai_stream_cancelled",
+                extra={"provider": adapter.provider, "attempt": attempt},
+            )
+            raise
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            outcome = "timeout"
+            logger.warning(
+                "ai_request_timeout",
+                extra={"attempt": attempt, "provider": adapter.provider},
+            )
+            if first_delta_at is not None or attempt == max_retries:
+                logger.error(
+                    "ai_request_failed_timeout",
+                    extra={"attempt": attempt, "provider": adapter.provider},
+                )
+                raise asyncio.TimeoutError() from e
+        except Exception as e:
+            logger.warning(
+                "ai_provider_error_retry", extra={"attempt": attempt, "error": str(e)}
+            )
+            if first_delta_at is not None or attempt == max_retries:
+                logger.error(
+                    "ai_provider_failure", extra={"attempt": attempt, "error": str(e)}
+                )
                 raise
-            await asyncio.sleep(base_backoff * (2 ** attempt))
+        finally:
+            await stream.aclose()
+            _record_attempt(adapter.provider, started, outcome)
+
+        if outcome == "ok":
+            logger.info(
+                "ai_response_success",
+                extra={
+                    "provider": adapter.provider,
+                    "model": adapter.model,
+                    "tokens_used": (usage or {}).get("total_tokens"),
+                    "usage": usage,
+                    "ttft_ms": (
+                        None
+                        if first_delta_at is None
+                        else int((first_delta_at - started) * 1000)
+                    ),
+                    "duration_ms": int((time.perf_counter() - started) * 1000),
+                },
+            )
+            return
+        await asyncio.sleep(base_backoff * (2**attempt))
+
+
+def _record_attempt(provider: str, started: float, outcome: str) -> None:
+    ai_request_duration.observe(time.perf_counter() - started, provider, outcome)
+    if outcome not in ("ok", "cancelled"):
+        ai_request_errors.inc(provider, outcome)
 
 
 async def shutdown() -> None:
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Union
+
+from models.brand import Brand
+from services.cache import Snapshot, menu_cache, render_json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BrandInfo:
+    """Detached, immutable copy of a `brands` row safe to share across requests."""
+
+    id: int
+    name: str
+    slug: str
+    description: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "slug": self.slug,
+            "description": self.description,
+        }
+
+
+class BrandRegistry:
+    """In-process index of brands by id and slug.
+
+    Loaded once at startup and refreshed periodically (brands are only written by
+    `seed_raw`, outside the API). A lookup miss triggers a rate-limited reload so
+    a freshly seeded brand becomes visible without waiting for the next refresh.
+    """
+
+    def __init__(self, min_reload_interval: float = 5.0) -> None:
+        self.min_reload_interval = min_reload_interval
+        self._by_id: Dict[int, BrandInfo] = {}
+        self._by_slug: Dict[str, BrandInfo] = {}
+        self._snapshot: Optional[Snapshot] = None
+        self._version = 0
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        """Serialized GET /brands/ body for the current registry contents."""
+        return self._snapshot
+
+    def replace(self, brands: Iterable[BrandInfo]) -> bool:
+        """Swap in a new brand set; returns True when anything changed."""
+        brands = sorted(brands, key=lambda b: b.id)
+        if self._snapshot is not None and brands == list(self._by_id.values()):
+            return False
+        previous = self._by_id
+        self._by_id = {b.id: b for b in brands}
+        self._by_slug = {b.slug: b for b in brands}
+        self._version += 1
+        self._snapshot = Snapshot(
+            version=self._version, body=render_json([b.as_dict() for b in brands])
+        )
+        # menus embed brand name/slug, so drop snapshots of brands that changed
+        for brand_id in set(previous) | set(self._by_id):
+            if previous.get(brand_id) != self._by_id.get(brand_id):
+                menu_cache.invalidate_tag(brand_id)
+        return True
+
+    async def load(self, session: AsyncSession) -> bool:
+        res = await session.execute(select(Brand).order_by(Brand.id))
+        rows = res.scalars().all()
+        changed = self.replace(
+            BrandInfo(id=b.id, name=b.name, slug=b.slug, description=b.description)
+            for b in rows
+        )
+        self._loaded_at = time.monotonic()
+        if changed:
+            logger.info(
+                "brand_registry_loaded",
+                extra={"brands": len(rows), "version": self._version},
+            )
+        return changed
+
+    async def reload(self, force: bool = True) -> bool:
+        async with self._lock:
+            if (
+                not force
+                and time.monotonic() - self._loaded_at < self.min_reload_interval
+            ):
+                return False
+            from database import SessionLocal
+
+            async with SessionLocal() as session:
+                return await self.load(session)
+
+    def get(self, key: Union[int, str]) -> Optional[BrandInfo]:
+        """Resolve a numeric id (int or digit string) or a slug in O(1)."""
+        if isinstance(key, int):
+            return self._by_id.get(key)
+        brand = self._by_id.get(int(key)) if key.isascii() and key.isdigit() else None
+        if brand is None:
+            brand = self._by_slug.get(key)
+        return brand
+
+    def by_slug(self, slug: str) -> Optional[BrandInfo]:
+        return self._by_slug.get(slug)
+
+    async def resolve(self, key: Union[int, str]) -> Optional[BrandInfo]:
+        """Like `get`, but on a miss reload (rate-limited) once before giving up."""
+        brand = self.get(key)
+        if brand is None:
+            await self.reload(force=not self.loaded)
+            brand = self.get(key)
+        return brand
+
+    def all(self) -> List[BrandInfo]:
+        return list(self._by_id.values())
+
+
+brand_registry = BrandRegistry()
+
+
+async def refresh_periodically(interval: float) -> None:
+    """Background task: reload the registry every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await brand_registry.reload()
+        except Exception:
+            logger.exception("brand_registry_refresh_failed")
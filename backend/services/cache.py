@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """An immutable, already-serialized response body plus its version.
+
+    `tag` groups snapshots that must be invalidated together (e.g. the brand id
+    a menu snapshot was built for, regardless of how the request addressed it).
+    """
+
+    version: int
+    body: bytes
+    tag: Optional[Hashable] = None
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    @cached_property
+    def etag(self) -> str:
+        # content-addressed so every worker (and a CDN) agrees on the same value
+        return '"' + hashlib.blake2b(self.body, digest_size=16).hexdigest() + '"'
+
+
+def render_json(payload: Any) -> bytes:
+    """Serialize like Starlette's JSONResponse so cached bodies are byte-identical."""
+    return json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+Loader = Callable[[int], Awaitable[Optional[Snapshot]]]
+
+
+class SnapshotCache:
+    """Per-process cache of serialized snapshots with single-flight loading.
+
+    - every stored snapshot gets a version from a monotonically increasing counter
+    - concurrent misses for the same key await one shared load
+    - a load that overlaps an invalidation is returned to its waiters but not stored,
+      so a write that lands mid-load can never be masked by a stale snapshot
+    - invalidation also detaches in-flight loads, so a request arriving after it
+      starts a fresh load instead of joining one that began before the write
+
+    State lives in the worker process; all mutation happens on the event loop,
+    so no locks are needed. With `max_entries` set the cache evicts least recently
+    used snapshots.
+
+    Invalidation times are kept per key (until `forget_changes`) so a loader
+    can tell whether a lagging read replica already has the change.
+    """
+
+    def __init__(self, name: str, max_entries: Optional[int] = None) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self._versions = itertools.count(1)
+        self._entries: "OrderedDict[Hashable, Snapshot]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._invalidations = 0
+        # wall-clock time of recent invalidations, by key or tag; only kept while
+        # a replica monitor prunes them
+        self.track_changes = False
+        self._changed: Dict[Hashable, float] = {}
+        self._cleared_at = 0.0
+
+    def next_version(self) -> int:
+        return next(self._versions)
+
+    def peek(self, key: Hashable) -> Optional[Snapshot]:
+        snap = self._entries.get(key)
+        if snap is not None and self.max_entries is not None:
+            self._entries.move_to_end(key)
+        return snap
+
+    async def get_or_load(self, key: Hashable, loader: Loader) -> Optional[Snapshot]:
+        """Return the cached snapshot for `key`, loading it at most once on a miss.
+
+        `loader` receives the version to stamp on the snapshot it builds and may
+        return None (e.g. not found); None results are not cached.
+        """
+        snap = self.peek(key)
+        if snap is not None:
+            return snap
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        started_at = self._invalidations
+        try:
+            snap = await loader(self.next_version())
+        except BaseException as e:
+            fut.set_exception(e)
+            # mark retrieved so an un-awaited failure doesn't log "never retrieved"
+            fut.exception()
+            raise
+        finally:
+            # an invalidation may have detached this load and a newer one started
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+        if snap is not None and started_at == self._invalidations:
+            self._store(key, snap)
+        fut.set_result(snap)
+        return snap
+
+    def _store(self, key: Hashable, snap: Snapshot) -> None:
+        self._entries[key] = snap
+        if snap.tag is not None:
+            self._tags.setdefault(snap.tag, set()).add(key)
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Hashable) -> None:
+        snap = self._entries.pop(key, None)
+        if snap is not None and snap.tag is not None:
+            keys = self._tags.get(snap.tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[snap.tag]
+
+    def changed_at(self, key: Hashable) -> float:
+        """When `key` was last invalidated (0 if not since `forget_changes`)."""
+        return max(self._cleared_at, self._changed.get(key, 0.0))
+
+    def forget_changes(self, before: float) -> None:
+        if self._changed:
+            self._changed = {k: t for k, t in self._changed.items() if t >= before}
+
+    def invalidate(self, key: Hashable) -> None:
+        self._invalidations += 1
+        if self.track_changes:
+            self._changed[key] = time.time()
+        self._inflight.pop(key, None)
+        self._drop(key)
+
+    def invalidate_tag(self, tag: Hashable) -> None:
+        """Drop every snapshot built for `tag` (and the key equal to it, if any)."""
+        self._invalidations += 1
+        if self.track_changes:
+            self._changed[tag] = time.time()
+        # the tag of a snapshot still loading is unknown, so detach every load
+        self._inflight.clear()
+        for key in self._tags.pop(tag, set()) | {tag}:
+            self._entries.pop(key, None)
+        logger.debug("cache_invalidated", extra={"cache": self.name, "tag": str(tag)})
+
+    def clear(self) -> None:
+        self._invalidations += 1
+        self._cleared_at = time.time()
+        self._changed.clear()
+        self._inflight.clear()
+        self._entries.clear()
+        self._tags.clear()
+
+
+class VersionCounter:
+    """Monotonic per-process version for content that is too large to snapshot."""
+
+    def __init__(self) -> None:
+        self.value = 0
+        # wall-clock time of the latest bump
+        self.changed_at = 0.0
+
+    def bump(self) -> int:
+        self.value += 1
+        self.changed_at = time.time()
+        return self.value
+
+
+# serialized GET /menu/{brand} responses, tagged by brand id
+menu_cache = SnapshotCache("menu")
+# serialized GET /orders/{id} responses
+order_cache = SnapshotCache("order", max_entries=10_000)
+# bumped whenever any order is created or changes status
+orders_version = VersionCounter()
@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from core.config import settings
+from services.cache import render_json
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a request with a different body."""
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    status_code: int
+    body: bytes
+    fingerprint: str
+
+
+def fingerprint(payload: bytes) -> str:
+    return hashlib.sha256(payload).hexdigest()
+
+
+class _Guard:
+    """Per-request handle returned by a store's `guard()`.
+
+    `replay` is set when the key has already completed; otherwise the caller
+    owns the key and must call `save` inside the transaction that does the work.
+    """
+
+    def __init__(self, store, session: AsyncSession, key: str, fp: str) -> None:
+        self.store = store
+        self.session = session
+        self.key = key
+        self.fingerprint = fp
+        self.replay: Optional[StoredResponse] = None
+        self.saved: Optional[StoredResponse] = None
+
+    async def save(self, db: AsyncSession, status_code: int, payload) -> None:
+        self.saved = StoredResponse(status_code, render_json(payload), self.fingerprint)
+        await self.store._save(db, self.key, self.saved)
+
+    async def __aenter__(self) -> "_Guard":
+        self.replay = await self.store._claim(self.session, self.key, self.fingerprint)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self.replay is None:
+            await self.store._finish(
+                self.session, self.key, None if exc_type else self.saved
+            )
+
+
+class MemoryIdempotencyStore:
+    """Per-process key store; concurrent requests with one key share a future."""
+
+    # the response is recorded after the order commits, so the order can take
+    # any write path (including the batched ingest queue)
+    transactional = False
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self.ttl = ttl_seconds
+        # insertion order == expiry order because the TTL is fixed
+        self._done: "OrderedDict[str, tuple[float, StoredResponse]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def guard(self, session: AsyncSession, key: str, fp: str) -> _Guard:
+        return _Guard(self, session, key, fp)
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        while self._done:
+            key, (expires, _) = next(iter(self._done.items()))
+            if expires > now:
+                break
+            del self._done[key]
+
+    async def _claim(self, session, key: str, fp: str) -> Optional[StoredResponse]:
+        while True:
+            self._purge()
+            done = self._done.get(key)
+            if done is not None:
+                return _check(done[1], fp)
+            pending = self._inflight.get(key)
+            if pending is None:
+                self._inflight[key] = asyncio.get_running_loop().create_future()
+                return None
+            stored = await asyncio.shield(pending)
+            if stored is not None:
+                return _check(stored, fp)
+            # the first attempt failed without a response; compete for the key again
+
+    async def _save(self, db, key: str, stored: StoredResponse) -> None:
+        pass
+
+    async def _finish(
+        self, session, key: str, stored: Optional[StoredResponse]
+    ) -> None:
+        fut = self._inflight.pop(key, None)
+        if stored is not None:
+            self._done[key] = (time.monotonic() + self.ttl, stored)
+        if fut is not None and not fut.done():
+            fut.set_result(stored)
+
+
+# The claim row is inserted in the same transaction as the order. A concurrent
+# request with the same key blocks on the unique index until that transaction
+# ends: after a commit it replays the saved response, after a rollback it wins
+# the key itself. An expired row is taken over in place.
+_CLAIM_SQL = text("""
+INSERT INTO idempotency_keys (key, fingerprint, expires_at)
+VALUES (:key, :fingerprint, :expires_at)
+ON CONFLICT (key) DO UPDATE
+    SET fingerprint = EXCLUDED.fingerprint, expires_at = EXCLUDED.expires_at,
+        status_code = NULL, response_body = NULL
+    WHERE idempotency_keys.expires_at < now()
+RETURNING key
+""")
+_LOOKUP_SQL = text(
+    "SELECT fingerprint, status_code, response_body"
+    " FROM idempotency_keys WHERE key = :key"
+)
+_SAVE_SQL = text(
+    "UPDATE idempotency_keys SET status_code = :status_code, response_body = :body"
+    " WHERE key = :key"
+)
+_PURGE_SQL = text("DELETE FROM idempotency_keys WHERE expires_at < now()")
+
+
+class PostgresIdempotencyStore:
+    """Key store shared by every worker, backed by the `idempotency_keys` table."""
+
+    # the key and response must commit in the order's own transaction
+    transactional = True
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self.ttl = ttl_seconds
+
+    def guard(self, session: AsyncSession, key: str, fp: str) -> _Guard:
+        return _Guard(self, session, key, fp)
+
+    async def _claim(
+        self, session: AsyncSession, key: str, fp: str
+    ) -> Optional[StoredResponse]:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        res = await session.execute(
+            _CLAIM_SQL, {"key": key, "fingerprint": fp, "expires_at": expires_at}
+        )
+        if res.first() is not None:
+            return None
+        row = (await session.execute(_LOOKUP_SQL, {"key": key})).first()
+        # read-only from here on; end the transaction so no snapshot is held
+        await session.rollback()
+        if row is None or row.status_code is None:
+            # can't happen: the owning transaction commits the response with the key
+            raise IdempotencyConflict(
+                "request with this Idempotency-Key is still in progress"
+            )
+        return _check(
+            StoredResponse(row.status_code, bytes(row.response_body), row.fingerprint),
+            fp,
+        )
+
+    async def _save(self, db: AsyncSession, key: str, stored: StoredResponse) -> None:
+        await db.execute(
+            _SAVE_SQL,
+            {"key": key, "status_code": stored.status_code, "body": stored.body},
+        )
+
+    async def _finish(
+        self, session: AsyncSession, key: str, stored: Optional[StoredResponse]
+    ) -> None:
+        if stored is None:
+            # release the claim row (and its lock) now, not when the session closes
+            await session.rollback()
+
+    async def purge_expired(self) -> int:
+        from database import SessionLocal
+
+        async with SessionLocal() as session:
+            res = await session.execute(_PURGE_SQL)
+            await session.commit()
+            return res.rowcount or 0
+
+
+def _check(stored: StoredResponse, fp: str) -> StoredResponse:
+    if stored.fingerprint != fp:
+        raise IdempotencyConflict(
+            "Idempotency-Key was already used with a different request body"
+        )
+    return stored
+
+
+_STORES = {"memory": MemoryIdempotencyStore, "postgres": PostgresIdempotencyStore}
+
+
+def _make_store():
+    mode = (settings.IDEMPOTENCY_STORE or "memory").lower()
+    if mode not in _STORES:
+        allowed = ", ".join(sorted(_STORES))
+        raise ValueError(
+            f"IDEMPOTENCY_STORE must be one of: {allowed} "
+            f"(got {settings.IDEMPOTENCY_STORE!r})"
+        )
+    return _STORES[mode](settings.IDEMPOTENCY_TTL_SECONDS)
+
+
+idempotency_store = _make_store()
+
+
+async def purge_periodically(interval: float) -> None:
+    """Background task for the postgres store: delete expired keys."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            deleted = await idempotency_store.purge_expired()
+            logger.info("idempotency_keys_purged", extra={"deleted": deleted})
+        except Exception:
+            logger.exception("idempotency_purge_failed")
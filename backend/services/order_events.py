@@ -0,0 +1,318 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+from services.cache import menu_cache, order_cache, orders_version
+from services.search_index import menu_index
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "order_events"
+
+# tags events published by this process, so listeners can skip writes already
+# applied locally; `xid` is the writing transaction (see OrderStats)
+ORIGIN = uuid.uuid4().hex
+
+_NOTIFY_STATUS_SQL = text("""
+SELECT pg_notify('order_events', json_build_object(
+    'id', nextval('order_events_seq'), 'type', 'order_status_changed',
+    'order_id', CAST(:order_id AS integer), 'brand_id', CAST(:brand_id AS integer),
+    'status', CAST(:status AS text), 'old_status', CAST(:old_status AS text),
+    'origin', CAST(:origin AS text), 'xid', CAST(pg_current_xact_id() AS text))::text),
+    CAST(pg_current_xact_id() AS text)
+""")
+
+
+# menu writes ride the same channel so every worker drops its cached copies;
+# they carry no id and are not forwarded to admin streams
+_NOTIFY_MENU_SQL = text("""
+SELECT pg_notify('order_events', json_build_object(
+    'type', 'menu_changed', 'brand_id', CAST(:brand_id AS integer))::text)
+""")
+
+
+async def notify_menu_changed(session: AsyncSession, brand_id: Optional[int]) -> None:
+    """Queue a cache-invalidation event for a brand's menu (None: every brand)."""
+    await session.execute(_NOTIFY_MENU_SQL, {"brand_id": brand_id})
+
+
+async def notify_status_changed(
+    session: AsyncSession, order_id: int, brand_id: int, old: Optional[str], new: str
+) -> int:
+    """Queue a feed event; Postgres delivers it when the session's transaction commits.
+
+    Returns the id of the session's transaction.
+    """
+    res = await session.execute(
+        _NOTIFY_STATUS_SQL,
+        {
+            "order_id": order_id,
+            "brand_id": brand_id,
+            "status": new,
+            "old_status": old,
+            "origin": ORIGIN,
+        },
+    )
+    return int(res.one()[1])
+
+
+@dataclass(frozen=True)
+class OrderEvent:
+    id: Optional[int]
+    type: str
+    brand_id: Optional[int]
+    # the JSON payload as received, forwarded to clients without re-encoding
+    data: str
+    order_id: Optional[int] = None
+    origin: Optional[str] = None
+    # the decoded payload, for listeners that need more than the fields above
+    fields: Dict[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def parse(cls, payload: str) -> "OrderEvent":
+        obj = json.loads(payload)
+        return cls(
+            id=obj.get("id"),
+            type=obj.get("type", "message"),
+            brand_id=obj.get("brand_id"),
+            data=payload,
+            order_id=obj.get("order_id"),
+            origin=obj.get("origin"),
+            fields=obj,
+        )
+
+
+# sent when a subscriber may have missed events; clients re-fetch the list and stats
+RESET = OrderEvent(id=None, type="reset", brand_id=None, data="{}")
+
+
+class Subscription:
+    def __init__(
+        self, hub: "OrderEventHub", brand_ids: Optional[frozenset], max_queue: int
+    ) -> None:
+        self._hub = hub
+        self.brand_ids = brand_ids
+        self.queue: "asyncio.Queue[OrderEvent]" = asyncio.Queue(maxsize=max_queue)
+
+    def wants(self, event: OrderEvent) -> bool:
+        return (
+            self.brand_ids is None
+            or event.brand_id is None
+            or event.brand_id in self.brand_ids
+        )
+
+    def offer(self, event: OrderEvent) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    @property
+    def active(self) -> bool:
+        """False once the hub has dropped this subscriber (after its final reset)."""
+        return self in self._hub._subscribers
+
+    async def get(self) -> OrderEvent:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self._hub._subscribers.discard(self)
+
+
+class OrderEventHub:
+    """Fans order events from one LISTEN connection out to this worker's streams.
+
+    Every worker listens on the `order_events` channel, so each sees every
+    event no matter which worker committed it. Event ids come from a database
+    sequence and are the same on every worker; the last `buffer_size` events
+    are kept so a client reconnecting with Last-Event-ID (to any worker) can
+    catch up. If the gap can't be filled -- the id is older than the buffer, or
+    the LISTEN connection dropped -- the client gets a `reset` event instead.
+
+    Ids are drawn when an event is written but Postgres delivers notifications
+    in commit order, so ids are not increasing along the feed. Replay is by
+    position: everything that arrived after the client's last event, which
+    every listener receives in the same order.
+    """
+
+    def __init__(self, buffer_size: int = 1000, subscriber_queue: int = 256) -> None:
+        self.subscriber_queue = subscriber_queue
+        self._buffer: Deque[OrderEvent] = deque(maxlen=buffer_size)
+        # arrival number of each buffered event's id; _buffer[0] arrived as _base
+        self._positions: Dict[int, int] = {}
+        self._base = 0
+        self._subscribers: set = set()
+        # in-process consumers called synchronously for every event (incl. resets)
+        self._listeners: List[Callable[[OrderEvent], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        # True while the LISTEN connection is up, i.e. other workers' writes reach us
+        self.connected = False
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def add_listener(self, callback: Callable[[OrderEvent], None]) -> None:
+        self._listeners.append(callback)
+
+    def publish(self, event: OrderEvent) -> None:
+        if event.id is not None:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._positions.pop(self._buffer.popleft().id, None)
+                self._base += 1
+            self._positions[event.id] = self._base + len(self._buffer)
+            self._buffer.append(event)
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("order_events_listener_callback_failed")
+        if event.id is None and event is not RESET:
+            # internal (e.g. menu_changed): for listeners only
+            return
+        for sub in list(self._subscribers):
+            if not sub.wants(event):
+                continue
+            if not sub.offer(event):
+                # too slow to keep up: drop it and let the client resync
+                logger.warning("order_events_subscriber_dropped")
+                sub.close()
+                _force(sub, RESET)
+
+    def subscribe(
+        self,
+        brand_ids: Optional[Iterable[int]] = None,
+        last_event_id: Optional[int] = None,
+    ) -> Subscription:
+        sub = Subscription(
+            self, frozenset(brand_ids) if brand_ids else None, self.subscriber_queue
+        )
+        if last_event_id is not None:
+            for event in self._replay(last_event_id):
+                if sub.wants(event):
+                    _force(sub, event)
+        self._subscribers.add(sub)
+        return sub
+
+    def _replay(self, last_event_id: int) -> List[OrderEvent]:
+        position = self._positions.get(last_event_id)
+        if position is None:
+            # evicted, from before a gap, or not delivered here yet
+            return [RESET]
+        return list(islice(self._buffer, position - self._base + 1, None))
+
+    def _on_gap(self) -> None:
+        # anything notified while we weren't listening is lost, so resuming
+        # from an event received before the gap can't be served from the buffer
+        self._base += len(self._buffer)
+        self._buffer.clear()
+        self._positions.clear()
+        self.publish(RESET)
+        # nothing reaches open streams until the listener is back, so end them;
+        # clients fall back to polling until a reconnect succeeds
+        for sub in list(self._subscribers):
+            sub.close()
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        try:
+            event = OrderEvent.parse(payload)
+        except ValueError:
+            logger.warning("order_events_bad_payload", extra={"payload": payload[:200]})
+            return
+        self.publish(event)
+
+    async def _listen(
+        self, dsn: str, connect_kwargs: dict, health_interval: float
+    ) -> None:
+        import asyncpg
+
+        backoff = 1.0
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn, **connect_kwargs)
+                await conn.add_listener(CHANNEL, self._on_notify)
+                self.connected = True
+                logger.info("order_events_listening")
+                backoff = 1.0
+                while True:
+                    await asyncio.sleep(health_interval)
+                    await conn.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("order_events_listener_failed")
+                self.connected = False
+                self._on_gap()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if conn is not None:
+                    try:
+                        await conn.close()
+                    except Exception:
+                        pass
+
+    def start(self, health_interval: float = 30.0) -> None:
+        if self._task is not None:
+            return
+        from database import DIRECT_URL, direct_connect_args
+
+        # LISTEN needs a dedicated session-level connection, outside the pool
+        dsn = DIRECT_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+        self._task = asyncio.create_task(
+            self._listen(dsn, dict(direct_connect_args), health_interval)
+        )
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self.connected = False
+        for sub in list(self._subscribers):
+            sub.close()
+
+
+def _force(sub: Subscription, event: OrderEvent) -> None:
+    # make room by discarding the oldest queued event; used for replay and resets
+    while not sub.offer(event):
+        sub.queue.get_nowait()
+
+
+order_events = OrderEventHub()
+
+
+def _sync_caches(event: OrderEvent) -> None:
+    # apply writes committed by any worker (or script) to this worker's caches
+    if event.type == "order_created":
+        orders_version.bump()
+    elif event.type == "order_status_changed":
+        order_cache.invalidate(event.order_id)
+        orders_version.bump()
+    elif event.type == "menu_changed":
+        if event.brand_id is None:
+            menu_cache.clear()
+        else:
+            menu_cache.invalidate_tag(event.brand_id)
+        menu_index.mark_stale(event.brand_id)
+        # item names appear in the admin order list
+        orders_version.bump()
+    elif event.type == "reset":
+        # events may have been lost; nothing cached can be trusted
+        order_cache.clear()
+        menu_cache.clear()
+        menu_index.mark_stale()
+        orders_version.bump()
+
+
+order_events.add_listener(_sync_caches)
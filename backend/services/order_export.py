@@ -0,0 +1,172 @@
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from database import SessionLocal
+from models.menu_item import MenuItem
+from models.order import Order, OrderItem
+from sqlalchemy import select
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = [
+    "order_id",
+    "brand_id",
+    "status",
+    "created_at",
+    "order_total",
+    "order_item_id",
+    "menu_item_id",
+    "item_name",
+    "quantity",
+    "price",
+]
+
+# rows pulled from the server-side cursor per round trip
+FETCH_SIZE = 1000
+# bytes buffered before handing a chunk to the ASGI server
+CHUNK_SIZE = 64 * 1024
+
+
+def _export_query(
+    brand_id: Optional[int],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+):
+    # one flat row per line item; an order's rows are adjacent thanks to the ordering
+    q = (
+        select(
+            Order.id,
+            Order.brand_id,
+            Order.status,
+            Order.created_at,
+            Order.total,
+            OrderItem.id,
+            OrderItem.menu_item_id,
+            MenuItem.name,
+            OrderItem.quantity,
+            OrderItem.price,
+        )
+        .select_from(Order)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(MenuItem, MenuItem.id == OrderItem.menu_item_id)
+    )
+    if brand_id is not None:
+        q = q.where(Order.brand_id == brand_id)
+    if created_from:
+        q = q.where(Order.created_at >= created_from)
+    if created_to:
+        q = q.where(Order.created_at < created_to)
+    return q.order_by(Order.created_at, Order.id, OrderItem.id)
+
+
+async def _stream_rows(brand_id, created_from, created_to):
+    # own session: the export outlives the request handler that started it
+    async with SessionLocal() as session:
+        result = await session.stream(
+            _export_query(brand_id, created_from, created_to).execution_options(
+                yield_per=FETCH_SIZE
+            )
+        )
+        async for row in result:
+            yield row
+
+
+async def iter_orders_ndjson(
+    brand_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> AsyncIterator[bytes]:
+    """One JSON object per order (with its items) per line, oldest first."""
+    buf = io.StringIO()
+    current = None
+    count = 0
+    async for (
+        oid,
+        bid,
+        status,
+        created_at,
+        total,
+        iid,
+        mid,
+        name,
+        qty,
+        price,
+    ) in _stream_rows(brand_id, created_from, created_to):
+        if current is None or current["id"] != oid:
+            if current is not None:
+                buf.write(json.dumps(current, separators=(",", ":")))
+                buf.write("\n")
+                count += 1
+                # the first order goes out immediately, later ones in chunks
+                if count == 1 or buf.tell() >= CHUNK_SIZE:
+                    yield _drain(buf)
+            current = {
+                "id": oid,
+                "brand_id": bid,
+                "status": status,
+                "created_at": created_at.isoformat() if created_at else None,
+                "total": float(total),
+                "items": [],
+            }
+        if iid is not None:
+            current["items"].append(
+                {
+                    "id": iid,
+                    "menu_item_id": mid,
+                    "name": name,
+                    "quantity": qty,
+                    "price": float(price),
+                }
+            )
+    if current is not None:
+        buf.write(json.dumps(current, separators=(",", ":")))
+        buf.write("\n")
+        count += 1
+    yield _drain(buf)
+    logger.info("orders_export_complete", extra={"format": "ndjson", "orders": count})
+
+
+async def iter_orders_csv(
+    brand_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> AsyncIterator[bytes]:
+    """CSV with a header and one row per line item, oldest first."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    # send the header before the first fetch completes
+    yield _drain(buf)
+    rows = 0
+    async for row in _stream_rows(brand_id, created_from, created_to):
+        oid, bid, status, created_at, total, iid, mid, name, qty, price = row
+        writer.writerow(
+            [
+                oid,
+                bid,
+                status,
+                created_at.isoformat() if created_at else "",
+                float(total),
+                iid if iid is not None else "",
+                mid if mid is not None else "",
+                name or "",
+                qty if qty is not None else "",
+                float(price) if price is not None else "",
+            ]
+        )
+        rows += 1
+        if buf.tell() >= CHUNK_SIZE:
+            yield _drain(buf)
+    yield _drain(buf)
+    logger.info("orders_export_complete", extra={"format": "csv", "rows": rows})
+
+
+def _drain(buf: io.StringIO) -> bytes:
+    data = buf.getvalue().encode("utf-8")
+    buf.seek(0)
+    buf.truncate()
+    return data
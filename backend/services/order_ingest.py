@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from typing import List, Tuple
+
+from core.config import settings
+from core.metrics import registry
+from database import SessionLocal
+from services.order_service import insert_order, record_committed
+
+logger = logging.getLogger(__name__)
+
+_Pending = Tuple[dict, asyncio.Future]
+
+
+class OrderIngestQueue:
+    """Group-commit writer for validated orders.
+
+    Callers `submit` insert parameters and wait on a future; workers take up to
+    `max_batch` orders (waiting at most `max_wait` seconds after the first one
+    for more to arrive), insert them in one transaction and commit once, so a
+    burst pays one commit round trip per batch instead of per order.
+
+    If an insert fails, the batch is rolled back and its orders are retried one
+    per transaction, so each caller gets its own id or its own error. A failed
+    COMMIT is not retried (it may have been applied); every order in that batch
+    gets the error.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 50,
+        max_wait: float = 0.01,
+        workers: int = 2,
+        max_pending: int = 1000,
+    ) -> None:
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.workers = workers
+        self._queue: "asyncio.Queue[_Pending]" = asyncio.Queue(maxsize=max_pending)
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        """Orders submitted and not yet taken by a worker."""
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker()) for _ in range(self.workers)
+            ]
+
+    async def stop(self) -> None:
+        """Commit whatever is queued, then stop the workers."""
+        if not self._tasks:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, params: dict) -> dict:
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((params, fut))
+        # the order is written even if the caller goes away meanwhile
+        return await asyncio.shield(fut)
+
+    async def _next_batch(self) -> List[_Pending]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._flush(batch)
+            except Exception as e:  # never let one batch kill the worker
+                logger.exception("order_ingest_flush_failed")
+                _fail(batch, e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[_Pending]) -> None:
+        rows = []
+        async with SessionLocal() as session:
+            try:
+                for params, _ in batch:
+                    rows.append(await insert_order(session, params))
+            except Exception as e:
+                await session.rollback()
+                if len(batch) == 1:
+                    _fail(batch, e)
+                    return
+                logger.warning(
+                    "order_ingest_batch_split",
+                    extra={"size": len(batch), "error": str(e)},
+                )
+                rows = None
+            if rows is not None:
+                try:
+                    await session.commit()
+                except Exception as e:
+                    logger.exception(
+                        "order_ingest_commit_failed", extra={"size": len(batch)}
+                    )
+                    _fail(batch, e)
+                    return
+        if rows is None:
+            for item in batch:
+                await self._flush([item])
+            return
+        for (params, fut), (order_id, order_total, order_status, xid) in zip(
+            batch, rows
+        ):
+            record_committed(
+                params["brand_id"], order_total, order_status, xid, mode="batched"
+            )
+            if not fut.done():
+                fut.set_result({"id": order_id, "total": float(order_total)})
+        logger.debug("order_ingest_batch_committed", extra={"size": len(batch)})
+
+
+def _fail(batch: List[_Pending], exc: Exception) -> None:
+    for _, fut in batch:
+        if not fut.done():
+            fut.set_exception(exc)
+
+
+order_ingest = OrderIngestQueue(
+    max_batch=settings.ORDER_INGEST_MAX_BATCH,
+    max_wait=settings.ORDER_INGEST_MAX_WAIT_MS / 1000,
+    workers=settings.ORDER_INGEST_WORKERS,
+)
+registry.gauge(
+    "order_ingest_queue_depth",
+    "Validated orders waiting for a batch commit.",
+    fn=lambda: order_ingest.depth,
+)
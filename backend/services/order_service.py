@@ -1,43 +1,121 @@
 from core.config import settings
-print("OPENAI KEY EXISTS:", bool(settings.OPENAI_API_KEY))
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from models.schemas import OrderCreate
-from models.brand import Brand
+from core.metrics import orders_created
 from models.menu_item import MenuItem
-from models.order import Order, OrderItem
+from models.schemas import OrderCreate
+from services import rollups
+from services.brand_registry import brand_registry
+from services.cache import orders_version
+from services.order_events import ORIGIN
+from services.order_stats import order_stats
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 
+print("OPENAI KEY EXISTS:", bool(settings.OPENAI_API_KEY))
+
+# Inserts the order and all of its lines in one statement; order_items rows
+# come from parallel arrays so the statement shape doesn't depend on cart size.
+# The live order feed is notified from the same statement.
+_INSERT_ORDER_SQL = text("""
+WITH new_order AS (
+    INSERT INTO orders (brand_id, total, status)
+    VALUES (:brand_id, :total, 'pending')
+    RETURNING id, brand_id, total, status, created_at
+), lines AS (
+    INSERT INTO order_items (order_id, menu_item_id, quantity, price)
+    SELECT new_order.id, v.menu_item_id, v.quantity, v.price
+    FROM new_order,
+         unnest(
+             CAST(:menu_item_ids AS integer[]),
+             CAST(:quantities AS integer[]),
+             CAST(:prices AS double precision[])
+         ) AS v(menu_item_id, quantity, price)
+    RETURNING 1
+), notified AS (
+    -- delivered to listeners only if the transaction commits
+    SELECT pg_notify('order_events', json_build_object(
+        'id', nextval('order_events_seq'), 'type', 'order_created',
+        'order_id', id, 'brand_id', brand_id, 'status', status, 'total', total,
+        'created_at', created_at, 'origin', CAST(:origin AS text),
+        'xid', CAST(pg_current_xact_id() AS text))::text)
+    FROM new_order
+)
+SELECT new_order.id, new_order.total, new_order.status,
+       CAST(pg_current_xact_id() AS text)
+FROM new_order, notified
+""")
 
-async def create_order(db: AsyncSession, order_in: OrderCreate):
-    # validate brand exists
-    q = select(Brand).where(Brand.slug == order_in.brand_slug)
-    res = await db.execute(q)
-    brand = res.scalars().first()
-    if not brand:
+
+async def validate_order(db: AsyncSession, order_in: OrderCreate) -> dict:
+    """Check brand and cart against the menu; returns the insert parameters."""
+    # validate brand exists (slug only; numeric ids are not accepted here)
+    brand = await brand_registry.resolve(order_in.brand_slug)
+    if not brand or brand.slug != order_in.brand_slug:
         raise ValueError("Brand not found")
 
-    # validate menu items and compute total
-    total = 0.0
-    menu_map = {}
-    for ci in order_in.items:
-        qmi = select(MenuItem).where(MenuItem.id == ci.menu_item_id, MenuItem.brand_id == brand.id)
-        rmi = await db.execute(qmi)
-        mi = rmi.scalars().first()
-        if not mi:
-            raise ValueError(f"Menu item {ci.menu_item_id} not found for brand")
-        menu_map[ci.menu_item_id] = mi
-        total += float(mi.price) * ci.quantity
+    # validate every cart line with one query and report all bad ids together
+    wanted = {ci.menu_item_id for ci in order_in.items}
+    prices = {}
+    if wanted:
+        qmi = select(MenuItem.id, MenuItem.price).where(
+            MenuItem.id.in_(wanted), MenuItem.brand_id == brand.id
+        )
+        prices = {mid: float(price) for mid, price in (await db.execute(qmi)).all()}
+    missing = sorted(wanted - prices.keys())
+    if missing:
+        if len(missing) == 1:
+            raise ValueError(f"Menu item {missing[0]} not found for brand")
+        raise ValueError(
+            f"Menu items {', '.join(map(str, missing))} not found for brand"
+        )
 
-    # create order and items in transaction
-    new_order = Order(brand_id=brand.id, total=round(total, 2), status="pending")
-    db.add(new_order)
-    await db.flush()
+    return {
+        "brand_id": brand.id,
+        "total": round(
+            sum(prices[ci.menu_item_id] * ci.quantity for ci in order_in.items), 2
+        ),
+        "menu_item_ids": [ci.menu_item_id for ci in order_in.items],
+        "quantities": [ci.quantity for ci in order_in.items],
+        "prices": [prices[ci.menu_item_id] for ci in order_in.items],
+    }
 
-    for ci in order_in.items:
-        mi = menu_map[ci.menu_item_id]
-        oi = OrderItem(order_id=new_order.id, menu_item_id=mi.id, quantity=ci.quantity, price=mi.price)
-        db.add(oi)
 
+async def insert_order(db: AsyncSession, params: dict):
+    """Write a validated order, its lines and its rollup contribution; does not commit.
+
+    Returns (id, total, status, transaction id).
+    """
+    res = await db.execute(_INSERT_ORDER_SQL, {**params, "origin": ORIGIN})
+    order_id, order_total, order_status, xid = res.one()
+    await rollups.record_order_created(db, order_id)
+    return order_id, order_total, order_status, int(xid)
+
+
+def record_committed(
+    brand_id: int, order_total, order_status, xid=None, mode: str = "direct"
+) -> None:
+    """Update in-process summaries once an order's transaction has committed."""
+    orders_created.inc(mode)
+    order_stats.record_created(brand_id, order_total, order_status, xid)
+    orders_version.bump()
+
+
+async def create_order(db: AsyncSession, order_in: OrderCreate, before_commit=None):
+    params = await validate_order(db, order_in)
+
+    if before_commit is None and settings.ORDER_INGEST_MODE == "batched":
+        from services.order_ingest import order_ingest
+
+        if order_ingest.running:
+            # end the read-only transaction before waiting on the queue
+            await db.rollback()
+            return await order_ingest.submit(params)
+
+    # create order and items in transaction
+    order_id, order_total, order_status, xid = await insert_order(db, params)
+    result = {"id": order_id, "total": float(order_total)}
+    if before_commit is not None:
+        # lets the caller write alongside the order atomically (e.g. idempotency key)
+        await before_commit(db, result)
     await db.commit()
-    await db.refresh(new_order)
-    return {"id": new_order.id, "total": float(new_order.total)}
+    record_committed(params["brand_id"], order_total, order_status, xid)
+    return result
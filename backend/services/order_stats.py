@@ -0,0 +1,251 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from models.order import VALID_STATUSES
+from services.order_events import ORIGIN, OrderEvent, order_events
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATUS = "pending"
+
+
+class _Bucket:
+    __slots__ = ("orders", "revenue", "by_status")
+
+    def __init__(self) -> None:
+        self.orders = 0
+        self.revenue = 0.0
+        self.by_status: Dict[str, int] = defaultdict(int)
+
+    def as_dict(self) -> dict:
+        counts = {s: 0 for s in sorted(VALID_STATUSES)}
+        counts.update(self.by_status)
+        return {
+            "total_orders": self.orders,
+            "total_revenue": round(self.revenue, 2),
+            "status_counts": counts,
+        }
+
+
+class TxSnapshot:
+    """A Postgres MVCC snapshot (`pg_current_snapshot()`, "xmin:xmax:xip,...").
+
+    Tells whether a committed transaction's effects were visible to the query
+    that ran under it.
+    """
+
+    __slots__ = ("xmin", "xmax", "xip")
+
+    def __init__(self, xmin: int, xmax: int, xip: FrozenSet[int] = frozenset()) -> None:
+        self.xmin, self.xmax, self.xip = xmin, xmax, xip
+
+    @classmethod
+    def parse(cls, value: str) -> "TxSnapshot":
+        xmin, xmax, xip = value.split(":")
+        return cls(int(xmin), int(xmax), frozenset(int(x) for x in xip.split(",") if x))
+
+    def sees(self, xid: int) -> bool:
+        return xid < self.xmin or (xid < self.xmax and xid not in self.xip)
+
+
+# the aggregate and the snapshot it was computed under, in one statement; the
+# outer join still yields the snapshot when there are no orders
+_LOAD_SQL = text("""
+SELECT s.snap, o.brand_id, o.status, o.n, o.revenue
+FROM (SELECT CAST(pg_current_snapshot() AS text) AS snap) AS s
+LEFT JOIN (
+    SELECT brand_id, status, count(*) AS n, coalesce(sum(total), 0) AS revenue
+    FROM orders GROUP BY brand_id, status
+) AS o ON true
+""")
+
+
+class OrderStats:
+    """Running order totals, overall and per brand, kept in process memory.
+
+    Seeded from one GROUP BY over `orders`, then adjusted in place: by
+    `create_order` and `update_status` right after their own commits, and by
+    the order feed for writes committed by other workers. Each adjustment runs
+    without awaiting, so readers on the event loop never see a half-applied
+    change.
+
+    Every adjustment carries the id of the transaction that made it, and the
+    load records the snapshot its query ran under. Adjustments the query
+    already counted are skipped and the rest are re-applied on top of it, so
+    `reconcile` can run while orders are being written and still repair drift
+    (e.g. a missed feed event, or rows written by scripts).
+    """
+
+    def __init__(self) -> None:
+        self._total = _Bucket()
+        self._brands: Dict[int, _Bucket] = defaultdict(_Bucket)
+        self._loaded = False
+        # what the last load counted; later adjustments from those txns are no-ops
+        self._basis: Optional[TxSnapshot] = None
+        # adjustments made while a load's query is in flight
+        self._journal: Optional[List[Tuple[Optional[int], Callable[[], None]]]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def _adjust(self, xid: Optional[int], change: Callable[[], None]) -> None:
+        if xid is not None and self._basis is not None and self._basis.sees(xid):
+            return
+        if self._journal is not None:
+            self._journal.append((xid, change))
+        change()
+
+    def record_created(
+        self,
+        brand_id: int,
+        total: float,
+        status: Optional[str] = DEFAULT_STATUS,
+        xid: Optional[int] = None,
+    ) -> None:
+        status = status or DEFAULT_STATUS
+
+        def change() -> None:
+            for bucket in (self._total, self._brands[brand_id]):
+                bucket.orders += 1
+                bucket.revenue += float(total)
+                bucket.by_status[status] += 1
+
+        self._adjust(xid, change)
+
+    def record_status_change(
+        self,
+        brand_id: int,
+        old: Optional[str],
+        new: Optional[str],
+        xid: Optional[int] = None,
+    ) -> None:
+        old, new = old or DEFAULT_STATUS, new or DEFAULT_STATUS
+        if old == new:
+            return
+
+        def change() -> None:
+            for bucket in (self._total, self._brands[brand_id]):
+                bucket.by_status[old] -= 1
+                bucket.by_status[new] += 1
+
+        self._adjust(xid, change)
+
+    def replace(self, rows: Iterable[Tuple[int, Optional[str], int, float]]) -> None:
+        """Rebuild from (brand_id, status, count, revenue) aggregate rows."""
+        total, brands = _Bucket(), defaultdict(_Bucket)
+        for brand_id, status, count, revenue in rows:
+            status = status or DEFAULT_STATUS
+            for bucket in (total, brands[brand_id]):
+                bucket.orders += int(count)
+                bucket.revenue += float(revenue or 0)
+                bucket.by_status[status] += int(count)
+        self._total, self._brands = total, brands
+        self._loaded = True
+
+    async def load(self, session: AsyncSession) -> None:
+        """Replace the counters from the database, keeping writes the query missed."""
+        journal = self._journal = []
+        try:
+            rows = (await session.execute(_LOAD_SQL)).all()
+        finally:
+            self._journal = None
+        basis = TxSnapshot.parse(rows[0][0])
+        before = self.snapshot() if self._loaded else None
+        self.replace(row[1:] for row in rows if row[1] is not None)
+        self._basis = basis
+        for xid, change in journal:
+            # committed after the query's snapshot was taken, so not in `rows`
+            if xid is None or not basis.sees(xid):
+                change()
+        if before is not None and before != self.snapshot():
+            logger.warning(
+                "order_stats_drift_corrected",
+                extra={"before": before["total_orders"], "after": self._total.orders},
+            )
+
+    async def reconcile(self) -> None:
+        from database import SessionLocal
+
+        async with SessionLocal() as session:
+            await self.load(session)
+
+    def snapshot(self) -> dict:
+        """Stats payload; O(brands + statuses), independent of order count."""
+        out = self._total.as_dict()
+        counts = out["status_counts"]
+        # keys the dashboard has always read
+        out["pending_count"] = counts.get("pending", 0)
+        out["preparing_count"] = counts.get("preparing", 0)
+        out["delivered_count"] = counts.get("delivered", 0)
+        out["brands"] = {
+            str(bid): b.as_dict() for bid, b in sorted(self._brands.items()) if b.orders
+        }
+        return out
+
+
+order_stats = OrderStats()
+
+
+def _apply_feed_event(event: OrderEvent) -> None:
+    # writes committed by other workers; this worker's own were applied after commit
+    if event.type == "reset":
+        # events may have been lost while the feed was down
+        _reconcile_soon()
+        return
+    if event.origin == ORIGIN or event.type not in (
+        "order_created",
+        "order_status_changed",
+    ):
+        return
+    xid = int(event.fields["xid"]) if event.fields.get("xid") is not None else None
+    if event.type == "order_created":
+        order_stats.record_created(
+            event.brand_id,
+            event.fields.get("total") or 0,
+            event.fields.get("status"),
+            xid,
+        )
+    else:
+        order_stats.record_status_change(
+            event.brand_id,
+            event.fields.get("old_status"),
+            event.fields.get("status"),
+            xid,
+        )
+
+
+_reconcile_task: Optional[asyncio.Task] = None
+
+
+def _reconcile_soon() -> None:
+    global _reconcile_task
+    if not order_stats.loaded or (
+        _reconcile_task is not None and not _reconcile_task.done()
+    ):
+        return
+
+    async def run() -> None:
+        try:
+            await order_stats.reconcile()
+        except Exception:
+            logger.exception("order_stats_reconcile_failed")
+
+    _reconcile_task = asyncio.get_running_loop().create_task(run())
+
+
+order_events.add_listener(_apply_feed_event)
+
+
+async def reconcile_periodically(interval: float) -> None:
+    """Background task: re-derive stats from the database every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await order_stats.reconcile()
+        except Exception:
+            logger.exception("order_stats_reconcile_failed")
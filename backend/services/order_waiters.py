@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from typing import Dict, Set
+
+from services.order_events import OrderEvent, order_events
+
+logger = logging.getLogger(__name__)
+
+
+class TooManyWaiters(Exception):
+    pass
+
+
+class OrderWaiters:
+    """Parked status-watch requests, keyed by order id.
+
+    A waiter is a bare future; parking costs no database work. It is resolved
+    by `notify`, which `update_status` calls on the worker that made the change
+    and the order event feed calls on every other worker.
+    """
+
+    def __init__(self, max_waiters: int = 10_000) -> None:
+        self.max_waiters = max_waiters
+        self._waiters: Dict[int, Set[asyncio.Future]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def register(self, order_id: int) -> asyncio.Future:
+        """Park a waiter; register before reading the order so no change is missed."""
+        if self._count >= self.max_waiters:
+            raise TooManyWaiters()
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(order_id, set()).add(fut)
+        self._count += 1
+        return fut
+
+    def discard(self, order_id: int, fut: asyncio.Future) -> None:
+        waiters = self._waiters.get(order_id)
+        if waiters is None or fut not in waiters:
+            return
+        waiters.discard(fut)
+        self._count -= 1
+        if not waiters:
+            del self._waiters[order_id]
+
+    async def wait(self, order_id: int, fut: asyncio.Future, timeout: float) -> bool:
+        """True if the order changed within `timeout` seconds; always unregisters."""
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.discard(order_id, fut)
+
+    def notify(self, order_id: int) -> int:
+        waiters = self._waiters.pop(order_id, None)
+        if not waiters:
+            return 0
+        self._count -= len(waiters)
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
+        return len(waiters)
+
+    def notify_all(self) -> None:
+        for order_id in list(self._waiters):
+            self.notify(order_id)
+
+
+order_waiters = OrderWaiters()
+
+
+def _on_order_event(event: OrderEvent) -> None:
+    # runs after order_events has dropped the cached copy of the order
+    if event.type == "order_status_changed":
+        order_waiters.notify(event.order_id)
+    elif event.type == "reset":
+        # events may have been lost; let every waiter re-check its order
+        order_waiters.notify_all()
+
+
+order_events.add_listener(_on_order_event)
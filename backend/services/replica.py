@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from core.config import settings
+from fastapi import Request
+from services.cache import menu_cache, order_cache
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# clients echo this back after a write so their next reads see it (see read_after)
+READ_AFTER_HEADER = "X-Read-After"
+
+_PRIMARY_LSN_SQL = text("SELECT pg_current_wal_lsn()::text")
+_REPLAY_SQL = text("SELECT pg_is_in_recovery(), pg_last_wal_replay_lsn()::text")
+
+
+def _lsn(value: str) -> int:
+    hi, lo = value.split("/")
+    return (int(hi, 16) << 32) | int(lo, 16)
+
+
+class ReplicaMonitor:
+    """Tracks how far the read replica has caught up with the primary.
+
+    Each probe samples the primary's WAL position and reads the replica's
+    replay position. Once the replica has replayed a sample, every transaction
+    committed before that sample was taken is visible there; `caught_up_to`
+    is the wall-clock time of the newest such sample. A read may use the
+    replica when it is within `max_lag` seconds of now and has caught up to
+    the latest write the reader must see.
+
+    State lives in the worker process and is only touched on the event loop.
+    """
+
+    def __init__(self, max_lag: float, max_samples: int = 3600) -> None:
+        self.max_lag = max_lag
+        self.caught_up_to = 0.0
+        # False until the first successful probe, and after any replica error
+        self.healthy = False
+        self._samples: Deque[Tuple[float, int]] = deque(maxlen=max_samples)
+
+    @property
+    def lag(self) -> Optional[float]:
+        """Upper bound on how stale replica reads are, in seconds (None: unknown)."""
+        if not self.caught_up_to:
+            return None
+        return max(0.0, time.time() - self.caught_up_to)
+
+    def usable(self, after: float = 0.0) -> bool:
+        """May a read that must see writes committed before `after` use the replica?"""
+        if not self.healthy or self.caught_up_to < after:
+            return False
+        return time.time() - self.caught_up_to <= self.max_lag
+
+    def mark_down(self) -> None:
+        if self.healthy:
+            logger.warning("replica_unavailable")
+        self.healthy = False
+
+    def observe(self, sampled_at: float, primary_lsn: int, replayed_lsn: Optional[int]):
+        """Record a probe: the primary's position at `sampled_at`, the replica's."""
+        self._samples.append((sampled_at, primary_lsn))
+        while self._samples and (
+            replayed_lsn is None or self._samples[0][1] <= replayed_lsn
+        ):
+            self.caught_up_to = max(self.caught_up_to, self._samples.popleft()[0])
+        if not self.healthy:
+            logger.info("replica_available", extra={"lag": self.lag})
+        self.healthy = True
+        # invalidations older than this are on the replica; stop tracking them
+        for cache in (menu_cache, order_cache):
+            cache.forget_changes(before=self.caught_up_to)
+
+    async def probe(self) -> None:
+        from database import engine, replica_engine
+
+        sampled_at = time.time()
+        async with engine.connect() as conn:
+            primary_lsn = _lsn((await conn.execute(_PRIMARY_LSN_SQL)).scalar_one())
+        async with replica_engine.connect() as conn:
+            in_recovery, replayed = (await conn.execute(_REPLAY_SQL)).one()
+        # not a standby (e.g. a promoted replica): it has everything
+        self.observe(sampled_at, primary_lsn, _lsn(replayed) if in_recovery else None)
+
+
+replica_monitor = ReplicaMonitor(settings.DATABASE_REPLICA_MAX_LAG_SECONDS)
+
+
+def read_after(request: Request) -> float:
+    """The write time a client asked its reads to include (0: none)."""
+    try:
+        return float(request.headers.get(READ_AFTER_HEADER, 0))
+    except ValueError:
+        return 0.0
+
+
+def write_marker() -> str:
+    """Value for READ_AFTER_HEADER on a response to a committed write."""
+    # rounded up, so the marker is never earlier than the commit
+    return f"{math.ceil(time.time() * 1000) / 1000:.3f}"
+
+
+async def monitor_periodically(monitor: ReplicaMonitor, interval: float) -> None:
+    """Background task: probe the replica's position every `interval` seconds."""
+    while True:
+        try:
+            await asyncio.wait_for(monitor.probe(), timeout=max(interval, 1.0) * 5)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            monitor.mark_down()
+            logger.exception("replica_probe_failed")
+        await asyncio.sleep(interval)
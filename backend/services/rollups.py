@@ -0,0 +1,261 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from core.config import settings
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# truncate local wall-clock time, then turn the bucket start back into an instant
+_BUCKET = (
+    "date_trunc(g.granularity, o.created_at AT TIME ZONE CAST(:tz AS text))"
+    " AT TIME ZONE CAST(:tz AS text)"
+)
+_GRANULARITIES = "(VALUES ('hour'), ('day')) AS g(granularity)"
+
+# Adds one order's contribution (scaled by :sign) to both rollup tables in a
+# single round trip: the revenue upsert rides along as a data-modifying CTE.
+_APPLY_ORDER_SQL = text(f"""
+WITH revenue_upsert AS (
+    INSERT INTO revenue_rollups
+        (granularity, bucket_start, brand_id, order_count, revenue, cancelled_count)
+    SELECT g.granularity, {_BUCKET}, o.brand_id, CAST(:placed AS integer),
+           CAST(:sign AS integer) * o.total, CAST(:cancelled AS integer)
+    FROM orders o CROSS JOIN {_GRANULARITIES}
+    WHERE o.id = :order_id
+    ON CONFLICT (granularity, brand_id, bucket_start) DO UPDATE SET
+        order_count = revenue_rollups.order_count + EXCLUDED.order_count,
+        revenue = revenue_rollups.revenue + EXCLUDED.revenue,
+        cancelled_count = revenue_rollups.cancelled_count + EXCLUDED.cancelled_count
+    RETURNING 1
+)
+INSERT INTO item_sales_rollups
+    (granularity, bucket_start, brand_id, menu_item_id, quantity, revenue)
+SELECT g.granularity, {_BUCKET}, o.brand_id, oi.menu_item_id,
+       CAST(:sign AS integer) * SUM(oi.quantity),
+       CAST(:sign AS integer) * SUM(oi.quantity * oi.price)
+FROM orders o
+JOIN order_items oi ON oi.order_id = o.id
+CROSS JOIN {_GRANULARITIES}
+WHERE o.id = :order_id
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (granularity, bucket_start, brand_id, menu_item_id) DO UPDATE SET
+    quantity = item_sales_rollups.quantity + EXCLUDED.quantity,
+    revenue = item_sales_rollups.revenue + EXCLUDED.revenue
+""")
+
+# rebuild one closed [:start, :end) range, which must cover whole local days
+_BACKFILL_SQL = [
+    # wait out (and block) status changes to this range's orders until it commits
+    text("""
+    SELECT count(*) FROM (
+        SELECT 1 FROM orders WHERE created_at >= :start AND created_at < :end FOR SHARE
+    ) AS locked
+    """),
+    text("""
+    DELETE FROM revenue_rollups WHERE bucket_start >= :start AND bucket_start < :end
+    """),
+    text("""
+    DELETE FROM item_sales_rollups WHERE bucket_start >= :start AND bucket_start < :end
+    """),
+    text(f"""
+    INSERT INTO revenue_rollups
+        (granularity, bucket_start, brand_id, order_count, revenue, cancelled_count)
+    SELECT g.granularity, {_BUCKET}, o.brand_id,
+           COUNT(*),
+           COALESCE(
+               SUM(o.total) FILTER (WHERE o.status IS DISTINCT FROM 'cancelled'), 0
+           ),
+           COUNT(*) FILTER (WHERE o.status = 'cancelled')
+    FROM orders o CROSS JOIN {_GRANULARITIES}
+    WHERE o.created_at >= :start AND o.created_at < :end
+    GROUP BY 1, 2, 3
+    """),
+    text(f"""
+    INSERT INTO item_sales_rollups
+        (granularity, bucket_start, brand_id, menu_item_id, quantity, revenue)
+    SELECT g.granularity, {_BUCKET}, o.brand_id, oi.menu_item_id,
+           SUM(oi.quantity), SUM(oi.quantity * oi.price)
+    FROM orders o
+    JOIN order_items oi ON oi.order_id = o.id
+    CROSS JOIN {_GRANULARITIES}
+    WHERE o.created_at >= :start AND o.created_at < :end
+      AND o.status IS DISTINCT FROM 'cancelled'
+    GROUP BY 1, 2, 3, 4
+    """),
+]
+
+# a day counts as closed once it ended this long ago, so orders whose
+# transaction began just before midnight have committed
+_CLOSE_GRACE = timedelta(minutes=5)
+
+
+async def _apply(
+    session: AsyncSession, order_id: int, placed: int, sign: int, cancelled: int
+) -> None:
+    if not settings.ANALYTICS_ROLLUPS_ENABLED:
+        return
+    await session.execute(
+        _APPLY_ORDER_SQL,
+        {
+            "order_id": order_id,
+            "placed": placed,
+            "sign": sign,
+            "cancelled": cancelled,
+            "tz": settings.ANALYTICS_TIMEZONE,
+        },
+    )
+
+
+async def record_order_created(session: AsyncSession, order_id: int) -> None:
+    """Add a new order to the rollups.
+
+    Call inside the order's transaction, after its items are flushed.
+    """
+    await _apply(session, order_id, placed=1, sign=1, cancelled=0)
+
+
+async def record_status_change(
+    session: AsyncSession, order_id: int, old: Optional[str], new: Optional[str]
+) -> None:
+    """Adjust rollups when an order moves into or out of `cancelled`.
+
+    Other moves don't affect them.
+    """
+    if old == new:
+        return
+    if new == "cancelled":
+        await _apply(session, order_id, placed=0, sign=-1, cancelled=1)
+    elif old == "cancelled":
+        await _apply(session, order_id, placed=0, sign=1, cancelled=-1)
+
+
+def closed_days(
+    since: datetime, now: datetime, tz: str
+) -> List[Tuple[datetime, datetime]]:
+    """[start, end) of each whole local day from the one containing `since` up to
+    the last one that closed before `now`; 23/25-hour days follow DST."""
+    zone = ZoneInfo(tz)
+    day = since.astimezone(zone).date()
+    last = (now - _CLOSE_GRACE).astimezone(zone).date()
+    out = []
+    while day < last:
+        nxt = day + timedelta(days=1)
+        out.append(
+            (
+                datetime(day.year, day.month, day.day, tzinfo=zone),
+                datetime(nxt.year, nxt.month, nxt.day, tzinfo=zone),
+            )
+        )
+        day = nxt
+    return out
+
+
+async def backfill(session: AsyncSession, since: Optional[datetime] = None) -> int:
+    """Rebuild rollups from `orders`, one closed day per transaction, from the day
+    containing `since` (default: the first order). Returns the number of days.
+
+    The current day is left to the incremental updates. Each day's orders are
+    share-locked only while that day is rebuilt, so order writes keep flowing.
+    """
+    if since is None:
+        since = (
+            await session.execute(text("SELECT min(created_at) FROM orders"))
+        ).scalar()
+        await session.commit()
+        if since is None:
+            return 0
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    days = closed_days(since, datetime.now(timezone.utc), settings.ANALYTICS_TIMEZONE)
+    for start, end in days:
+        params = {"start": start, "end": end, "tz": settings.ANALYTICS_TIMEZONE}
+        for stmt in _BACKFILL_SQL:
+            await session.execute(stmt, params)
+        await session.commit()
+    logger.info(
+        "analytics_rollups_backfilled",
+        extra={"since": since.isoformat(), "days": len(days)},
+    )
+    return len(days)
+
+
+_backfill_task: Optional[asyncio.Task] = None
+
+
+def start_backfill(since: Optional[datetime] = None) -> bool:
+    """Run `backfill` in the background with its own session.
+
+    Returns False if one is already running.
+    """
+    global _backfill_task
+    if _backfill_task is not None and not _backfill_task.done():
+        return False
+
+    async def run() -> None:
+        from database import SessionLocal
+
+        try:
+            async with SessionLocal() as session:
+                await backfill(session, since)
+        except Exception:
+            logger.exception("analytics_rollups_backfill_failed")
+
+    _backfill_task = asyncio.get_running_loop().create_task(run())
+    return True
+
+
+async def revenue_series(
+    session: AsyncSession,
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    brand_id: Optional[int] = None,
+) -> List[dict]:
+    sql = """
+    SELECT bucket_start, brand_id, order_count, revenue, cancelled_count
+    FROM revenue_rollups
+    WHERE granularity = :granularity
+      AND bucket_start >= :start AND bucket_start < :end
+    """
+    params = {"granularity": granularity, "start": start, "end": end}
+    if brand_id is not None:
+        sql += " AND brand_id = :brand_id"
+        params["brand_id"] = brand_id
+    sql += " ORDER BY bucket_start, brand_id"
+    rows = (await session.execute(text(sql), params)).mappings().all()
+    return [dict(r) for r in rows]
+
+
+async def top_items(
+    session: AsyncSession,
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    brand_id: Optional[int] = None,
+    limit: int = 10,
+) -> List[dict]:
+    sql = """
+    SELECT r.menu_item_id, r.brand_id, m.name,
+           SUM(r.quantity) AS quantity, SUM(r.revenue) AS revenue
+    FROM item_sales_rollups r
+    LEFT JOIN menu_items m ON m.id = r.menu_item_id
+    WHERE r.granularity = :granularity
+      AND r.bucket_start >= :start AND r.bucket_start < :end
+    """
+    params = {"granularity": granularity, "start": start, "end": end, "limit": limit}
+    if brand_id is not None:
+        sql += " AND r.brand_id = :brand_id"
+        params["brand_id"] = brand_id
+    sql += """
+    GROUP BY r.menu_item_id, r.brand_id, m.name
+    HAVING SUM(r.quantity) > 0
+    ORDER BY quantity DESC, revenue DESC
+    LIMIT :limit
+    """
+    rows = (await session.execute(text(sql), params)).mappings().all()
+    return [dict(r) for r in rows]
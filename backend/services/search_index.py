@@ -0,0 +1,264 @@
+import asyncio
+import heapq
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models.menu_item import MenuItem
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _doc_grams(token: str) -> Set[str]:
+    # pad both ends so short tokens still produce grams and word starts/ends weigh in
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _query_grams(token: str) -> Set[str]:
+    # no trailing pad: a query token is treated as a (possibly complete) prefix
+    padded = f"  {token}"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class IndexedItem:
+    id: int
+    brand_id: int
+    name: str
+    price: float
+    category: Optional[str]
+    available: bool
+    tokens: Tuple[str, ...]
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "brand_id": self.brand_id,
+            "name": self.name,
+            "price": self.price,
+            "category": self.category,
+            "available": self.available,
+        }
+
+
+class MenuSearchIndex:
+    """In-process fuzzy index over menu item names and categories.
+
+    Two levels keep lookups proportional to the vocabulary rather than the item
+    count: trigrams map to the distinct tokens that contain them, and each
+    token maps (per brand) to the items using it. A query token is matched
+    against the vocabulary by the share of its trigrams a token contains -- this
+    tolerates typos, and since the query side is not end-padded it also acts as
+    a prefix match. Tokens that start with the query token get a bonus so prefix
+    hits outrank fuzzy ones. Only available items are posted, so unavailable
+    ones cost nothing at query time. Updated incrementally by admin menu writes;
+    menu changes made elsewhere (other workers, seed scripts) mark brands stale
+    via `mark_stale`, and `refresh` reloads just those brands on the next search.
+    """
+
+    def __init__(self, min_score: float = 0.5, prefix_bonus: float = 0.25) -> None:
+        self.min_score = min_score
+        self.prefix_bonus = prefix_bonus
+        self._items: Dict[int, IndexedItem] = {}
+        self._gram_tokens: Dict[str, Set[str]] = defaultdict(set)
+        self._token_docs: Dict[str, Dict[int, Set[int]]] = {}
+        self._loaded = False
+        # brands changed in the database since they were indexed; None: all of them
+        self._stale: Set[int] = set()
+        self._stale_all = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def fresh(self) -> bool:
+        """Loaded, and no menu change has been signalled since."""
+        return self._loaded and not self._stale_all and not self._stale
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def mark_stale(self, brand_id: Optional[int] = None) -> None:
+        """Note that a brand's items (None: any brand's) changed in the database."""
+        if brand_id is None:
+            self._stale_all = True
+        else:
+            self._stale.add(brand_id)
+
+    def upsert(self, item) -> None:
+        """Index (or re-index) anything shaped like a `MenuItem` row."""
+        self.remove(item.id)
+        doc = IndexedItem(
+            id=item.id,
+            brand_id=item.brand_id,
+            name=item.name,
+            price=float(item.price),
+            category=item.category,
+            available=bool(item.available),
+            tokens=tuple(dict.fromkeys(_tokens(item.name) + _tokens(item.category))),
+        )
+        self._items[doc.id] = doc
+        if not doc.available:
+            return
+        for tok in doc.tokens:
+            by_brand = self._token_docs.get(tok)
+            if by_brand is None:
+                by_brand = self._token_docs[tok] = {}
+                for g in _doc_grams(tok):
+                    self._gram_tokens[g].add(tok)
+            by_brand.setdefault(doc.brand_id, set()).add(doc.id)
+
+    def remove(self, item_id: int) -> None:
+        doc = self._items.pop(item_id, None)
+        if doc is None or not doc.available:
+            return
+        for tok in doc.tokens:
+            by_brand = self._token_docs[tok]
+            ids = by_brand[doc.brand_id]
+            ids.discard(item_id)
+            if ids:
+                continue
+            del by_brand[doc.brand_id]
+            if by_brand:
+                continue
+            # last use of this token: drop it from the vocabulary
+            del self._token_docs[tok]
+            for g in _doc_grams(tok):
+                toks = self._gram_tokens[g]
+                toks.discard(tok)
+                if not toks:
+                    del self._gram_tokens[g]
+
+    def replace(self, items: Iterable) -> None:
+        self._items.clear()
+        self._gram_tokens.clear()
+        self._token_docs.clear()
+        for item in items:
+            self.upsert(item)
+        self._loaded = True
+
+    async def _fetch(
+        self, session: Optional[AsyncSession], brand_ids: Optional[Set[int]] = None
+    ) -> list:
+        stmt = select(MenuItem)
+        if brand_ids is not None:
+            stmt = stmt.where(MenuItem.brand_id.in_(brand_ids))
+        if session is None:
+            from database import SessionLocal
+
+            async with SessionLocal() as own:
+                return (await own.execute(stmt)).scalars().all()
+        return (await session.execute(stmt)).scalars().all()
+
+    async def rebuild(self, session: Optional[AsyncSession] = None) -> None:
+        async with self._lock:
+            # cleared first: a change signalled while loading must not be lost
+            self._stale_all = False
+            self._stale.clear()
+            try:
+                rows = await self._fetch(session)
+            except BaseException:
+                self._stale_all = True
+                raise
+            self.replace(rows)
+        logger.info(
+            "menu_search_index_built",
+            extra={"items": len(self._items), "tokens": len(self._token_docs)},
+        )
+
+    async def refresh(self) -> None:
+        """Bring the index up to date: reload the stale brands, or everything."""
+        if not self._loaded or self._stale_all:
+            await self.rebuild()
+            return
+        async with self._lock:
+            brands, self._stale = self._stale, set()
+            if not brands:
+                return
+            try:
+                rows = await self._fetch(None, brands)
+            except BaseException:
+                self._stale |= brands
+                raise
+            for item_id in [
+                i for i, doc in self._items.items() if doc.brand_id in brands
+            ]:
+                self.remove(item_id)
+            for row in rows:
+                self.upsert(row)
+        logger.info(
+            "menu_search_index_refreshed",
+            extra={"brands": sorted(brands), "items": len(rows)},
+        )
+
+    def _match_vocabulary(self, qtok: str) -> Dict[str, float]:
+        """Vocabulary tokens similar to `qtok`, with bonus-adjusted similarity."""
+        grams = _query_grams(qtok)
+        shared: Dict[str, int] = defaultdict(int)
+        for g in grams:
+            for tok in self._gram_tokens.get(g, ()):
+                shared[tok] += 1
+        out = {}
+        for tok, n in shared.items():
+            sim = n / len(grams)
+            if sim < self.min_score:
+                continue
+            if tok.startswith(qtok):
+                sim += self.prefix_bonus
+            out[tok] = sim
+        return out
+
+    def search(
+        self, q: str, brand_id: Optional[int] = None, limit: int = 20
+    ) -> List[Tuple[float, IndexedItem]]:
+        """Top `limit` available items for `q`, best first, as (score, item)."""
+        tokens = list(dict.fromkeys(_tokens(q)))
+        if not tokens:
+            return []
+
+        # per item, the best similarity reached for each query token, summed
+        scores: Dict[int, float] = defaultdict(float)
+        for qtok in tokens:
+            # visit matches best-first so each item keeps its highest similarity;
+            # set differences keep the per-item work in C
+            seen: Set[int] = set()
+            matches = sorted(
+                self._match_vocabulary(qtok).items(), key=lambda m: m[1], reverse=True
+            )
+            for tok, sim in matches:
+                by_brand = self._token_docs[tok]
+                groups = (
+                    (by_brand.get(brand_id, set()),)
+                    if brand_id is not None
+                    else by_brand.values()
+                )
+                for ids in groups:
+                    fresh = ids - seen
+                    seen |= fresh
+                    for item_id in fresh:
+                        scores[item_id] += sim
+
+        n_tokens = len(tokens)
+        cutoff = self.min_score * n_tokens
+        top = heapq.nlargest(limit, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+        return [
+            (round(total / n_tokens, 4), self._items[item_id])
+            for item_id, total in top
+            if total >= cutoff
+        ]
+
+
+menu_index = MenuSearchIndex()
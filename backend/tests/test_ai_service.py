@@ -1,8 +1,12 @@
-import pytest
+import json
 
+import httpx
+import pytest
+from core.config import settings
 from pydantic import ValidationError
-
-from services.ai import generate_response, AIRequest
+from routes.ai import _sse
+from services.ai import AIRequest, generate_response, stream_response
+from services.ai.adapter import AIAdapter
 
 
 class DummyAdapter:
@@ -41,3 +45,183 @@ async def test_provider_failure_handling(monkeypatch):
     req = AIRequest(message="Will fail")
     with pytest.raises(Exception):
         await generate_response(req)
+
+
+class StreamingAdapter(DummyAdapter):
+    def __init__(self, attempts):
+        super().__init__()
+        # one list of events per attempt; an exception instance is raised
+        self._attempts = list(attempts)
+        self.calls = 0
+
+    async def stream_prompt(self, prompt, timeout=None):
+        events = self._attempts[self.calls]
+        self.calls += 1
+        for event in events:
+            if isinstance(event, Exception):
+                raise event
+            yield event
+
+
+async def _collect(stream):
+    return [event async for event in stream]
+
+
+@pytest.mark.asyncio
+async def test_stream_relays_deltas_then_usage(monkeypatch):
+    usage = {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}
+    dummy = StreamingAdapter([[{"delta": "Hel"}, {"delta": "lo"}, {"usage": usage}]])
+    monkeypatch.setattr("services.ai.service._get_adapter", lambda: dummy)
+    events = await _collect(stream_response(AIRequest(message="hi")))
+    assert events == [{"delta": "Hel"}, {"delta": "lo"}, {"usage": usage}]
+
+
+@pytest.mark.asyncio
+async def test_stream_retries_only_before_first_delta(monkeypatch):
+    dummy = StreamingAdapter(
+        [[Exception("connect failed")], [{"delta": "ok"}, {"usage": {}}]]
+    )
+    monkeypatch.setattr("services.ai.service._get_adapter", lambda: dummy)
+    events = await _collect(stream_response(AIRequest(message="hi")))
+    assert events == [{"delta": "ok"}, {"usage": {}}]
+    assert dummy.calls == 2
+
+    # once text has been relayed, a failure ends the stream instead of repeating it
+    dummy = StreamingAdapter([[{"delta": "par"}, Exception("reset")], []])
+    monkeypatch.setattr("services.ai.service._get_adapter", lambda: dummy)
+    received = []
+    with pytest.raises(Exception, match="reset"):
+        async for event in stream_response(AIRequest(message="hi")):
+            received.append(event)
+    assert received == [{"delta": "par"}]
+    assert dummy.calls == 1
+
+
+class _SSEBody(httpx.AsyncByteStream):
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _openai_adapter(monkeypatch, body, seen):
+    monkeypatch.setattr(settings, "AI_PROVIDER", "openai")
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    adapter = AIAdapter()
+
+    async def handler(request):
+        seen.append(json.loads(request.content))
+        return httpx.Response(200, stream=body)
+
+    class Transport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            return await handler(request)
+
+    adapter.client = httpx.AsyncClient(base_url=adapter.base_url, transport=Transport())
+    return adapter
+
+
+def _sse_chunk(payload):
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+@pytest.mark.asyncio
+async def test_openai_stream_parses_events_and_usage(monkeypatch):
+    body = _SSEBody(
+        [
+            _sse_chunk({"choices": [{"delta": {"role": "assistant"}}]}),
+            _sse_chunk({"choices": [{"delta": {"content": "Try the "}}]}),
+            # an event may arrive split across reads
+            _sse_chunk({"choices": [{"delta": {"content": "dal."}}]})[:20],
+            _sse_chunk({"choices": [{"delta": {"content": "dal."}}]})[20:],
+            _sse_chunk(
+                {"choices": [], "usage": {"prompt_tokens": 9, "completion_tokens": 3}}
+            ),
+            b"data: [DONE]\n\n",
+        ]
+    )
+    seen = []
+    adapter = _openai_adapter(monkeypatch, body, seen)
+    events = await _collect(adapter.stream_prompt("hi"))
+    assert events == [
+        {"delta": "Try the "},
+        {"delta": "dal."},
+        {"usage": {"prompt_tokens": 9, "completion_tokens": 3, "total_tokens": 12}},
+    ]
+    assert seen[0]["stream"] is True
+    assert body.closed
+    await adapter.close()
+
+
+class _GeminiChunk:
+    """Mimics google-generativeai's chunk: .text raises without text parts."""
+
+    def __init__(self, texts, usage=None):
+        parts = [type("Part", (), {"text": t})() for t in texts]
+        content = type("Content", (), {"parts": parts})()
+        self.candidates = [type("Candidate", (), {"content": content})()]
+        self.usage_metadata = usage
+
+    @property
+    def text(self):
+        raise ValueError("The `response.text` quick accessor requires text parts")
+
+
+@pytest.mark.asyncio
+async def test_gemini_stream_skips_chunks_without_text(monkeypatch):
+    usage = type(
+        "Usage",
+        (),
+        {"prompt_token_count": 7, "candidates_token_count": 2, "total_token_count": 9},
+    )()
+    chunks = [
+        _GeminiChunk(["Try the "]),
+        _GeminiChunk(["dal."]),
+        _GeminiChunk([], usage),
+    ]
+
+    class Model:
+        async def generate_content_async(self, prompt, stream, request_options):
+            async def response():
+                for chunk in chunks:
+                    yield chunk
+
+            return response()
+
+    adapter = AIAdapter.__new__(AIAdapter)
+    adapter.provider = "gemini"
+    adapter.gemini = Model()
+    events = await _collect(adapter.stream_prompt("hi"))
+    assert events == [
+        {"delta": "Try the "},
+        {"delta": "dal."},
+        {"usage": {"prompt_tokens": 7, "completion_tokens": 2, "total_tokens": 9}},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_closing_the_stream_closes_the_upstream_response(monkeypatch):
+    body = _SSEBody(
+        [_sse_chunk({"choices": [{"delta": {"content": f"{i} "}}]}) for i in range(50)]
+    )
+    adapter = _openai_adapter(monkeypatch, body, [])
+    monkeypatch.setattr("services.ai.service._get_adapter", lambda: adapter)
+    stream = stream_response(AIRequest(message="hi"))
+    assert await stream.__anext__() == {"delta": "0 "}
+    # what happens when the client disconnects mid-reply
+    await stream.aclose()
+    assert body.closed
+    await adapter.close()
+
+
+def test_sse_splits_multiline_payloads():
+    assert _sse("one\ntwo") == "data: one\ndata: two\n\n"
+    assert _sse('{"total_tokens": 5}', event="usage") == (
+        'event: usage\ndata: {"total_tokens": 5}\n\n'
+    )
@@ -0,0 +1,36 @@
+from services.brand_registry import BrandInfo, BrandRegistry
+from services.cache import Snapshot, menu_cache
+
+
+def test_lookup_by_id_and_slug():
+    reg = BrandRegistry()
+    reg.replace(
+        [
+            BrandInfo(id=1, name="Tazty Foodz", slug="tazty-foodz"),
+            BrandInfo(id=2, name="Ideal Foodz", slug="ideal-foodz"),
+        ]
+    )
+    assert reg.get(1).slug == "tazty-foodz"
+    assert reg.get("2").slug == "ideal-foodz"
+    assert reg.get("ideal-foodz").id == 2
+    assert reg.by_slug("1") is None
+    assert reg.get("missing") is None
+    # non-ASCII digits are slugs, not ids
+    assert reg.get("\u00b2") is None
+
+
+def test_replace_reports_changes_and_drops_stale_menus():
+    reg = BrandRegistry()
+    brands = [BrandInfo(id=5, name="Healthy Foodz", slug="healthy-foodz")]
+    assert reg.replace(brands) is True
+    first = reg.snapshot
+    assert reg.replace(list(brands)) is False
+    assert reg.snapshot is first
+
+    menu_cache._store(5, Snapshot(version=menu_cache.next_version(), body=b"{}", tag=5))
+    assert (
+        reg.replace([BrandInfo(id=5, name="Healthy Foodz 2.0", slug="healthy-foodz")])
+        is True
+    )
+    assert menu_cache.peek(5) is None
+    assert reg.snapshot.etag != first.etag
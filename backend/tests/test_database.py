@@ -0,0 +1,48 @@
+import database
+
+
+def test_neon_direct_url_drops_the_pooler_suffix():
+    assert database._direct_url("postgresql+asyncpg://u:p@ep-x-pooler.neon.tech/d") == (
+        "postgresql+asyncpg://u:p@ep-x.neon.tech/d"
+    )
+    assert database._direct_url("postgresql+asyncpg://u@localhost/d") == (
+        "postgresql+asyncpg://u@localhost/d"
+    )
+
+
+def test_pgbouncer_profile_disables_statement_caches(monkeypatch):
+    args = database.engine_connect_args({}, pgbouncer=True)
+    assert args["prepared_statement_cache_size"] == 0
+    assert args["statement_cache_size"] == 0
+    name = args["prepared_statement_name_func"]
+    assert name() != name()
+    assert "statement_cache_size" not in database.engine_connect_args(
+        {}, pgbouncer=False
+    )
+
+    monkeypatch.setattr(database.settings, "DB_PGBOUNCER", None)
+    assert database._uses_pgbouncer("postgresql+asyncpg://u@ep-x-pooler.neon.tech/d")
+    assert not database._uses_pgbouncer("postgresql+asyncpg://u@ep-x.neon.tech/d")
+    monkeypatch.setattr(database.settings, "DB_PGBOUNCER", True)
+    assert database._uses_pgbouncer("postgresql+asyncpg://u@localhost/d")
+
+
+def test_sslmode_moves_to_connect_args():
+    from database import _split_url
+
+    url, args = _split_url("postgresql+asyncpg://u@h/d?sslmode=require&x=1")
+    assert url == "postgresql+asyncpg://u@h/d?x=1"
+    assert args == {"ssl": True}
+    assert _split_url("postgresql+asyncpg://u@h/d") == (
+        "postgresql+asyncpg://u@h/d",
+        {},
+    )
+
+
+def test_pool_stats_reports_configured_pool():
+    from database import pool_stats, settings
+
+    stats = pool_stats()
+    assert stats["size"] == settings.DB_POOL_SIZE
+    assert stats["checked_out"] == 0
+    assert set(stats["wait_seconds"]) >= {"count", "mean", "p95"}
@@ -0,0 +1,60 @@
+import pytest
+from core.http_cache import etag_matches, make_etag
+from fastapi.testclient import TestClient
+from services.brand_registry import BrandInfo, brand_registry
+from services.cache import Snapshot, menu_cache, render_json
+
+
+class _Req:
+    def __init__(self, header):
+        self.headers = {"if-none-match": header} if header is not None else {}
+
+
+def test_etag_matching_rules():
+    etag = make_etag("menu", 1, 5)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("menu", 1, 5)
+    assert etag != make_etag("menu", 1, 6)
+    assert etag_matches(_Req(etag), etag)
+    assert etag_matches(_Req(f'"other", W/{etag}'), etag)
+    assert etag_matches(_Req("*"), etag)
+    assert not etag_matches(_Req('"other"'), etag)
+    assert not etag_matches(_Req(None), etag)
+
+
+@pytest.fixture
+def client():
+    from main import app
+
+    # no `with` block: startup (and its DB work) is not run, so every
+    # request below must be served from the cache alone
+    yield TestClient(app)
+    menu_cache.clear()
+
+
+def test_menu_conditional_get_skips_db(client):
+    brand_registry.replace([BrandInfo(id=9001, name="Cached", slug="cached")])
+    body = render_json({"brand": "Cached", "slug": "cached", "menu": []})
+    menu_cache._store(
+        9001, Snapshot(version=menu_cache.next_version(), body=body, tag=9001)
+    )
+
+    r = client.get("/menu/9001")
+    assert r.status_code == 200
+    assert r.json()["brand"] == "Cached"
+    etag = r.headers["etag"]
+    assert "stale-while-revalidate" in r.headers["cache-control"]
+
+    r2 = client.get("/menu/9001", headers={"If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.content == b""
+    assert r2.headers["etag"] == etag
+
+    # the slug resolves to the same snapshot
+    r3 = client.get("/menu/cached", headers={"If-None-Match": etag})
+    assert r3.status_code == 304
+
+    r4 = client.get("/brands/")
+    assert r4.json() == [
+        {"id": 9001, "name": "Cached", "slug": "cached", "description": None}
+    ]
@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+import pytest
+from core.config import settings
+from database import get_session
+from fastapi import FastAPI
+from routes import orders as orders_routes
+from services.idempotency import (
+    IdempotencyConflict,
+    MemoryIdempotencyStore,
+    _make_store,
+)
+
+
+async def _post(store, key, fp, calls, fail=False):
+    async with store.guard(None, key, fp) as guard:
+        if guard.replay is not None:
+            return guard.replay.body
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        if fail:
+            raise ValueError("boom")
+        await guard.save(None, 201, {"id": len(calls)})
+        return b"fresh"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_wait_for_the_first():
+    store, calls = MemoryIdempotencyStore(ttl_seconds=60), []
+    results = await asyncio.gather(*(_post(store, "k1", "fp", calls) for _ in range(5)))
+    assert calls == ["k1"]
+    assert sorted(results) == [b"fresh"] + [b'{"id":1}'] * 4
+    # later retries replay without running the work again
+    assert await _post(store, "k1", "fp", calls) == b'{"id":1}'
+    assert calls == ["k1"]
+
+
+@pytest.mark.asyncio
+async def test_reused_key_with_other_body_is_rejected():
+    store, calls = MemoryIdempotencyStore(ttl_seconds=60), []
+    await _post(store, "k1", "fp", calls)
+    with pytest.raises(IdempotencyConflict):
+        await _post(store, "k1", "other", calls)
+
+
+@pytest.mark.asyncio
+async def test_failed_attempt_releases_key():
+    store, calls = MemoryIdempotencyStore(ttl_seconds=60), []
+    first = asyncio.ensure_future(_post(store, "k1", "fp", calls, fail=True))
+    await asyncio.sleep(0)
+    retry = asyncio.ensure_future(_post(store, "k1", "fp", calls))
+    with pytest.raises(ValueError):
+        await first
+    assert await retry == b"fresh"
+    assert calls == ["k1", "k1"]
+
+
+@pytest.mark.asyncio
+async def test_keys_expire_after_ttl():
+    store, calls = MemoryIdempotencyStore(ttl_seconds=0), []
+    await _post(store, "k1", "fp", calls)
+    await _post(store, "k1", "fp", calls)
+    assert calls == ["k1", "k1"]
+
+
+def test_unknown_store_lists_allowed_values(monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_STORE", "redis")
+    with pytest.raises(ValueError, match="memory, postgres"):
+        _make_store()
+
+
+@pytest.mark.asyncio
+async def test_memory_store_leaves_keyed_orders_free_to_batch(monkeypatch):
+    seen = []
+
+    async def create_order(session, payload, before_commit=None):
+        # before_commit=None is what lets create_order hand off to the ingest queue
+        seen.append(before_commit)
+        return {"id": 9, "total": 10.0}
+
+    monkeypatch.setattr(orders_routes, "create_order", create_order)
+    monkeypatch.setattr(
+        orders_routes, "idempotency_store", MemoryIdempotencyStore(ttl_seconds=60)
+    )
+    app = FastAPI()
+    app.include_router(orders_routes.router, prefix="/orders")
+    app.dependency_overrides[get_session] = lambda: None
+    body = {
+        "brand_slug": "ideal-foodz",
+        "customer_name": "A",
+        "items": [{"menu_item_id": 1, "quantity": 1}],
+    }
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://t"
+    ) as client:
+        first = await client.post(
+            "/orders/", json=body, headers={"Idempotency-Key": "k"}
+        )
+        retry = await client.post(
+            "/orders/", json=body, headers={"Idempotency-Key": "k"}
+        )
+    assert seen == [None]
+    assert first.status_code == 201 and retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    # both answers let the client read its order back from a lagging replica
+    assert float(first.headers["X-Read-After"]) > 0
+    assert float(retry.headers["X-Read-After"]) > 0
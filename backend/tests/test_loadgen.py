@@ -0,0 +1,69 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from loadgen import MockAITransport, Recorder, StreamingASGITransport, percentile
+
+
+def test_percentile_nearest_rank():
+    ordered = [float(i) for i in range(1, 101)]
+    assert percentile(ordered, 0.50) == 50.0
+    assert percentile(ordered, 0.95) == 95.0
+    assert percentile(ordered, 0.99) == 99.0
+    assert percentile([3.0], 0.99) == 3.0
+    assert percentile([], 0.5) is None
+
+
+def test_summary_per_route_and_total():
+    rec = Recorder()
+    rec.record("GET /a", 0.5, 200)  # warmup: not recorded
+    rec.enabled = True
+    for ms in (10, 20, 30, 40):
+        rec.record("GET /a", ms / 1000, 200)
+    rec.record("POST /b", 0.1, 503)
+    rec.record("POST /b", 0.2, None)
+    report = rec.summary(elapsed=2.0)
+    a, b = report["routes"]["GET /a"], report["routes"]["POST /b"]
+    assert (a["count"], a["errors"], a["rps"]) == (4, 0, 2.0)
+    assert (a["p50_ms"], a["p99_ms"], a["max_ms"]) == (20.0, 40.0, 40.0)
+    assert b["errors"] == 2
+    assert b["statuses"] == {"503": 1, "exception": 1}
+    assert report["total"]["count"] == 6
+
+
+@pytest.mark.asyncio
+async def test_stream_records_first_byte_and_total():
+    rec = Recorder()
+    rec.enabled = True
+    transport = MockAITransport(latency=0)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+        await rec.stream(
+            client, "POST /ai", "POST", "/v1/chat/completions", json={"stream": True}
+        )
+    assert set(rec.samples) == {"POST /ai", "POST /ai (first byte)"}
+    assert rec.errors["POST /ai"] == 0
+
+
+@pytest.mark.asyncio
+async def test_transport_hands_over_streamed_body_as_sent():
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        async def body():
+            yield b"first"
+            await asyncio.sleep(0.2)
+            yield b"second"
+
+        return StreamingResponse(body())
+
+    rec = Recorder()
+    rec.enabled = True
+    async with httpx.AsyncClient(
+        transport=StreamingASGITransport(app), base_url="http://t"
+    ) as client:
+        await rec.stream(client, "GET /slow", "GET", "/slow")
+    first, total = rec.samples["GET /slow (first byte)"][0], rec.samples["GET /slow"][0]
+    assert total >= 0.2 > first
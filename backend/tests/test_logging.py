@@ -0,0 +1,73 @@
+import io
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from core import logging as log_mod
+from core.logging import DroppingQueueHandler, JSONFormatter, SamplingFilter
+
+
+def _record(msg, level=logging.INFO, **extra):
+    record = logging.LogRecord("app", level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_formatter_encodes_extras_in_one_pass():
+    out = json.loads(
+        JSONFormatter().format(_record("order_saved", total=Decimal("9.50"), n=3))
+    )
+    assert out["message"] == "order_saved"
+    assert out["n"] == 3
+    # not JSON-native: stringified rather than silently dropped
+    assert out["total"] == "9.50"
+
+
+def test_encoders_agree_on_datetimes(monkeypatch):
+    payload = {"at": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc), 7: "x"}
+    fast = log_mod._dumps(payload)
+    monkeypatch.setattr(log_mod, "orjson", None)
+    assert json.loads(fast) == json.loads(log_mod._dumps(payload))
+    assert json.loads(fast)["at"] == "2026-01-02 03:04:05+00:00"
+
+
+def test_sampling_skips_only_configured_info_events(monkeypatch):
+    monkeypatch.setattr(log_mod.random, "random", lambda: 0.5)
+    f = SamplingFilter({"ai_http_response": 0.1})
+    before = log_mod.log_records_sampled_out.value("ai_http_response")
+    assert not f.filter(_record("ai_http_response"))
+    assert f.filter(_record("ai_http_response", level=logging.WARNING))
+    assert f.filter(_record("order_saved"))
+    assert log_mod.log_records_sampled_out.value("ai_http_response") == before + 1
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    before = log_mod.log_records_dropped.value()
+    handler.handle(_record("a"))
+    handler.handle(_record("b"))
+    assert log_mod.log_records_dropped.value() == before + 1
+
+
+def test_queued_records_are_written_by_the_listener(monkeypatch):
+    out = io.StringIO()
+
+    def output_handler():
+        handler = logging.StreamHandler(out)
+        handler.setFormatter(JSONFormatter())
+        return handler
+
+    monkeypatch.setattr(log_mod, "_output_handler", output_handler)
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    try:
+        log_mod.configure_logging()
+        logging.getLogger("t").info("hello %s", "world", extra={"k": 1})
+        log_mod.stop_logging()
+    finally:
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+    line = json.loads(out.getvalue().splitlines()[0])
+    assert line["message"] == "hello world" and line["k"] == 1
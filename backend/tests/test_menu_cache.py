@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from services.cache import Snapshot, SnapshotCache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    cache = SnapshotCache("test")
+    calls = {"n": 0}
+
+    async def loader(version):
+        calls["n"] += 1
+        await asyncio.sleep(0.01)
+        return Snapshot(version=version, body=b"[]", tag=1)
+
+    results = await asyncio.gather(*[cache.get_or_load(1, loader) for _ in range(20)])
+    assert calls["n"] == 1
+    assert all(r is results[0] for r in results)
+    # a hit does not call the loader again
+    assert await cache.get_or_load(1, loader) is results[0]
+    assert calls["n"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tag_bumps_version():
+    cache = SnapshotCache("test")
+
+    async def loader(version):
+        return Snapshot(version=version, body=b"{}", tag=7)
+
+    first = await cache.get_or_load("slug-alias", loader)
+    cache.invalidate_tag(7)
+    assert cache.peek("slug-alias") is None
+    second = await cache.get_or_load("slug-alias", loader)
+    assert second.version > first.version
+
+
+@pytest.mark.asyncio
+async def test_load_overlapping_invalidation_is_not_stored():
+    cache = SnapshotCache("test")
+    release = asyncio.Event()
+
+    async def slow_loader(version):
+        await release.wait()
+        return Snapshot(version=version, body=b"stale", tag=1)
+
+    task = asyncio.create_task(cache.get_or_load(1, slow_loader))
+    await asyncio.sleep(0)
+    cache.invalidate_tag(1)
+    release.set()
+    snap = await task
+    assert snap.body == b"stale"
+    assert cache.peek(1) is None
+
+
+@pytest.mark.asyncio
+async def test_reader_after_invalidation_does_not_join_stale_load():
+    cache = SnapshotCache("test")
+    release = asyncio.Event()
+    bodies = iter([b"stale", b"fresh"])
+
+    async def loader(version):
+        body = next(bodies)
+        if body == b"stale":
+            await release.wait()
+        return Snapshot(version=version, body=body, tag=1)
+
+    early = asyncio.create_task(cache.get_or_load(1, loader))
+    await asyncio.sleep(0)
+    # the admin write commits and invalidates while the first load is running
+    cache.invalidate_tag(1)
+    late = await cache.get_or_load(1, loader)
+    release.set()
+    assert (await early).body == b"stale"
+    assert late.body == b"fresh"
+    assert cache.peek(1).body == b"fresh"
@@ -0,0 +1,73 @@
+import httpx
+import pytest
+from core import metrics
+from core.metrics import Registry
+from core.middleware.metrics import MetricsMiddleware
+from fastapi import FastAPI
+
+
+def test_histogram_renders_cumulative_buckets():
+    reg = Registry()
+    h = reg.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.observe(value, "/a")
+    reg.counter("hits_total", "Hits.", ("code",)).inc("200", amount=2)
+    reg.gauge("depth", "Depth.", fn=lambda: 7)
+    text = reg.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="/a"} 4' in text
+    assert 'latency_seconds_sum{route="/a"} 3.65' in text
+    assert 'hits_total{code="200"} 2' in text
+    assert "# TYPE depth gauge\ndepth 7" in text
+
+
+def test_histogram_summary_uses_bucket_bounds():
+    h = Registry().histogram("wait_seconds", "Wait.", buckets=(0.01, 0.1))
+    assert h.summary() == {
+        "count": 0,
+        "sum": 0.0,
+        "mean": None,
+        "p50": None,
+        "p95": None,
+        "p99": None,
+    }
+    for value in [0.005] * 18 + [0.05, 2.0]:
+        h.observe(value)
+    summary = h.summary()
+    assert summary["count"] == 20
+    assert summary["p50"] == 0.01
+    assert summary["p95"] == 0.1
+    assert summary["p99"] is None
+
+
+def test_label_values_are_escaped():
+    reg = Registry()
+    reg.counter("c_total", "C.", ("path",)).inc('a"b\\c')
+    assert 'c_total{path="a\\"b\\\\c"} 1' in reg.render()
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_by_route_template():
+    app = FastAPI()
+
+    @app.get("/things/{thing_id}")
+    async def thing(thing_id: int):
+        return {"id": thing_id}
+
+    app.add_middleware(MetricsMiddleware)
+    before_ok = metrics.http_requests.value("GET", "/things/{thing_id}", "200")
+    before_404 = metrics.http_requests.value("GET", "unmatched", "404")
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://t"
+    ) as client:
+        await client.get("/things/1")
+        await client.get("/things/2")
+        await client.get("/nope/3")
+    assert metrics.http_requests.value("GET", "/things/{thing_id}", "200") == (
+        before_ok + 2
+    )
+    assert metrics.http_requests.value("GET", "unmatched", "404") == before_404 + 1
+    assert metrics.http_request_duration.count("GET", "/things/{thing_id}") >= 2
+    assert metrics.http_in_flight.value() == 0
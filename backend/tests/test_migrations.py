@@ -0,0 +1,124 @@
+import re
+
+import migrations
+import models  # noqa: F401  (register every table)
+import models.user  # noqa: F401
+import pytest
+from database import Base
+
+
+def test_versions_are_contiguous():
+    found = migrations.discover()
+    assert [m.version for m in found] == list(range(1, len(found) + 1))
+
+
+def test_models_mirror_the_migrated_schema():
+    sql = "\n".join(s for m in migrations.discover() for s in m.statements)
+    created = set(re.findall(r"CREATE TABLE IF NOT EXISTS (\w+)", sql))
+    created |= set(re.findall(r"INDEX (?:CONCURRENTLY )?IF NOT EXISTS (\w+)", sql))
+    for table in Base.metadata.tables.values():
+        assert table.name in created
+        for index in table.indexes:
+            assert index.name in created, f"{index.name} has no migration"
+
+
+def test_concurrent_statements_are_rerunnable():
+    for migration in migrations.discover():
+        if not migration.transactional:
+            for statement in migration.statements:
+                assert "IF NOT EXISTS" in statement
+
+
+class _Result:
+    def __init__(self, value=None):
+        self.value = value
+
+    def scalars(self):
+        return iter(self.value or [])
+
+    def scalar(self):
+        return self.value
+
+
+class _Conn:
+    def __init__(self, applied, invalid=()):
+        self.applied = list(applied)
+        self.invalid = set(invalid)
+        self.log = []
+        self.engine = self
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.log.append(sql)
+        if sql.startswith("SELECT version FROM schema_migrations"):
+            return _Result(self.applied)
+        if "indisvalid" in sql:
+            return _Result(False if params["name"] in self.invalid else None)
+        if sql.startswith("INSERT INTO schema_migrations"):
+            self.applied.append(params["v"])
+        return _Result()
+
+    # engine.begin() for transactional migrations
+    def begin(self):
+        conn = self
+
+        class _Tx:
+            def __enter__(self):
+                conn.log.append("BEGIN")
+                return conn
+
+            def __exit__(self, *exc):
+                conn.log.append("COMMIT")
+                return False
+
+        return _Tx()
+
+
+def _fake_migrations(monkeypatch):
+    found = [
+        migrations.Migration(1, "tables", ("CREATE TABLE IF NOT EXISTS t (a int)",)),
+        migrations.Migration(
+            2,
+            "indexes",
+            ("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_t_a ON t (a)",),
+            transactional=False,
+        ),
+    ]
+    monkeypatch.setattr(migrations, "discover", lambda: found)
+
+
+def test_upgrade_applies_pending_in_order_under_the_lock(monkeypatch):
+    _fake_migrations(monkeypatch)
+    conn = _Conn(applied=[1], invalid={"ix_t_a"})
+    applied = migrations.upgrade(conn)
+    assert [m.version for m in applied] == [2]
+    assert conn.applied == [1, 2]
+    assert conn.log[0].startswith("SELECT pg_advisory_lock")
+    assert conn.log[-1].startswith("SELECT pg_advisory_unlock")
+    # an invalid leftover from an interrupted build is dropped and rebuilt
+    assert "DROP INDEX CONCURRENTLY IF EXISTS ix_t_a" in conn.log
+    assert "BEGIN" not in conn.log
+
+
+def test_transactional_migration_records_itself_in_the_transaction(monkeypatch):
+    _fake_migrations(monkeypatch)
+    conn = _Conn(applied=[])
+    migrations.upgrade(conn)
+    begin, commit = conn.log.index("BEGIN"), conn.log.index("COMMIT")
+    recorded = [i for i, sql in enumerate(conn.log) if "INSERT INTO" in sql]
+    assert begin < recorded[0] < commit
+
+
+def test_upgrade_releases_the_lock_on_failure(monkeypatch):
+    _fake_migrations(monkeypatch)
+    conn = _Conn(applied=[])
+
+    def boom(statement, params=None, _execute=conn.execute):
+        if "CREATE TABLE IF NOT EXISTS t" in str(statement):
+            raise RuntimeError("ddl failed")
+        return _execute(statement, params)
+
+    conn.execute = boom
+    with pytest.raises(RuntimeError):
+        migrations.upgrade(conn)
+    assert conn.log[-1].startswith("SELECT pg_advisory_unlock")
@@ -0,0 +1,95 @@
+import json
+
+from services.order_events import RESET, OrderEvent, OrderEventHub
+
+
+def _event(eid, brand_id, type_="order_created"):
+    return OrderEvent.parse(
+        json.dumps(
+            {"id": eid, "type": type_, "order_id": 100 + eid, "brand_id": brand_id}
+        )
+    )
+
+
+def _drain(sub):
+    out = []
+    while not sub.queue.empty():
+        out.append(sub.queue.get_nowait())
+    return out
+
+
+def test_fan_out_respects_brand_subscriptions():
+    hub = OrderEventHub()
+    everything, brand_2 = hub.subscribe(), hub.subscribe([2])
+    for eid, brand in [(1, 1), (2, 2), (3, 1)]:
+        hub.publish(_event(eid, brand))
+    assert [e.id for e in _drain(everything)] == [1, 2, 3]
+    assert [e.id for e in _drain(brand_2)] == [2]
+
+
+def test_resume_replays_buffered_events_after_last_id():
+    hub = OrderEventHub(buffer_size=10)
+    for eid in range(1, 6):
+        hub.publish(_event(eid, 1 if eid % 2 else 2))
+    sub = hub.subscribe([1], last_event_id=2)
+    assert [e.id for e in _drain(sub)] == [3, 5]
+    hub.publish(_event(6, 1))
+    assert [e.id for e in _drain(sub)] == [6]
+
+
+def test_resume_beyond_buffer_or_after_gap_gets_reset():
+    hub = OrderEventHub(buffer_size=3)
+    for eid in range(1, 8):
+        hub.publish(_event(eid, 1))
+    assert _drain(hub.subscribe(last_event_id=1)) == [RESET]
+    assert [e.id for e in _drain(hub.subscribe(last_event_id=5))] == [6, 7]
+
+    live = hub.subscribe()
+    hub._on_gap()
+    assert _drain(live) == [RESET]
+    # the stream ends, so its client notices the feed is down
+    assert not live.active
+    assert _drain(hub.subscribe(last_event_id=7)) == [RESET]
+
+
+def test_resume_follows_delivery_order_not_id_order():
+    # ids are drawn at write time; commits (and so deliveries) can land out of order
+    hub = OrderEventHub(buffer_size=10)
+    for eid in (10, 11, 9):
+        hub.publish(_event(eid, 1))
+    assert [e.id for e in _drain(hub.subscribe(last_event_id=11))] == [9]
+    assert [e.id for e in _drain(hub.subscribe(last_event_id=10))] == [11, 9]
+    assert _drain(hub.subscribe(last_event_id=9)) == []
+    assert _drain(hub.subscribe(last_event_id=8)) == [RESET]
+
+
+def test_slow_subscriber_is_dropped_with_reset():
+    hub = OrderEventHub(subscriber_queue=2)
+    sub = hub.subscribe()
+    for eid in range(1, 4):
+        hub.publish(_event(eid, 1))
+    assert not sub.active
+    assert _drain(sub)[-1] is RESET
+    assert hub.subscriber_count == 0
+
+
+def test_feed_events_keep_this_workers_caches_in_step():
+    from services.cache import Snapshot, menu_cache, orders_version
+    from services.order_events import order_events
+    from services.search_index import menu_index
+
+    menu_index.replace([])
+    sub = order_events.subscribe()
+    before = orders_version.value
+    order_events.publish(_event(50, 1))
+    assert orders_version.value == before + 1
+
+    menu_cache._store(3, Snapshot(version=1, body=b"[]", tag=3))
+    payload = json.dumps({"type": "menu_changed", "brand_id": 3})
+    order_events.publish(OrderEvent.parse(payload))
+    assert menu_cache.peek(3) is None
+    assert not menu_index.fresh
+    assert orders_version.value == before + 2
+    # internal events are not forwarded to admin streams
+    assert [e.type for e in _drain(sub)] == ["order_created"]
+    sub.close()
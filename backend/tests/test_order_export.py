@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+import services.order_export as export
+
+TS = datetime(2026, 1, 2, 12, 0, tzinfo=timezone.utc)
+ROWS = [
+    (1, 3, "delivered", TS, 260.0, 10, 100, "Chicken Biryani", 1, 240.0),
+    (1, 3, "delivered", TS, 260.0, 11, 101, "Water Bottle", 1, 20.0),
+    (2, 3, "pending", TS, 30.0, 12, 102, "Raita", 1, 30.0),
+    (3, 4, "cancelled", TS, 0.0, None, None, None, None, None),
+]
+
+
+@pytest.fixture(autouse=True)
+def fake_rows(monkeypatch):
+    async def _rows(*args):
+        for r in ROWS:
+            yield r
+
+    monkeypatch.setattr(export, "_stream_rows", _rows)
+
+
+async def _collect(gen):
+    return [chunk async for chunk in gen]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_groups_items_per_order():
+    chunks = await _collect(export.iter_orders_ndjson())
+    # first order is flushed on its own so bytes reach the client early
+    assert json.loads(chunks[0])["id"] == 1
+    lines = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert [o["id"] for o in lines] == [1, 2, 3]
+    assert [i["name"] for i in lines[0]["items"]] == ["Chicken Biryani", "Water Bottle"]
+    assert lines[2]["items"] == []
+
+
+@pytest.mark.asyncio
+async def test_csv_header_first_then_one_row_per_item():
+    chunks = await _collect(export.iter_orders_csv())
+    assert chunks[0].decode().strip() == ",".join(export.CSV_COLUMNS)
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert len(rows) == 1 + len(ROWS)
+    assert rows[1][0] == "1" and rows[1][7] == "Chicken Biryani"
+    assert rows[4][5] == ""
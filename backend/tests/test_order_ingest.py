@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from core.config import Settings
+from pydantic import ValidationError
+from services import order_ingest as ingest_mod
+from services.order_ingest import OrderIngestQueue
+
+
+class FakeSession:
+    commits = 0
+
+    def __init__(self):
+        self.pending = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def rollback(self):
+        self.pending = []
+
+    async def commit(self):
+        FakeSession.commits += 1
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    FakeSession.commits = 0
+    ids = iter(range(1, 1000))
+
+    async def insert_order(session, params):
+        await asyncio.sleep(0)
+        if params.get("bad"):
+            raise RuntimeError("bad order")
+        return next(ids), params["total"], "pending", 1
+
+    monkeypatch.setattr(ingest_mod, "SessionLocal", FakeSession)
+    monkeypatch.setattr(ingest_mod, "insert_order", insert_order)
+    monkeypatch.setattr(ingest_mod, "record_committed", lambda *a, **k: None)
+
+
+@pytest.mark.asyncio
+async def test_burst_is_committed_in_batches(fake_db):
+    q = OrderIngestQueue(max_batch=10, max_wait=0.05, workers=1)
+    q.start()
+    results = await asyncio.gather(
+        *(q.submit({"brand_id": 1, "total": i}) for i in range(25))
+    )
+    await q.stop()
+    assert sorted(r["id"] for r in results) == list(range(1, 26))
+    assert [r["total"] for r in results] == list(range(25))
+    assert FakeSession.commits == 3
+
+
+@pytest.mark.asyncio
+async def test_failing_order_only_fails_its_caller(fake_db):
+    q = OrderIngestQueue(max_batch=10, max_wait=0.05, workers=1)
+    q.start()
+    params = [{"brand_id": 1, "total": i, "bad": i == 2} for i in range(4)]
+    results = await asyncio.gather(
+        *(q.submit(p) for p in params), return_exceptions=True
+    )
+    await q.stop()
+    assert isinstance(results[2], RuntimeError)
+    assert all(isinstance(r, dict) for i, r in enumerate(results) if i != 2)
+    assert not q.running
+
+
+def test_unknown_ingest_mode_fails_at_startup(monkeypatch):
+    monkeypatch.setenv("ORDER_INGEST_MODE", "bached")
+    with pytest.raises(ValidationError, match="ORDER_INGEST_MODE"):
+        Settings()
+    monkeypatch.setenv("ORDER_INGEST_MODE", "batched")
+    assert Settings().ORDER_INGEST_MODE == "batched"
@@ -0,0 +1,74 @@
+import pytest
+from models.schemas import OrderCreate
+from services.brand_registry import BrandInfo, brand_registry
+from services.order_service import create_order
+from sqlalchemy.sql import Select
+
+MENU = {101: 240.0, 102: 20.0, 103: 30.0}
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+    def one(self):
+        return self._rows[0]
+
+
+class FakeSession:
+    """Records statements; answers the menu lookup and the order insert."""
+
+    def __init__(self):
+        self.statements = []
+        self.committed = False
+
+    async def execute(self, stmt, params=None):
+        self.statements.append((stmt, params))
+        if isinstance(stmt, Select):
+            wanted = set(stmt.compile().params["id_1"])
+            return _Result([(i, MENU[i]) for i in sorted(wanted) if i in MENU])
+        if params and "menu_item_ids" in params:
+            return _Result([(77, params["total"], "pending", "1234")])
+        return _Result([])
+
+    async def commit(self):
+        self.committed = True
+
+
+@pytest.fixture(autouse=True)
+def brands():
+    brand_registry.replace([BrandInfo(id=1, name="Ideal Foodz", slug="ideal-foodz")])
+
+
+def _order(lines):
+    return OrderCreate(
+        brand_slug="ideal-foodz",
+        customer_name="A",
+        items=[{"menu_item_id": m, "quantity": q} for m, q in lines],
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("lines", [1, 15])
+async def test_round_trips_do_not_depend_on_cart_size(lines):
+    db = FakeSession()
+    res = await create_order(db, _order([(101, 1)] * lines))
+    assert res == {"id": 77, "total": 240.0 * lines}
+    # menu lookup, order+lines insert, rollup upsert
+    assert len(db.statements) == 3
+    insert_params = db.statements[1][1]
+    assert insert_params["quantities"] == [1] * lines
+    assert db.committed
+
+
+@pytest.mark.asyncio
+async def test_all_invalid_items_reported_together():
+    db = FakeSession()
+    with pytest.raises(ValueError) as exc:
+        await create_order(db, _order([(101, 1), (999, 1), (998, 2)]))
+    assert str(exc.value) == "Menu items 998, 999 not found for brand"
+    assert len(db.statements) == 1
+    assert not db.committed
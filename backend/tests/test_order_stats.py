@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from services import order_stats as order_stats_mod
+from services.order_events import ORIGIN, OrderEvent
+from services.order_stats import OrderStats
+
+
+def test_incremental_updates_match_a_fresh_load():
+    stats = OrderStats()
+    stats.replace(
+        [(1, "pending", 2, 300.0), (2, "delivered", 1, 120.0), (2, None, 1, 50.0)]
+    )
+    stats.record_created(1, 99.5)
+    stats.record_status_change(1, "pending", "preparing")
+    stats.record_status_change(2, "delivered", "delivered")
+
+    snap = stats.snapshot()
+    assert snap["total_orders"] == 5
+    assert snap["total_revenue"] == 569.5
+    assert snap["pending_count"] == 3
+    assert snap["preparing_count"] == 1
+    assert snap["delivered_count"] == 1
+    assert snap["status_counts"]["cancelled"] == 0
+    assert snap["brands"]["1"]["status_counts"]["pending"] == 2
+    assert snap["brands"]["2"]["total_revenue"] == 170.0
+
+    fresh = OrderStats()
+    fresh.replace(
+        [
+            (1, "pending", 2, 399.5),
+            (1, "preparing", 1, 0.0),
+            (2, "delivered", 1, 120.0),
+            (2, "pending", 1, 50.0),
+        ]
+    )
+    assert fresh.snapshot() == snap
+
+
+class _LoadSession:
+    """Answers the load query; `during` runs while the query is in flight."""
+
+    def __init__(self, snap, rows, during=lambda: None):
+        self.snap, self.rows, self.during = snap, rows, during
+
+    async def execute(self, stmt):
+        self.during()
+        rows = [(self.snap, *r) for r in self.rows] or [
+            (self.snap, None, None, None, None)
+        ]
+        return type("R", (), {"all": lambda _: rows})()
+
+
+@pytest.mark.asyncio
+async def test_load_keeps_writes_its_snapshot_missed():
+    stats = OrderStats()
+    await stats.load(_LoadSession("100:105:102", []))
+    assert stats.snapshot()["total_orders"] == 0
+
+    def overlapping_writes():
+        stats.record_created(1, 10.0, xid=101)  # committed before the snapshot
+        stats.record_created(1, 20.0, xid=102)  # still in progress when it was taken
+        stats.record_created(1, 40.0, xid=107)  # began after it
+
+    # the query sees xid 101 but not 102 or 107
+    await stats.load(
+        _LoadSession("102:106:102", [(1, "pending", 1, 10.0)], overlapping_writes)
+    )
+    assert stats.snapshot()["total_orders"] == 3
+    assert stats.snapshot()["total_revenue"] == 70.0
+
+    # a late adjustment for a transaction the load already counted is a no-op
+    stats.record_status_change(1, "pending", "cancelled", xid=101)
+    stats.record_status_change(1, "pending", "preparing", xid=108)
+    counts = stats.snapshot()["status_counts"]
+    assert (
+        counts["pending"] == 2 and counts["preparing"] == 1 and counts["cancelled"] == 0
+    )
+
+
+def test_feed_applies_other_workers_writes_only(monkeypatch):
+    stats = OrderStats()
+    stats.replace([])
+    monkeypatch.setattr(order_stats_mod, "order_stats", stats)
+
+    def event(origin, **fields):
+        return OrderEvent.parse(
+            json.dumps({"id": 1, "brand_id": 3, "origin": origin, **fields})
+        )
+
+    order_stats_mod._apply_feed_event(
+        event(ORIGIN, type="order_created", total=5.0, status="pending", xid="9")
+    )
+    order_stats_mod._apply_feed_event(
+        event("other", type="order_created", total=7.5, status="pending", xid="10")
+    )
+    order_stats_mod._apply_feed_event(
+        event(
+            "other",
+            type="order_status_changed",
+            old_status="pending",
+            status="delivered",
+            xid="11",
+        )
+    )
+    snap = stats.snapshot()
+    assert snap["total_orders"] == 1 and snap["total_revenue"] == 7.5
+    assert snap["brands"]["3"]["status_counts"]["delivered"] == 1
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from routes import orders as orders_routes
+from services.cache import Snapshot, order_cache, render_json
+from services.order_events import OrderEvent, order_events
+from services.order_waiters import OrderWaiters, order_waiters
+
+
+@pytest.mark.asyncio
+async def test_notify_wakes_only_that_order():
+    waiters = OrderWaiters()
+    a, b = waiters.register(1), waiters.register(2)
+    assert waiters.notify(1) == 1
+    assert await waiters.wait(1, a, timeout=1)
+    assert not await waiters.wait(2, b, timeout=0.01)
+    assert len(waiters) == 0
+
+
+@pytest.mark.asyncio
+async def test_waiter_limit():
+    waiters = OrderWaiters(max_waiters=1)
+    waiters.register(1)
+    with pytest.raises(Exception):
+        waiters.register(2)
+
+
+@pytest.fixture
+def order_app(monkeypatch):
+    state = {"status": "pending", "loads": 0}
+
+    async def fake_load(session, order_id, version):
+        state["loads"] += 1
+        return Snapshot(
+            version=version,
+            body=render_json({"id": order_id, "status": state["status"]}),
+            tag=order_id,
+        )
+
+    class NoSession:
+        async def __aenter__(self):
+            return None
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(orders_routes, "_load_order", fake_load)
+    monkeypatch.setattr(orders_routes, "read_session", lambda after=0.0: NoSession())
+    order_cache.clear()
+    app = FastAPI()
+    app.include_router(orders_routes.router, prefix="/orders")
+    yield app, state
+    order_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_wait_parks_until_status_change(order_app):
+    app, state = order_app
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://t"
+    ) as client:
+        first = await client.get("/orders/5/wait")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        pending = asyncio.ensure_future(
+            client.get("/orders/5/wait", headers={"If-None-Match": etag})
+        )
+        await asyncio.sleep(0.05)
+        assert not pending.done() and len(order_waiters) == 1
+        loads = state["loads"]
+
+        # a change on another worker arrives through the event feed
+        state["status"] = "preparing"
+        payload = json.dumps(
+            {
+                "id": 9,
+                "type": "order_status_changed",
+                "order_id": 5,
+                "brand_id": 1,
+                "status": "preparing",
+            }
+        )
+        order_events.publish(OrderEvent.parse(payload))
+        woke = await asyncio.wait_for(pending, 1)
+        assert woke.status_code == 200 and woke.json()["status"] == "preparing"
+        assert state["loads"] == loads + 1
+
+        timed_out = await client.get(
+            "/orders/5/wait",
+            params={"timeout": 1},
+            headers={"If-None-Match": woke.headers["etag"]},
+        )
+        assert timed_out.status_code == 304
+        assert len(order_waiters) == 0
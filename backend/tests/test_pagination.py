@@ -0,0 +1,17 @@
+from datetime import datetime, timezone
+
+import pytest
+from core.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    ts = datetime(2026, 3, 1, 19, 30, 5, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor(ts, 4242)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (ts, 4242)
+
+
+@pytest.mark.parametrize("bad", ["", "not-base64!", "Zm9v"])
+def test_malformed_cursor_rejected(bad):
+    with pytest.raises(ValueError):
+        decode_cursor(bad)
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import pytest
+from auth import PasswordHasher, get_password_hash
+from core.throttle import RateLimiter
+
+HASHED = get_password_hash("s3cret")
+
+
+@pytest.mark.asyncio
+async def test_verify_runs_off_the_event_loop():
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    loop_thread = threading.get_ident()
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    t = asyncio.ensure_future(ticker())
+    assert await hasher.verify("s3cret", HASHED)
+    assert not await hasher.verify("wrong", HASHED)
+    t.cancel()
+    hasher.shutdown()
+    # the loop kept running while bcrypt worked on another thread
+    assert ticks > 5
+    assert threading.get_ident() == loop_thread
+
+
+@pytest.mark.asyncio
+async def test_calls_beyond_max_pending_are_rejected():
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    results = await asyncio.gather(
+        *(hasher.verify("s3cret", HASHED) for _ in range(4)), return_exceptions=True
+    )
+    hasher.shutdown()
+    assert results.count(True) == 2
+    assert sum(isinstance(r, PasswordHasher.Overloaded) for r in results) == 2
+    assert hasher.rejected == 2 and hasher.pending == 0
+    assert hasher.stats() == {
+        "workers": 1,
+        "max_pending": 2,
+        "pending": 0,
+        "queue_depth": 0,
+        "rejected": 2,
+    }
+
+
+def test_rate_limiter_blocks_after_limit_per_key():
+    limiter = RateLimiter(limit=2, window=60)
+    assert limiter.hit("alice") is None
+    assert limiter.hit("alice") is None
+    retry_after = limiter.hit("alice")
+    assert retry_after is not None and 0 < retry_after <= 60
+    assert limiter.hit("bob") is None
+    limiter.reset("alice")
+    assert limiter.hit("alice") is None
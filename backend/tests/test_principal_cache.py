@@ -0,0 +1,73 @@
+import auth
+import pytest
+from auth import (
+    Principal,
+    create_access_token,
+    get_current_user,
+    principal_cache,
+    require_admin,
+)
+from fastapi import HTTPException
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    calls = []
+    roles = {"alice": "admin", "bob": "user"}
+
+    async def fake_load(username):
+        calls.append(username)
+        return (
+            Principal(id=1, username=username, role=roles[username])
+            if username in roles
+            else None
+        )
+
+    monkeypatch.setattr(auth, "_load_principal", fake_load)
+    principal_cache.clear()
+    yield calls, roles
+    principal_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_repeat_requests_skip_the_lookup(loads):
+    calls, _ = loads
+    token = create_access_token({"sub": "alice"})
+    for _ in range(3):
+        user = await require_admin(await get_current_user(token))
+    assert user.username == "alice"
+    assert calls == ["alice"]
+
+
+@pytest.mark.asyncio
+async def test_role_change_invalidates_cached_principal(loads):
+    calls, roles = loads
+    token = create_access_token({"sub": "alice"})
+    await get_current_user(token)
+    roles["alice"] = "user"
+    principal_cache.invalidate_user("alice")
+    with pytest.raises(HTTPException) as exc:
+        await require_admin(await get_current_user(token))
+    assert exc.value.status_code == 403
+    assert calls == ["alice", "alice"]
+
+
+@pytest.mark.asyncio
+async def test_unknown_user_is_not_cached(loads):
+    calls, _ = loads
+    token = create_access_token({"sub": "mallory"})
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await get_current_user(token)
+    assert calls == ["mallory", "mallory"]
+
+
+@pytest.mark.asyncio
+async def test_claims_only_mode_reads_role_from_token(loads, monkeypatch):
+    calls, _ = loads
+    monkeypatch.setattr(auth.settings, "AUTH_CLAIMS_ONLY", True)
+    user = await get_current_user(
+        create_access_token({"sub": "carol", "uid": 9, "role": "admin"})
+    )
+    assert user == Principal(id=9, username="carol", role="admin")
+    assert calls == []
@@ -0,0 +1,177 @@
+"""Statements per request for every route that touches the database, read from
+the X-DB-Queries header (or, for streamed bodies, the request_queries log).
+
+These need a real Postgres: set RUN_DB_TESTS=1 with DATABASE_URL pointing at a
+scratch database (migrations are applied, rows are added). When a count here
+changes, either the change is intended (update the number, and the route's
+budget in QUERY_BUDGETS if it has one) or it added a round trip.
+
+Not covered: /admin/orders/events and /ai/* never query, and
+/admin/analytics/backfill only starts a background job.
+"""
+
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+from auth import create_access_token, principal_cache
+from core.config import settings
+from database import SessionLocal, engine, init_db
+from services.brand_registry import brand_registry
+from services.cache import menu_cache, order_cache
+from services.order_stats import order_stats
+from services.search_index import menu_index
+from sqlalchemy import text
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("RUN_DB_TESTS"), reason="needs a scratch Postgres (RUN_DB_TESTS)"
+)
+
+_ITEMS_SQL = text(
+    "INSERT INTO menu_items (brand_id, name, price, available)"
+    " SELECT :b, 'Item ' || i, 100, true FROM generate_series(1, 3) i RETURNING id"
+)
+
+
+@asynccontextmanager
+async def _client(monkeypatch):
+    import main
+
+    monkeypatch.setattr(settings, "AUTH_CLAIMS_ONLY", True)
+    monkeypatch.setattr(settings, "QUERY_STATS_HEADERS", True)
+    await init_db()
+    slug = f"qc-{uuid.uuid4().hex[:10]}"
+    async with SessionLocal() as session:
+        brand_id = (
+            await session.execute(
+                text("INSERT INTO brands (name, slug) VALUES (:s, :s) RETURNING id"),
+                {"s": slug},
+            )
+        ).scalar_one()
+        res = await session.execute(_ITEMS_SQL, {"b": brand_id})
+        item_ids = res.scalars().all()
+        await session.commit()
+    await brand_registry.reload()
+    menu_cache.clear()
+    order_cache.clear()
+    principal_cache.clear()
+    token = create_access_token({"sub": "admin", "role": "admin"})
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app),
+            base_url="http://t",
+            headers={"Authorization": f"Bearer {token}"},
+        ) as client:
+            yield client, slug, item_ids
+    finally:
+        # connections are bound to this test's event loop
+        await engine.dispose()
+
+
+def _queries(response) -> int:
+    assert response.status_code < 400, response.text
+    return int(response.headers["X-DB-Queries"])
+
+
+def _logged_queries(caplog, route: str) -> int:
+    # the header is sent before a streamed body runs; the log has the final count
+    counts = [
+        r.queries
+        for r in caplog.records
+        if r.getMessage() in ("request_queries", "query_budget_exceeded")
+        and r.route == route
+    ]
+    return counts[-1]
+
+
+@pytest.mark.asyncio
+async def test_public_reads(monkeypatch):
+    async with _client(monkeypatch) as (client, slug, item_ids):
+        assert _queries(await client.get("/brands/")) == 0
+        assert _queries(await client.get(f"/menu/{slug}")) == 1
+        assert _queries(await client.get(f"/menu/{slug}")) == 0
+        # a menu change reloads the brand's items into the search index once
+        menu_index.mark_stale(brand_registry.get(slug).id)
+        assert _queries(await client.get(f"/menu/search?q=item&brand={slug}")) == 1
+        assert _queries(await client.get(f"/menu/search?q=item&brand={slug}")) == 0
+
+
+@pytest.mark.asyncio
+async def test_orders(monkeypatch):
+    async with _client(monkeypatch) as (client, slug, item_ids):
+        cart = [{"menu_item_id": i, "quantity": 2} for i in item_ids]
+        # price check, insert (order, lines, notify), rollups
+        created = await client.post(
+            "/orders/", json={"brand_slug": slug, "items": cart}
+        )
+        assert _queries(created) == 3
+        order_id = created.json()["id"]
+        # order, its lines, their menu items
+        assert _queries(await client.get(f"/orders/{order_id}")) == 3
+        assert _queries(await client.get(f"/orders/{order_id}")) == 0
+        wait = await client.get(
+            f"/orders/{order_id}/wait", headers={"If-None-Match": '"stale"'}
+        )
+        assert _queries(wait) == 0
+        assert _queries(await client.get("/admin/orders/?limit=5")) == 3
+        # locked read, update, notify; cancelling also adjusts the rollups
+        confirm = {"status": "confirmed"}
+        cancel = {"status": "cancelled"}
+        path = f"/admin/orders/{order_id}/status"
+        assert _queries(await client.patch(path, json=confirm)) == 3
+        assert _queries(await client.patch(path, json=cancel)) == 4
+
+
+@pytest.mark.asyncio
+async def test_admin_menu(monkeypatch):
+    async with _client(monkeypatch) as (client, slug, item_ids):
+        brand_id = brand_registry.get(slug).id
+        # insert, notify
+        new = {"brand_id": brand_id, "name": "New", "price": 50, "category": "x"}
+        assert _queries(await client.post("/admin/menu/", json=new)) == 2
+        # update ... returning, notify
+        item = item_ids[0]
+        update = {"price": 120}
+        assert _queries(await client.put(f"/admin/menu/{item}", json=update)) == 2
+        assert _queries(await client.patch(f"/admin/menu/{item}/toggle")) == 2
+        # reference check, update ... returning, notify
+        assert _queries(await client.delete(f"/admin/menu/{item_ids[1]}")) == 3
+
+
+@pytest.mark.asyncio
+async def test_admin_reads(monkeypatch, caplog):
+    caplog.set_level(logging.INFO, logger="core.middleware.query_stats")
+    async with _client(monkeypatch) as (client, slug, item_ids):
+        cart = [{"menu_item_id": item_ids[0], "quantity": 1}]
+        await client.post("/orders/", json={"brand_slug": slug, "items": cart})
+        brand_id = brand_registry.get(slug).id
+        assert _queries(await client.get(f"/admin/menu/?brand_id={brand_id}")) == 1
+        # one aggregate load, then served from memory
+        monkeypatch.setattr(order_stats, "_loaded", False)
+        assert _queries(await client.get("/admin/orders/stats")) == 1
+        assert _queries(await client.get("/admin/orders/stats")) == 0
+        # one server-side cursor for the whole export, whatever its size
+        for fmt in ("ndjson", "csv"):
+            export = await client.get(f"/admin/orders/export?format={fmt}&brand={slug}")
+            assert export.status_code == 200
+            assert _logged_queries(caplog, "/admin/orders/export") == 1
+        window = {"start": "2000-01-01T00:00:00", "end": "2100-01-01T00:00:00"}
+        for path in ("/admin/analytics/revenue", "/admin/analytics/top-items"):
+            response = await client.get(path, params={**window, "brand": slug})
+            assert _queries(response) == 1
+        assert _queries(await client.get("/admin/diagnostics/")) == 0
+
+
+@pytest.mark.asyncio
+async def test_auth(monkeypatch):
+    async with _client(monkeypatch) as (client, slug, item_ids):
+        user = {"id": 0, "username": f"qc-{uuid.uuid4().hex[:10]}", "role": "admin"}
+        # lookup, insert, refresh
+        assert _queries(await client.post("/auth/create-admin", json=user)) == 3
+        # lookup, refresh (the role is unchanged, so no update)
+        assert _queries(await client.post("/auth/create-admin", json=user)) == 2
+        login = {"username": user["username"], "password": "admin"}
+        assert _queries(await client.post("/auth/login", json=login)) == 1
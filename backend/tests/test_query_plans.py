@@ -0,0 +1,29 @@
+from check_query_plans import full_scans, scans
+
+PLAN = {
+    "Node Type": "Limit",
+    "Plans": [
+        {
+            "Node Type": "Nested Loop",
+            "Plans": [
+                {
+                    "Node Type": "Index Scan Backward",
+                    "Relation Name": "orders",
+                    "Index Name": "ix_orders_created_at_id",
+                },
+                {"Node Type": "Seq Scan", "Relation Name": "brands"},
+                {"Node Type": "Seq Scan", "Relation Name": "order_items"},
+            ],
+        }
+    ],
+}
+
+
+def test_full_scans_reports_only_large_tables():
+    assert list(scans(PLAN)) == [
+        ("Index Scan Backward", "orders"),
+        ("Seq Scan", "brands"),
+        ("Seq Scan", "order_items"),
+    ]
+    # brands is small enough that a sequential scan is the right plan
+    assert full_scans(PLAN) == ["order_items"]
@@ -0,0 +1,107 @@
+import httpx
+import pytest
+from core import metrics
+from core.config import settings
+from core.middleware.query_stats import QueryStatsMiddleware
+from core.query_stats import assert_num_queries, current, instrument, track
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+
+@pytest.fixture(scope="module")
+def engine():
+    e = create_engine("sqlite://")
+    instrument(e)
+    return e
+
+
+def _select(engine, n=1):
+    with engine.connect() as conn:
+        for _ in range(n):
+            conn.execute(text("SELECT 1"))
+
+
+def test_counts_only_inside_tracked_context(engine):
+    _select(engine)
+    assert current() is None
+    with track() as stats:
+        _select(engine, 3)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 2"))
+    assert stats.count == 4
+    assert stats.seconds > 0
+    assert stats.repeated(3) == [("SELECT 1", 3)]
+    assert stats.repeated(4) == []
+
+
+def test_assert_num_queries_reports_statements(engine):
+    with assert_num_queries(2):
+        _select(engine, 2)
+    with pytest.raises(AssertionError, match="expected 1 queries, ran 2"):
+        with assert_num_queries(1):
+            _select(engine, 2)
+
+
+def test_failed_statements_leave_no_state_on_the_connection(engine):
+    with track() as stats:
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(Exception):
+                    conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 1"))
+            assert not any("query" in str(key) for key in conn.info)
+    assert stats.count == 1
+    assert stats.statements == {"SELECT 1": 1}
+
+
+def _app(engine):
+    app = FastAPI()
+
+    @app.get("/items/{n}")
+    async def items(n: int):
+        _select(engine, n)
+        return {"n": n}
+
+    @app.get("/none")
+    async def none():
+        return {}
+
+    app.add_middleware(QueryStatsMiddleware)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_middleware_headers_and_budget(engine, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "QUERY_BUDGETS", {"GET /items/{n}": 3})
+    monkeypatch.setattr(settings, "QUERY_REPEAT_WARN", 5)
+    monkeypatch.setattr(settings, "QUERY_STATS_HEADERS", True)
+    before = metrics.query_budget_exceeded.value("GET", "/items/{n}")
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=_app(engine)), base_url="http://t"
+    ) as client:
+        ok = await client.get("/items/2")
+        over = await client.get("/items/6")
+        none = await client.get("/none")
+    assert ok.headers["X-DB-Queries"] == "2"
+    assert float(ok.headers["X-DB-Time-Ms"]) >= 0
+    assert over.headers["X-DB-Queries"] == "6"
+    assert none.headers["X-DB-Queries"] == "0"
+    assert metrics.query_budget_exceeded.value("GET", "/items/{n}") == before + 1
+
+    warnings = [(r.getMessage(), r.__dict__) for r in caplog.records]
+    exceeded = [extra for msg, extra in warnings if msg == "query_budget_exceeded"]
+    assert [(e["queries"], e["budget"]) for e in exceeded] == [(6, 3)]
+    repeated = [extra for msg, extra in warnings if msg == "query_repeated"]
+    assert [(e["statement"], e["times"]) for e in repeated] == [("SELECT 1", 6)]
+
+
+@pytest.mark.asyncio
+async def test_middleware_headers_are_opt_in(engine, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_STATS_HEADERS", False)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=_app(engine)), base_url="http://t"
+    ) as client:
+        response = await client.get("/items/2")
+    assert response.status_code == 200
+    assert "X-DB-Queries" not in response.headers
+    assert "X-DB-Time-Ms" not in response.headers
@@ -0,0 +1,78 @@
+import time
+
+import database
+import pytest
+from services.cache import SnapshotCache
+from services.replica import ReplicaMonitor, _lsn
+
+
+def test_lsn_orders_like_postgres():
+    assert _lsn("0/16B3748") < _lsn("0/16B3750") < _lsn("1/0")
+
+
+def test_replica_is_caught_up_to_the_newest_replayed_sample():
+    monitor = ReplicaMonitor(max_lag=5)
+    assert not monitor.usable()
+    now = time.time()
+    monitor.observe(now - 2, primary_lsn=100, replayed_lsn=50)
+    # healthy, but nothing it has replayed is known to be recent
+    assert monitor.healthy and not monitor.usable()
+    monitor.observe(now - 1, primary_lsn=200, replayed_lsn=150)
+    assert monitor.caught_up_to == now - 2
+    assert monitor.usable(after=now - 3)
+    # a client that wrote after the replica's position reads the primary
+    assert not monitor.usable(after=now - 1.5)
+    monitor.observe(now, primary_lsn=300, replayed_lsn=300)
+    assert monitor.caught_up_to == now and monitor.usable(after=now - 0.5)
+    monitor.mark_down()
+    assert not monitor.usable()
+
+
+def test_replica_beyond_max_lag_is_not_used():
+    monitor = ReplicaMonitor(max_lag=5)
+    monitor.observe(time.time() - 10, primary_lsn=1, replayed_lsn=1)
+    assert monitor.healthy and not monitor.usable()
+
+
+def test_cache_remembers_invalidations_until_forgotten():
+    cache = SnapshotCache("t")
+    cache.invalidate(1)
+    assert cache.changed_at(1) == 0.0
+    cache.track_changes = True
+    cache.invalidate(1)
+    cache.invalidate_tag(2)
+    changed = cache.changed_at(1)
+    assert changed > 0 and cache.changed_at(2) > 0 and cache.changed_at(3) == 0.0
+    cache.forget_changes(before=changed + 1)
+    assert cache.changed_at(1) == 0.0
+    cache.clear()
+    assert cache.changed_at(3) > 0
+
+
+@pytest.mark.asyncio
+async def test_read_session_falls_back_to_the_primary(monkeypatch):
+    class Factory:
+        def __init__(self, name):
+            self.name = name
+
+        def __call__(self):
+            return self
+
+        async def __aenter__(self):
+            return self.name
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monitor = ReplicaMonitor(max_lag=5)
+    monkeypatch.setattr(database, "SessionLocal", Factory("primary"))
+    monkeypatch.setattr(database, "ReplicaSessionLocal", Factory("replica"))
+    monkeypatch.setattr(database, "replica_monitor", monitor)
+    async with database.read_session() as session:
+        assert session == "primary"
+    now = time.time()
+    monitor.observe(now, primary_lsn=1, replayed_lsn=1)
+    async with database.read_session(after=now - 1) as session:
+        assert session == "replica"
+    async with database.read_session(after=now + 1) as session:
+        assert session == "primary"
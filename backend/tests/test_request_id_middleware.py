@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from core.middleware.request_id import RequestIDMiddleware
+from core.request_id import get_request_id
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+async def echo(request: Request):
+    return JSONResponse(
+        {"state": request.state.request_id, "ctx": get_request_id()},
+        headers={"X-Request-ID": "stale"},
+    )
+
+
+async def stream(request: Request):
+    async def body():
+        for i in range(3):
+            yield f"chunk{i}".encode()
+
+    return StreamingResponse(body())
+
+
+app = RequestIDMiddleware(
+    Starlette(routes=[Route("/echo", echo), Route("/stream", stream)])
+)
+
+
+async def _call(path, headers=()):
+    sent = []
+    requested = asyncio.Event()
+
+    async def receive():
+        if not requested.is_set():
+            requested.set()
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # client stays connected until the response is done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": list(headers),
+        "scheme": "http",
+        "server": ("t", 80),
+        "client": ("c", 1),
+        "root_path": "",
+        "http_version": "1.1",
+        "asgi": {"version": "3.0"},
+    }
+    await app(scope, receive, send)
+    return sent
+
+
+@pytest.mark.asyncio
+async def test_generates_id_and_exposes_it_everywhere():
+    start, body = await _call("/echo")
+    rids = [v.decode() for k, v in start["headers"] if k == b"x-request-id"]
+    assert len(rids) == 1 and rids[0] != "stale"
+    assert body["body"] == ('{"state":"%s","ctx":"%s"}' % (rids[0], rids[0])).encode()
+    assert get_request_id() is None
+
+
+@pytest.mark.asyncio
+async def test_preserves_incoming_id():
+    start = (await _call("/echo", [(b"x-request-id", b"abc-123")]))[0]
+    assert (b"x-request-id", b"abc-123") in start["headers"]
+
+
+@pytest.mark.asyncio
+async def test_streaming_chunks_pass_through_unbuffered():
+    sent = await _call("/stream")
+    bodies = [
+        m["body"] for m in sent if m["type"] == "http.response.body" and m["body"]
+    ]
+    assert bodies == [b"chunk0", b"chunk1", b"chunk2"]
@@ -0,0 +1,199 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import httpx
+import pytest
+from auth import require_admin
+from core.config import settings
+from database import get_session
+from fastapi import FastAPI
+from routes import analytics
+from services import rollups
+from services.brand_registry import BrandInfo, brand_registry
+
+
+class RecordingSession:
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, stmt, params=None):
+        self.calls.append((stmt, params))
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYTICS_ROLLUPS_ENABLED", True)
+    monkeypatch.setattr(settings, "ANALYTICS_TIMEZONE", "Asia/Kolkata")
+    return RecordingSession()
+
+
+@pytest.mark.asyncio
+async def test_new_order_adds_to_both_rollups(db):
+    await rollups.record_order_created(db, 7)
+    [(stmt, params)] = db.calls
+    assert stmt is rollups._APPLY_ORDER_SQL
+    assert params == {
+        "order_id": 7,
+        "placed": 1,
+        "sign": 1,
+        "cancelled": 0,
+        "tz": "Asia/Kolkata",
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "old, new, expected",
+    [
+        ("pending", "cancelled", {"placed": 0, "sign": -1, "cancelled": 1}),
+        ("cancelled", "preparing", {"placed": 0, "sign": 1, "cancelled": -1}),
+        ("pending", "preparing", None),
+        ("cancelled", "cancelled", None),
+    ],
+)
+async def test_only_moves_across_cancelled_touch_rollups(db, old, new, expected):
+    await rollups.record_status_change(db, 7, old, new)
+    if expected is None:
+        assert db.calls == []
+    else:
+        [(_, params)] = db.calls
+        assert {k: params[k] for k in expected} == expected
+
+
+@pytest.mark.asyncio
+async def test_disabled_rollups_issue_no_sql(db, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYTICS_ROLLUPS_ENABLED", False)
+    await rollups.record_order_created(db, 7)
+    await rollups.record_status_change(db, 7, "pending", "cancelled")
+    assert db.calls == []
+
+
+def test_buckets_are_cut_in_the_analytics_timezone():
+    # truncate the local wall-clock time, then convert the bucket start back
+    local = "o.created_at AT TIME ZONE CAST(:tz AS text)"
+    bucket = f"date_trunc(g.granularity, {local}) AT TIME ZONE CAST(:tz AS text)"
+    assert bucket in str(rollups._APPLY_ORDER_SQL)
+    assert all(bucket in str(stmt) for stmt in rollups._BACKFILL_SQL[3:])
+
+
+def test_backfill_covers_closed_local_days_only():
+    tz = "Asia/Kolkata"
+    since = datetime(2024, 3, 1, 20, 0, tzinfo=timezone.utc)  # 2 March 01:30 IST
+    now = datetime(2024, 3, 4, 19, 0, tzinfo=timezone.utc)  # 5 March 00:30 IST
+    days = rollups.closed_days(since, now, tz)
+    assert [d[0].day for d in days] == [2, 3, 4]
+    assert days[0][0] == datetime(2024, 3, 2, tzinfo=ZoneInfo(tz))
+    assert days[-1][1] == datetime(2024, 3, 5, tzinfo=ZoneInfo(tz))
+    # the day that just ended is still within the grace period
+    assert (
+        rollups.closed_days(since, days[-1][1] + timedelta(minutes=1), tz)[-1][0].day
+        == 3
+    )
+
+
+def test_backfill_days_follow_dst():
+    days = rollups.closed_days(
+        datetime(2024, 3, 31, tzinfo=timezone.utc),
+        datetime(2024, 4, 2, tzinfo=timezone.utc),
+        "Europe/London",
+    )
+    start, end = (d.astimezone(timezone.utc) for d in days[0])
+    assert end - start == timedelta(hours=23)
+
+
+@pytest.fixture
+def analytics_app(monkeypatch):
+    calls = []
+
+    async def revenue_series(session, granularity, start, end, brand_id=None):
+        calls.append((granularity, start, end, brand_id))
+        return [
+            {
+                "bucket_start": start,
+                "brand_id": 1,
+                "order_count": 2,
+                "revenue": 10.5,
+                "cancelled_count": 0,
+            }
+        ]
+
+    async def no_reload(force=False):
+        return False
+
+    monkeypatch.setattr(rollups, "revenue_series", revenue_series)
+    monkeypatch.setattr(brand_registry, "reload", no_reload)
+    brand_registry.replace([BrandInfo(id=1, name="Ideal Foodz", slug="ideal-foodz")])
+    app = FastAPI()
+    app.include_router(analytics.router, prefix="/admin/analytics")
+    app.dependency_overrides[require_admin] = lambda: None
+    app.dependency_overrides[get_session] = lambda: None
+    return app, calls
+
+
+@pytest.mark.asyncio
+async def test_revenue_endpoint(analytics_app):
+    app, calls = analytics_app
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://t"
+    ) as client:
+        ok = await client.get(
+            "/admin/analytics/revenue",
+            params={
+                "start": "2024-03-01T00:00:00",
+                "end": "2024-03-02T00:00:00",
+                "brand": "ideal-foodz",
+            },
+        )
+        backwards = await client.get(
+            "/admin/analytics/revenue",
+            params={"start": "2024-03-02T00:00:00", "end": "2024-03-01T00:00:00"},
+        )
+        unknown = await client.get(
+            "/admin/analytics/revenue",
+            params={
+                "start": "2024-03-01T00:00:00",
+                "end": "2024-03-02T00:00:00",
+                "brand": "nope",
+            },
+        )
+        weekly = await client.get(
+            "/admin/analytics/revenue",
+            params={
+                "start": "2024-03-01T00:00:00",
+                "end": "2024-03-02T00:00:00",
+                "granularity": "week",
+            },
+        )
+    assert ok.status_code == 200
+    assert ok.json()[0]["revenue"] == 10.5
+    # naive bounds are UTC
+    assert calls == [
+        (
+            "day",
+            datetime(2024, 3, 1, tzinfo=timezone.utc),
+            datetime(2024, 3, 2, tzinfo=timezone.utc),
+            1,
+        )
+    ]
+    assert backwards.status_code == 400
+    assert unknown.status_code == 404
+    assert weekly.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_backfill_endpoint_runs_in_background(analytics_app, monkeypatch):
+    app, _ = analytics_app
+    started = []
+    monkeypatch.setattr(
+        rollups,
+        "start_backfill",
+        lambda since: not started and not started.append(since),
+    )
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://t"
+    ) as client:
+        first = await client.post("/admin/analytics/backfill")
+        second = await client.post("/admin/analytics/backfill")
+    assert first.status_code == 202
+    assert second.status_code == 409
+    assert started == [None]
@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+from services.search_index import MenuSearchIndex
+
+
+def _item(id, name, category=None, brand_id=1, available=True, price=100.0):
+    return SimpleNamespace(
+        id=id,
+        brand_id=brand_id,
+        name=name,
+        category=category,
+        available=available,
+        price=price,
+    )
+
+
+def _index():
+    idx = MenuSearchIndex()
+    idx.replace(
+        [
+            _item(1, "Chicken Biryani", "Biryani & Rice"),
+            _item(2, "Veg Biryani", "Biryani & Rice"),
+            _item(3, "Paneer Butter Masala", "Main Curries"),
+            _item(4, "Chicken Pizza", "Pizza", brand_id=2),
+            _item(5, "Butter Naan", "Breads", available=False),
+        ]
+    )
+    return idx
+
+
+def _ids(hits):
+    return [doc.id for _, doc in hits]
+
+
+def test_prefix_and_typo_tolerant_matching():
+    idx = _index()
+    assert set(_ids(idx.search("chick"))) == {1, 4}
+    # one typo still matches
+    assert set(_ids(idx.search("biriyani"))) >= {1, 2}
+    assert _ids(idx.search("chiken biryani"))[0] == 1
+    # category matches too
+    assert 4 in _ids(idx.search("pizza"))
+
+
+def test_brand_filter_and_availability():
+    idx = _index()
+    assert _ids(idx.search("chicken", brand_id=2)) == [4]
+    assert _ids(idx.search("butter")) == [3]
+    # toggling availability back on makes the item searchable again
+    idx.upsert(_item(5, "Butter Naan", "Breads", available=True))
+    assert set(_ids(idx.search("butter"))) == {3, 5}
+
+
+def test_incremental_updates():
+    idx = _index()
+    idx.upsert(_item(3, "Kadai Paneer", "Main Curries"))
+    assert _ids(idx.search("masala")) == []
+    assert _ids(idx.search("kadai")) == [3]
+    idx.remove(3)
+    assert _ids(idx.search("kadai")) == []
+    assert len(idx) == 4
+
+
+@pytest.mark.asyncio
+async def test_refresh_reloads_only_stale_brands():
+    idx = _index()
+    fetched = []
+    db = {
+        1: [_item(1, "Chicken Biryani", "Biryani & Rice"), _item(6, "Mutton Haleem")],
+        2: [_item(4, "Chicken Pizza", "Pizza", brand_id=2)],
+    }
+
+    async def fetch(session, brand_ids=None):
+        fetched.append(brand_ids)
+        if brand_ids is None:
+            return [item for items in db.values() for item in items]
+        return [item for b in brand_ids for item in db[b]]
+
+    idx._fetch = fetch
+    assert idx.fresh
+    # brand 1 changed elsewhere: item 2 and 3 deleted, 6 added
+    idx.mark_stale(1)
+    assert not idx.fresh
+    await idx.refresh()
+    assert fetched == [{1}]
+    assert idx.fresh
+    assert _ids(idx.search("haleem")) == [6]
+    assert _ids(idx.search("masala")) == []
+    assert _ids(idx.search("pizza")) == [4]
+
+    # a change to every brand (seed scripts, a lost LISTEN connection) rebuilds
+    idx.mark_stale()
+    await idx.refresh()
+    assert fetched[-1] is None
+    assert len(idx) == 3
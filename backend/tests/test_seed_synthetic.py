@@ -0,0 +1,53 @@
+from collections import Counter
+from datetime import date, datetime, timezone
+
+from seed_raw import OrderGenerator, synthetic_menu
+
+
+def _generator(**kw):
+    menus = {1: [(10, 100.0), (11, 50.0), (12, 20.0)], 2: [(20, 300.0)], 3: []}
+    return OrderGenerator(menus, days=14, today=date(2026, 3, 2), **kw)
+
+
+def test_daily_counts_sum_to_total():
+    gen = _generator()
+    counts = gen.daily_counts(1001)
+    assert len(counts) == 14
+    assert sum(counts) == 1001
+    assert all(c > 0 for c in counts)
+
+
+def test_orders_are_consistent_and_in_time_order():
+    orders = list(_generator().generate(2000, first_id=500))
+    rows = [order for order, _ in orders]
+    assert [r[0] for r in rows] == list(range(500, 2500))
+    times = [r[4] for r in rows]
+    assert times == sorted(times)
+    # whole days before `today`, in UTC
+    assert times[0] >= datetime(2026, 2, 16, tzinfo=timezone.utc)
+    assert times[-1] < datetime(2026, 3, 2, tzinfo=timezone.utc)
+    for (order_id, brand_id, total, _, _), lines in orders:
+        assert lines and all(line[0] == order_id for line in lines)
+        assert total == round(sum(line[2] * line[3] for line in lines), 2)
+        assert len({line[1] for line in lines}) == len(lines)
+        assert brand_id in (1, 2)
+
+    statuses = Counter(r[3] for r in rows)
+    assert statuses.most_common(1)[0][0] == "delivered"
+    # meal times are busier than the small hours
+    hours = Counter(t.hour for t in times)
+    assert hours[20] > 5 * hours[4]
+
+
+def test_same_seed_same_data():
+    first = list(_generator(seed=7).generate(300, first_id=1))
+    again = list(_generator(seed=7).generate(300, first_id=1))
+    assert first == again
+
+
+def test_synthetic_menu_names_are_unique():
+    import random
+
+    items = synthetic_menu(random.Random(1), 600)
+    assert len({name for name, *_ in items}) == 600
+    assert all(price > 0 and category for _, price, category, _ in items)
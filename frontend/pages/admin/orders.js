@@ -1,12 +1,26 @@
 import React, { useEffect, useState, useRef, useMemo } from 'react'
 import { useRouter } from 'next/router'
-import { setAuthToken, fetchAdminOrders, getAdminStats, updateOrderStatus, fetchBrands } from '../../services/api'
+import { setAuthToken, fetchAdminOrdersPage, getAdminStats, updateOrderStatus, fetchBrands, subscribeOrderEvents } from '../../services/api'
 import DashboardCard from '../../components/DashboardCard'
 import OrderRow from '../../components/OrderRow'
 import StatusBadge from '../../components/StatusBadge'
 
+// new orders arriving in a burst trigger a single list refresh
+const REFRESH_DEBOUNCE = 500
+// while the live feed is unavailable the list is polled instead
 const POLL_INTERVAL = 10000
 
+function newestFirst(list) {
+  return list.sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
+}
+
+// fresh copies replace the ones already listed; older pages loaded so far stay
+function mergeOrders(current, incoming) {
+  const byId = new Map(current.map((o) => [o.id, o]))
+  incoming.forEach((o) => byId.set(o.id, o))
+  return newestFirst([...byId.values()])
+}
+
 function Spinner() {
   return <div className="animate-spin h-6 w-6 border-4 border-blue-500 border-t-transparent rounded-full" />
 }
@@ -18,11 +32,14 @@ export default function AdminOrders() {
   const [brands, setBrands] = useState([])
   const [brandsMap, setBrandsMap] = useState({})
   const [loading, setLoading] = useState(false)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState(null)
   const [statusFilter, setStatusFilter] = useState('')
   const [brandFilter, setBrandFilter] = useState('')
   const [search, setSearch] = useState('')
-  const intervalRef = useRef(null)
+  const refreshRef = useRef(null)
+  const pollRef = useRef(null)
 
   useEffect(() => {
     const token = typeof window !== 'undefined' ? localStorage.getItem('admin_token') : null
@@ -32,17 +49,59 @@ export default function AdminOrders() {
     }
     setAuthToken(token)
     loadAll()
-    intervalRef.current = setInterval(() => fetchOrders(), POLL_INTERVAL)
-    return () => clearInterval(intervalRef.current)
+    // the list and stats are fetched once; after that the live feed keeps them
+    // current, with polling as the fallback whenever the feed is down
+    const unsubscribe = subscribeOrderEvents(handleEvent, { onStatus: handleFeedStatus })
+    return () => {
+      unsubscribe()
+      clearTimeout(refreshRef.current)
+      clearInterval(pollRef.current)
+    }
   }, [])
 
+  async function refresh() {
+    await fetchOrders()
+    try {
+      setStats(await getAdminStats())
+    } catch (e) {}
+  }
+
+  function scheduleRefresh() {
+    clearTimeout(refreshRef.current)
+    refreshRef.current = setTimeout(refresh, REFRESH_DEBOUNCE)
+  }
+
+  function handleFeedStatus(live) {
+    if (live) {
+      if (pollRef.current) {
+        // back from polling: catch up on anything between the last poll and now
+        clearInterval(pollRef.current)
+        pollRef.current = null
+        scheduleRefresh()
+      }
+    } else if (!pollRef.current) {
+      pollRef.current = setInterval(refresh, POLL_INTERVAL)
+    }
+  }
+
+  function handleEvent(type, data) {
+    if (type === 'order_status_changed') {
+      setOrders((curr) => curr.map((o) => (o.id === data.order_id ? { ...o, status: data.status } : o)))
+      // stats are served from memory on the server, so re-reading them is cheap
+      getAdminStats().then(setStats).catch(() => {})
+    } else if (type === 'order_created' || type === 'reset') {
+      // created events don't carry line items; re-read the newest page
+      scheduleRefresh()
+    }
+  }
+
   async function loadAll() {
     setLoading(true)
     setError(null)
     try {
-      const [ordersData, statsData, brandsData] = await Promise.all([fetchAdminOrders(), getAdminStats(), fetchBrands()])
-      ordersData.sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
-      setOrders(ordersData)
+      const [page, statsData, brandsData] = await Promise.all([fetchAdminOrdersPage(), getAdminStats(), fetchBrands()])
+      setOrders(newestFirst(page.orders))
+      setNextCursor(page.nextCursor)
       setStats(statsData)
       setBrands(brandsData)
       const map = {}
@@ -57,14 +116,28 @@ export default function AdminOrders() {
 
   async function fetchOrders() {
     try {
-      const ordersData = await fetchAdminOrders()
-      ordersData.sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
-      setOrders(ordersData)
+      // the cursor still points past the oldest page loaded, so it is kept
+      const page = await fetchAdminOrdersPage()
+      setOrders((curr) => mergeOrders(curr, page.orders))
     } catch (e) {
       setError(e.message || String(e))
     }
   }
 
+  async function loadMore() {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const page = await fetchAdminOrdersPage({ cursor: nextCursor })
+      setOrders((curr) => mergeOrders(curr, page.orders))
+      setNextCursor(page.nextCursor)
+    } catch (e) {
+      setError(e.message || String(e))
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   async function handleChangeStatus(orderId, newStatus) {
     const prev = orders.map((o) => ({ ...o }))
     setOrders((curr) => curr.map((o) => (o.id === orderId ? { ...o, status: newStatus } : o)))
@@ -130,6 +203,14 @@ export default function AdminOrders() {
           ))}
         </div>
       )}
+
+      {!loading && !error && nextCursor && (
+        <div className="flex justify-center mt-4">
+          <button onClick={loadMore} disabled={loadingMore} className="border px-4 py-2 rounded-md disabled:opacity-50">
+            {loadingMore ? 'Loading…' : 'Load older orders'}
+          </button>
+        </div>
+      )}
     </div>
   )
 }
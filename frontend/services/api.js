@@ -10,17 +10,26 @@ const api = axios.create({
 // Response interceptor: unwrap data or throw
 let authToken = null
 
+// Set by the API on writes; sent back so our reads include them even when the
+// backend serves reads from a lagging replica
+let readAfter = null
+
 // Request interceptor: ensure Authorization header is attached from localStorage when available
 api.interceptors.request.use((cfg) => {
 	try {
  		const t = localStorage.getItem('admin_token')
  		if (t) cfg.headers = cfg.headers || {}, (cfg.headers['Authorization'] = `Bearer ${t}`)
  	} catch (e) {}
+	if (readAfter) cfg.headers = cfg.headers || {}, (cfg.headers['X-Read-After'] = readAfter)
 	return cfg
 })
 
 api.interceptors.response.use(
-	(res) => res,
+	(res) => {
+		const marker = res.headers?.['x-read-after']
+		if (marker && (!readAfter || Number(marker) > Number(readAfter))) readAfter = marker
+		return res
+	},
 	(err) => {
 		if (err.response && err.response.status === 401) {
 			console.warn('Token expired or invalid. Logging out...')
@@ -61,8 +70,18 @@ export async function createOrder(payload) {
 
 // Admin orders APIs
 export async function fetchAdminOrders() {
-	const res = await api.get('/admin/orders')
-	return res.data
+	const { orders } = await fetchAdminOrdersPage()
+	return orders
+}
+
+// One newest-first page; pass the previous page's nextCursor to get older
+// orders. nextCursor is null on the last page.
+export async function fetchAdminOrdersPage({ cursor, limit } = {}) {
+	const params = {}
+	if (cursor) params.cursor = cursor
+	if (limit) params.limit = limit
+	const res = await api.get('/admin/orders', { params })
+	return { orders: res.data, nextCursor: res.headers?.['x-next-cursor'] || null }
 }
 
 // Backwards/alternate names required by caller
@@ -86,6 +105,71 @@ export async function fetchAdminStats() {
 
 export const getAdminStats = fetchAdminStats
 
+// Live admin order feed (server-sent events). EventSource can't send an
+// Authorization header, so the stream is read with fetch. Reconnects with
+// Last-Event-ID after a drop; returns a function that stops the stream.
+// The server replays by position in the feed, not by id value (ids are not
+// increasing along it), so this must be the id of the last event received.
+// onStatus(true) is called when the stream opens and onStatus(false) when it
+// fails or ends (e.g. the feed is disabled on the server), so the caller can
+// poll in the meantime.
+export function subscribeOrderEvents(onEvent, { brand, onStatus } = {}) {
+	let lastEventId = null
+	let controller = null
+	let stopped = false
+
+	async function connect() {
+		controller = new AbortController()
+		const headers = { Accept: 'text/event-stream' }
+		const t = authToken || (typeof localStorage !== 'undefined' ? localStorage.getItem('admin_token') : null)
+		if (t) headers['Authorization'] = `Bearer ${t}`
+		if (lastEventId) headers['Last-Event-ID'] = lastEventId
+		const qs = brand ? `?brand=${encodeURIComponent(brand)}` : ''
+		const res = await fetch(`${API_BASE}/admin/orders/events${qs}`, { headers, signal: controller.signal })
+		if (!res.ok || !res.body) throw new Error(`event stream failed: ${res.status}`)
+		if (onStatus) onStatus(true)
+		const reader = res.body.getReader()
+		const decoder = new TextDecoder()
+		let buf = ''
+		for (;;) {
+			const { value, done } = await reader.read()
+			if (done) return
+			buf += decoder.decode(value, { stream: true })
+			let sep
+			while ((sep = buf.indexOf('\n\n')) >= 0) {
+				const block = buf.slice(0, sep)
+				buf = buf.slice(sep + 2)
+				let type = 'message'
+				let data = ''
+				for (const line of block.split('\n')) {
+					if (line.startsWith('id: ')) lastEventId = line.slice(4)
+					else if (line.startsWith('event: ')) type = line.slice(7)
+					else if (line.startsWith('data: ')) data += line.slice(6)
+				}
+				if (data) onEvent(type, JSON.parse(data))
+			}
+		}
+	}
+
+	;(async () => {
+		while (!stopped) {
+			try {
+				await connect()
+			} catch (e) {
+				if (stopped) return
+			}
+			if (stopped) return
+			if (onStatus) onStatus(false)
+			await new Promise((r) => setTimeout(r, 3000))
+		}
+	})()
+
+	return () => {
+		stopped = true
+		if (controller) controller.abort()
+	}
+}
+
 // Auth helpers for frontend admin
 export function setAuthToken(token) {
 	authToken = token